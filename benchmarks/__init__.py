@@ -0,0 +1,11 @@
+"""
+    benchmarks
+    ~~~~~~~~~~
+
+    Stand-alone benchmarks for the networking and message layers. Each module is run on its own, e.g.::
+
+        python -m benchmarks.bench_notification_pump
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
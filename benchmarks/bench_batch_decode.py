@@ -0,0 +1,86 @@
+# coding=utf-8
+"""
+    benchmarks.bench_batch_decode
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compares decoding many ``PORT_VALUE`` frames one :class:`legoBTLE.legoWP.message.upstream.PORT_VALUE` at a
+    time with :func:`legoBTLE.legoWP.message.batch.decode_port_values`.
+
+    The frames are generated: mostly int32 values on four ports, some int8 and int16 values and 10% command
+    feedback, which is skipped. With ``--log``, a traffic log is decoded by both as well::
+
+        python -m benchmarks.bench_batch_decode --frames 1000000 --log traffic.lbtr
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import random
+import time
+
+from legoBTLE.legoWP.message.batch import decode_port_values
+from legoBTLE.legoWP.message.batch import decode_traffic_log
+from legoBTLE.legoWP.message.upstream import PORT_VALUE
+
+
+def _frames(count: int) -> list:
+    rnd = random.Random(0)
+    frames = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < .7:
+            value = rnd.randint(-100000, 100000).to_bytes(4, 'little', signed=True)
+        elif kind < .8:
+            value = rnd.randint(-128, 127).to_bytes(1, 'little', signed=True)
+        elif kind < .9:
+            value = rnd.randint(-32768, 32767).to_bytes(2, 'little', signed=True)
+        else:
+            frames.append(b'\x05\x00\x82\x00\x0a')
+            continue
+        frames.append(bytes((4 + len(value), 0x00, 0x45, rnd.randrange(4))) + value)
+    return frames
+
+
+def _per_object(frames) -> int:
+    values = [PORT_VALUE(bytearray(frame)) for frame in frames if frame[2] == 0x45]
+    return len(values)
+
+
+def _timed(func, *args) -> float:
+    t0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--frames', type=int, default=1000000, help='number of generated frames')
+    parser.add_argument('--log', help='a traffic log to decode as well')
+    args = parser.parse_args()
+
+    frames = _frames(args.frames)
+    buffer = b''.join(frames)
+    t_obj = _timed(_per_object, frames)
+    t_list = _timed(decode_port_values, frames)
+    t_buf = _timed(decode_port_values, buffer)
+    print(f"{len(frames)} FRAMES")
+    print(f"{'PORT_VALUE OBJECTS':<24}{t_obj:>10.3f}s")
+    print(f"{'BATCH, LIST':<24}{t_list:>10.3f}s{t_obj / t_list:>9.1f}x")
+    print(f"{'BATCH, BUFFER':<24}{t_buf:>10.3f}s{t_obj / t_buf:>9.1f}x")
+
+    if args.log:
+        from legoBTLE.networking.recorder import DIRECTION
+        from legoBTLE.networking.recorder import TrafficReplay
+
+        replay = TrafficReplay(args.log)
+        t_obj = _timed(lambda: _per_object([r.frame for r in replay if r.direction == DIRECTION.UPSTREAM]))
+        t_log = _timed(decode_traffic_log, replay)
+        replay.close()
+        print(f"{'LOG, PORT_VALUE OBJECTS':<24}{t_obj:>10.3f}s")
+        print(f"{'LOG, BATCH':<24}{t_log:>10.3f}s{t_obj / t_log:>9.1f}x")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# coding=utf-8
+"""
+    benchmarks.bench_client_connect
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures the setup of N devices: time until all are registered, sockets, reader tasks and server handlers.
+
+    N :class:`legoBTLE.device.SingleMotor.SingleMotor` devices register concurrently with an in-process server of
+    :mod:`legoBTLE.networking.server`, no Hub connected. The shared connection of
+    :meth:`legoBTLE.device.ADevice.ADevice.EXT_SRV_CONNECT_REQ` is compared with the former connection per device,
+    i.e., ``open_connection``, connect request, reading the answer and a reader task of its own::
+
+        python -m benchmarks.bench_client_connect --devices 5 --rounds 20
+
+    The devices' and the server's messages are discarded while the benchmark runs.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+from legoBTLE.device.SingleMotor import SingleMotor
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.networking import server
+from legoBTLE.networking.routing import RoutingTable
+
+
+async def _legacy_connect(device: SingleMotor) -> asyncio.Task:
+    """The registration before the shared connection, returns the reader task of the device."""
+    device.connection_set(await asyncio.open_connection(host=device.server[0], port=device.server[1]))
+    command = CMD_EXT_SRV_CONNECT_REQ(port=device.port).COMMAND
+    device.connection[1].write(command[:2])
+    await device.connection[1].drain()
+    device.connection[1].write(command[1:])
+    await device.connection[1].drain()
+    bytes_to_read = await device.connection[0].readexactly(n=1)
+    await device._dispatch_return_data(bytearray(await device.connection[0].readexactly(n=bytes_to_read[0])))
+    await device.ext_srv_connected.wait()
+    return asyncio.ensure_future(device.connection[0].read())
+
+
+async def _round(address: tuple, devices: int, shared: bool) -> dict:
+    motors = [SingleMotor(server=address, port=port, name=f"M{port}") for port in range(devices)]
+    tasks = len(asyncio.all_tasks())
+    t0 = time.perf_counter()
+    if shared:
+        await asyncio.gather(*(motor.EXT_SRV_CONNECT_REQ() for motor in motors))
+        readers = []
+    else:
+        readers = await asyncio.gather(*(_legacy_connect(motor) for motor in motors))
+    dt = time.perf_counter() - t0
+    result = {
+            'ms': dt * 1e3,
+            'sockets': len({motor.socket for motor in motors}),
+            'tasks': len(asyncio.all_tasks()) - tasks,
+            'handlers': len(server.clientSenders),
+            }
+    for motor in motors:
+        if shared:
+            await motor.EXT_SRV_DISCONNECT_REQ()
+        else:
+            motor.connection[1].close()
+    for reader in readers:
+        reader.cancel()
+    await asyncio.sleep(.05)
+    return result
+
+
+async def _run(address: tuple, devices: int, rounds: int, shared: bool) -> dict:
+    results = [await _round(address, devices, shared) for _ in range(rounds)]
+    results.sort(key=lambda r: r['ms'])
+    return results[len(results) >> 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--devices', type=int, default=5, help='number of devices, one port each')
+    parser.add_argument('--rounds', type=int, default=20, help='setups per variant, the median is reported')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server.connectedDevices = RoutingTable(hubs=1)
+    tcp = loop.run_until_complete(server.start_server('127.0.0.1', 0, debug=False))
+    address = tcp.sockets[0].getsockname()[:2]
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name, shared in (('CONNECTION PER DEVICE', False), ('SHARED CONNECTION', True)):
+            results.append((name, loop.run_until_complete(_run(address, args.devices, args.rounds, shared))))
+    tcp.close()
+    loop.run_until_complete(tcp.wait_closed())
+    loop.close()
+    print(f"{'SETUP':<24}{'DEVICES':>8}{'MS':>8}{'SOCKETS':>9}{'TASKS':>7}{'HANDLERS':>10}")
+    for name, r in results:
+        print(f"{name:<24}{args.devices:>8}{r['ms']:>8.2f}{r['sockets']:>9}{r['tasks']:>7}{r['handlers']:>10}")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# coding=utf-8
+"""
+    benchmarks.bench_device_receive
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures how many messages per second a device receives from the server.
+
+    A local server pushes ``PORT_VALUE`` frames, framed like :class:`legoBTLE.networking.sender.ClientSender` does,
+    as fast as possible and closes the connection. The device side is the reader task of
+    :class:`legoBTLE.networking.client.ClientConnection` up to calling the ``port_value_set`` handler of a device
+    whose handlers only count. It is compared with the former loop of ``readexactly(1)``, ``readexactly(n)`` and
+    ``asyncio.sleep(.001)`` per frame, once with and once without the sleep::
+
+        python -m benchmarks.bench_device_receive --frames 200000 --legacy-frames 2000
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import time
+from asyncio.streams import IncompleteReadError
+
+from legoBTLE.device.ADevice import ADevice
+from legoBTLE.networking.client import ClientConnection
+
+# PORT_VALUE of port 0 with an int32 value, preceded by the length byte as sent by the server
+FRAME: bytes = b'\x08' + b'\x08\x00\x45\x00\xd5\x02\x00\x00'
+
+
+class Device:
+    """A device that counts the port values it receives."""
+
+    name: str = 'BENCH'
+    port: bytes = b'\x00'
+    hub_id: int = 0
+    server: tuple = ('127.0.0.1', 0)
+    debug: bool = False
+    socket = None
+
+    def __init__(self):
+        self.connection = None
+        self.ext_srv_connected = asyncio.Event()
+        self.ext_srv_connected.set()
+        self.ext_srv_disconnected = asyncio.Event()
+        self.received: int = 0
+        return
+
+    _dispatch_return_data = ADevice._dispatch_return_data
+
+    def connection_set(self, connection: tuple):
+        self.connection = connection
+        return
+
+    async def port_value_set(self, port_value):
+        self.received += 1
+        return
+
+
+async def _legacy_listen(device: Device, host: str, port: int, sleep: bool):
+    """The receive loop before the framer, debug output left out."""
+    device.connection_set(await asyncio.open_connection(host, port))
+    while device.ext_srv_connected.is_set():
+        try:
+            bytes_to_read = await device.connection[0].readexactly(n=1)
+            data = bytearray(await device.connection[0].readexactly(n=bytes_to_read[0]))
+        except (ConnectionError, IOError, IncompleteReadError):
+            break
+        else:
+            await device._dispatch_return_data(data)
+        if sleep:
+            await asyncio.sleep(.001)
+    device.connection[1].close()
+    return False
+
+
+async def _shared_listen(device: Device, host: str, port: int):
+    """The reader task of the connection shared by all devices, without the handshake."""
+    connection = await ClientConnection(host, port).open()
+    connection._attach(device)
+    await connection.wait_closed()
+    return False
+
+
+async def _run(frames: int, listen) -> float:
+    """Sends `frames` frames to a device listening with `listen` and returns the messages per second."""
+    payload = FRAME * frames
+
+    async def _push(reader, writer):
+        writer.write(payload)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(_push, '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    t0 = time.perf_counter()
+    device = Device()
+    await listen(device, host, port)
+    dt = time.perf_counter() - t0
+    server.close()
+    await server.wait_closed()
+    if device.received != frames:
+        raise RuntimeError(f"[bench_device_receive]-[ERR]: RECEIVED {device.received} OF {frames} FRAMES...")
+    return frames / dt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--frames', type=int, default=200000, help='frames sent to the framer and without sleep')
+    parser.add_argument('--legacy-frames', type=int, default=2000, help='frames sent with the former sleep')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    variants = (
+            ('READEXACTLY + SLEEP', args.legacy_frames, lambda *a: _legacy_listen(*a, sleep=True)),
+            ('READEXACTLY', args.frames, lambda *a: _legacy_listen(*a, sleep=False)),
+            ('FRAMER', args.frames, _shared_listen),
+            )
+    print(f"{'RECEIVE PATH':<24}{'FRAMES':>10}{'MSG/S':>14}")
+    for name, frames, listen in variants:
+        rate = loop.run_until_complete(_run(frames, listen))
+        print(f"{name:<24}{frames:>10}{rate:>14.0f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
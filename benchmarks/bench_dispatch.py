@@ -0,0 +1,166 @@
+# coding=utf-8
+"""
+    benchmarks.bench_dispatch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures the cost of dispatching one upstream message, i.e., decoding it and selecting the handler.
+
+    *  ``builder``: :meth:`legoBTLE.legoWP.message.upstream.UpStreamMessageBuilder.build` with debug output off,
+    *  ``device``: :meth:`legoBTLE.device.ADevice.ADevice._dispatch_return_data` up to calling the handler of a
+       device whose handlers return at once.
+
+    Both are compared with the if/elif chains they replaced (``chain``), i.e., the builder comparing the decoded
+    header with each message type and formatting its debug output whether shown or not, and the device comparing
+    the header of the decoded message. The chains build the current message classes, so that only the dispatch
+    differs.
+
+    Each message type is measured on its own, as the position in the dispatch matters::
+
+        python -m benchmarks.bench_dispatch --number 20000
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import timeit
+
+from legoBTLE.device.ADevice import ADevice
+from legoBTLE.legoWP.common_message_header import COMMON_MESSAGE_HEADER
+from legoBTLE.legoWP.message.decoder import decode
+from legoBTLE.legoWP.message.upstream import DEV_GENERIC_ERROR_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import DEV_PORT_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import EXT_SERVER_CMD_ACK
+from legoBTLE.legoWP.message.upstream import EXT_SERVER_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import HUB_ACTION_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import HUB_ALERT_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import HUB_ATTACHED_IO_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import PORT_CMD_FEEDBACK
+from legoBTLE.legoWP.message.upstream import PORT_VALUE
+from legoBTLE.legoWP.message.upstream import UpStreamMessageBuilder
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.legoWP.types import PERIPHERAL_EVENT
+from legoBTLE.networking.prettyprint.debug import debug_info
+
+MESSAGES = (
+        ('HUB_ACTION', b'\x04\x00\x02\x30'),
+        ('HUB_ATTACHED_IO', b'\x0f\x00\x04\x00\x01\x2e\x00\x00\x00\x00\x10\x00\x00\x00\x10'),
+        ('GENERIC_ERROR', b'\x05\x00\x05\x61\x01'),
+        ('PORT_CMD_FEEDBACK', b'\x05\x00\x82\x00\x0a'),
+        ('PORT_VALUE', b'\x08\x00\x45\x00\xd5\x02\x00\x00'),
+        ('PORT_NOTIFICATION', b'\x0a\x00\x47\x00\x02\x01\x00\x00\x00\x01'),
+        ('HUB_ALERT', b'\x06\x00\x03\x03\x04\xff'),
+        )
+
+
+class Device:
+    """A device whose handlers do nothing."""
+
+    debug: bool = False
+
+    async def _nothing(self, *args, **kwargs):
+        return
+
+    ext_srv_notification_set = port_value_set = cmd_feedback_notification_set = _nothing
+    error_notification_set = port_notification_set = hub_attached_io_notification_set = _nothing
+    hub_action_notification_set = hub_alert_notification_set = _nothing
+
+
+def _chain_build(data: bytearray, debug: bool = False):
+    """The former :meth:`UpStreamMessageBuilder.build`."""
+    header = COMMON_MESSAGE_HEADER(data[:3])
+    debug_info(f"[UpStreamMessageBuilder]-[MSG]: DATA RECEIVED FOR PORT [{data[3]}], "
+               f"STARTING UPSTREAMBUILDING: "
+               f"{data.hex()}, {data[2]}\r\n RAW: {data}\r\nMESSAGE_TYPE: {header.m_type.hex()}", debug=debug)
+    if header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ACTION:
+        debug_info(f"GENERATING HUB_ACTION_NOTIFICATION for PORT {data[3]}", debug=debug)
+        return HUB_ACTION_NOTIFICATION(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO:
+        debug_info(f"GENERATING HUB_ATTACHED_IO_NOTIFICATION for PORT {data[3]}", debug=debug)
+        return HUB_ATTACHED_IO_NOTIFICATION(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR:
+        debug_info(f"GENERATING DEV_GENERIC_ERROR_NOTIFICATION for PORT {data[3]}", debug=debug)
+        return DEV_GENERIC_ERROR_NOTIFICATION(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK:
+        debug_info(f"GENERATING PORT_CMD_FEEDBACK for PORT {data[3]}", debug=debug)
+        return PORT_CMD_FEEDBACK(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_PORT_VALUE:
+        debug_info(f"GENERATING PORT_VALUE for PORT {data[3]}", debug=debug)
+        return PORT_VALUE(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_PORT_NOTIFICATION:
+        debug_info(f"GENERATING DEV_PORT_NOTIFICATION for PORT {data[3]}", debug=debug)
+        return DEV_PORT_NOTIFICATION(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD:
+        if data[-1] == PERIPHERAL_EVENT.EXT_SRV_RECV[0]:
+            debug_info(f"GENERATING EXT_SERVER_CMD_ACK for PORT {data[3]}", debug=debug)
+            return EXT_SERVER_CMD_ACK(data)
+        debug_info(f"GENERATING EXT_SERVER_NOTIFICATION for PORT {data[3]}", debug=debug)
+        return EXT_SERVER_NOTIFICATION(data)
+    elif header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ALERT:
+        debug_info(f"GENERATING HUB_ALERT_NOTIFICATION for PORT {data[3]}", debug=debug)
+        return HUB_ALERT_NOTIFICATION(data)
+    debug_info(f"EXCEPTION TypeError PORT {data[3]}", debug=debug)
+    return None
+
+
+async def _chain_dispatch(device: Device, data: bytearray) -> bool:
+    """The former :meth:`ADevice._dispatch_return_data`."""
+    RETURN_MESSAGE = decode(data)
+    if RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD:
+        await device.ext_srv_notification_set(RETURN_MESSAGE, cmd_debug=device.debug)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_PORT_VALUE:
+        await device.port_value_set(RETURN_MESSAGE)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK:
+        await device.cmd_feedback_notification_set(RETURN_MESSAGE)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR:
+        await device.error_notification_set(RETURN_MESSAGE)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_PORT_NOTIFICATION:
+        await device.port_notification_set(RETURN_MESSAGE)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO:
+        await device.hub_attached_io_notification_set(RETURN_MESSAGE)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ACTION:
+        await device.hub_action_notification_set(RETURN_MESSAGE)
+    elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ALERT:
+        await device.hub_alert_notification_set(RETURN_MESSAGE)
+    else:
+        raise TypeError(f"Cannot dispatch CMD-ANSWER FROM DEVICE: {data.hex()}...")
+    return True
+
+
+def _per_call(func, number: int) -> float:
+    """The best time of 5 runs per call in µs."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--number', type=int, default=20000, help='messages per run')
+    args = parser.parse_args()
+
+    device = Device()
+    dispatch = ADevice._dispatch_return_data
+
+    def _device(data: bytearray, dispatch=dispatch):
+        coro = dispatch(device, data)
+        try:
+            coro.send(None)
+        except StopIteration:
+            pass
+
+    print(f"{'':<20}{'BUILDER µs':>24}{'DEVICE µs':>24}")
+    print(f"{'MESSAGE':<20}{'CHAIN':>8}{'REGISTRY':>10}{'x':>6}{'CHAIN':>8}{'REGISTRY':>10}{'x':>6}")
+    for name, raw in MESSAGES:
+        data = bytearray(raw)
+        t_chain = _per_call(lambda: _chain_build(data), args.number)
+        t_builder = _per_call(lambda: UpStreamMessageBuilder(data).build(), args.number)
+        t_chain_device = _per_call(lambda: _device(data, _chain_dispatch), args.number)
+        t_device = _per_call(lambda: _device(data), args.number)
+        print(f"{name:<20}{t_chain:>8.2f}{t_builder:>10.2f}{t_chain / t_builder:>6.1f}"
+              f"{t_chain_device:>8.2f}{t_device:>10.2f}{t_chain_device / t_device:>6.1f}")
+    return
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop()
+    main()
@@ -0,0 +1,119 @@
+# coding=utf-8
+"""
+    benchmarks.bench_downstream_writes
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures the sustained rate of commands written to the Hub and how long the event loop is blocked meanwhile.
+
+    Three variants are compared:
+
+    *  ``inline``: the former ``writeCharacteristic(..., withResponse=True)`` called directly in the event loop,
+    *  ``pipeline``: the :class:`legoBTLE.networking.btle_io.BTLEWriter` thread, writes with response,
+    *  ``pipeline-nr``: the same, port output commands written without response.
+
+    The Hub is replaced by a peripheral that takes `--rtt` seconds for a write with response and `--interval` seconds
+    for a write without response, a rough model of the BLE connection interval::
+
+        python -m benchmarks.bench_downstream_writes --count 500 --rtt .0075 --interval .0015
+
+    The loop lag is the largest delay of a 1 ms timer running in the event loop while the commands are sent.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+from legoBTLE.networking.btle_io import BTLEWriter
+
+# START_SPEED at port 0x00 as the server receives it from a client
+COMMAND: bytes = bytes(b'\x09\x00\x81\x00\x11\x07\x32\x64\x00')
+
+
+class SlowPeripheral:
+    """Stand-in for a bluepy ``Peripheral`` whose writes take the time of a BLE round trip."""
+
+    def __init__(self, rtt: float, interval: float):
+        self._rtt = rtt
+        self._interval = interval
+        self.written: int = 0
+        self.done: threading.Event = threading.Event()
+        self.expected: int = -1
+        return
+
+    def writeCharacteristic(self, handle, val, withResponse=False):
+        time.sleep(self._rtt if withResponse else self._interval)
+        self.written += 1
+        if self.written == self.expected:
+            self.done.set()
+        return None
+
+
+async def _ticker(lags: list, stop: asyncio.Event):
+    loop = asyncio.get_event_loop()
+    while not stop.is_set():
+        t0 = loop.time()
+        await asyncio.sleep(.001)
+        lags.append(loop.time() - t0 - .001)
+    return
+
+
+async def _run(variant: str, count: int, rtt: float, interval: float, window: int) -> dict:
+    loop = asyncio.get_event_loop()
+    peripheral = SlowPeripheral(rtt, interval)
+    peripheral.expected = count
+    lags: list = []
+    stop = asyncio.Event()
+    ticker = asyncio.ensure_future(_ticker(lags, stop))
+    await asyncio.sleep(.01)
+
+    writer = None
+    t0 = time.perf_counter()
+    if variant == 'inline':
+        for _ in range(count):
+            peripheral.writeCharacteristic(0x0e, COMMAND, True)
+            await asyncio.sleep(0)
+    else:
+        writer = BTLEWriter(peripheral, loop=loop, window=window)
+        writer.start()
+        with_response = (variant == 'pipeline')
+        for _ in range(count):
+            await writer.write(0x0e, COMMAND, withResponse=with_response)
+        await loop.run_in_executor(None, peripheral.done.wait)
+    elapsed = time.perf_counter() - t0
+
+    stop.set()
+    await ticker
+    if writer is not None:
+        writer.stop(timeout=1.0)
+    lags.sort()
+    return {
+            'cmds_per_s': count / elapsed,
+            'max_lag': lags[-1] * 1e3,
+            'p99_lag': lags[int(len(lags) * .99)] * 1e3,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--count', type=int, default=500, help='number of commands to send')
+    parser.add_argument('--rtt', type=float, default=.0075, help='seconds per write with response')
+    parser.add_argument('--interval', type=float, default=.0015, help='seconds per write without response')
+    parser.add_argument('--window', type=int, default=8, help='maximum number of commands in flight')
+    args = parser.parse_args()
+
+    print(f"{'VARIANT':<14}{'CMDS/S':>10}{'MAX LAG ms':>14}{'P99 LAG ms':>14}")
+    for variant in ('inline', 'pipeline', 'pipeline-nr'):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        r = loop.run_until_complete(_run(variant, args.count, args.rtt, args.interval, args.window))
+        loop.close()
+        print(f"{variant:<14}{r['cmds_per_s']:>10.1f}{r['max_lag']:>14.2f}{r['p99_lag']:>14.2f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
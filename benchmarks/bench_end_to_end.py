@@ -0,0 +1,167 @@
+# coding=utf-8
+"""
+    benchmarks.bench_end_to_end
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures the whole path client -> server -> Hub -> server -> client against a simulated Hub.
+
+    The server of :mod:`legoBTLE.networking.server` runs in-process with a
+    :class:`legoBTLE.networking.simulator.SimulatedHub`, so that neither bluepy nor a Hub is needed. The clients are
+    plain TCP connections sending the messages of :mod:`legoBTLE.legoWP.message.downstream`:
+
+    *  latency: each client alternately sends START_SPEED and GOTO_ABS_POS to its motor and waits for the
+       ``PORT_CMD_FEEDBACK`` reporting the start of the command,
+    *  throughput: all motors run and the ``PORT_VALUE`` notifications received by all clients are counted::
+
+        python -m benchmarks.bench_end_to_end --clients 4 --count 200 --duration 2
+
+    The server's messages are discarded while the benchmark runs.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_GENERAL_NOTIFICATION_HUB_REQ
+from legoBTLE.legoWP.message.downstream import CMD_GOTO_ABS_POS_DEV
+from legoBTLE.legoWP.message.downstream import CMD_PORT_NOTIFICATION_DEV_REQ
+from legoBTLE.legoWP.message.downstream import CMD_START_SPEED_DEV
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.networking import server
+from legoBTLE.networking.routing import RoutingTable
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+UPS_PORT_CMD_FEEDBACK: int = MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0]
+
+
+class Client:
+    """A device connection as :class:`legoBTLE.device.ADevice.ADevice` opens it, reduced to the wire format."""
+
+    def __init__(self, port: int):
+        self.port: int = port
+        self.values: int = 0
+        self.feedback: asyncio.Queue = asyncio.Queue()
+        self._reader = None
+        self._writer = None
+        self._task = None
+        return
+
+    async def connect(self, host: str, port: int) -> None:
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._task = asyncio.ensure_future(self._listen())
+        await self.send(CMD_EXT_SRV_CONNECT_REQ(port=self.port).COMMAND)
+        return
+
+    async def send(self, command: bytearray) -> None:
+        self._writer.write(command[:2])
+        self._writer.write(command[1:])
+        await self._writer.drain()
+        return
+
+    async def close(self) -> None:
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._writer.close()
+        return
+
+    async def _listen(self) -> None:
+        reader = self._reader
+        while True:
+            size = (await reader.readexactly(1))[0]
+            frame = await reader.readexactly(size)
+            if frame[2] == UPS_PORT_VALUE:
+                self.values += 1
+            elif frame[2] == UPS_PORT_CMD_FEEDBACK:
+                self.feedback.put_nowait((time.perf_counter(), frame[4]))
+
+
+async def _latency(client: Client, count: int) -> list:
+    commands = (
+            CMD_START_SPEED_DEV(port=client.port, speed=50, abs_max_power=100).COMMAND,
+            CMD_GOTO_ABS_POS_DEV(port=client.port, abs_pos=0, speed=100, abs_max_power=100).COMMAND,
+            )
+    latencies = []
+    for i in range(count):
+        t0 = time.perf_counter()
+        await client.send(commands[i & 1])
+        while True:
+            t1, status = await client.feedback.get()
+            if status & 0x01:
+                break
+        latencies.append(t1 - t0)
+    return latencies
+
+
+async def _run(clients: int, count: int, duration: float, rtt: float) -> dict:
+    loop = asyncio.get_event_loop()
+    server.connectedDevices = RoutingTable(hubs=1)
+    tcp = await server.start_server('127.0.0.1', 0, debug=False)
+    address = tcp.sockets[0].getsockname()[:2]
+    hub = await server.connectBTLE(loop=loop, deviceaddr='SIM:00', simulate=True)
+    hub.rtt = rtt
+    server.btleHubs.append(server.linkBTLE(hub, loop))
+
+    devices = [Client(port) for port in range(clients)]
+    for device in devices:
+        await device.connect(*address)
+    await devices[0].send(CMD_GENERAL_NOTIFICATION_HUB_REQ().COMMAND)
+    for device in devices:
+        await device.send(CMD_PORT_NOTIFICATION_DEV_REQ(port=bytes((device.port,))).COMMAND)
+    await asyncio.sleep(.1)
+
+    t0 = time.perf_counter()
+    latencies = sorted(sum(await asyncio.gather(*(_latency(device, count) for device in devices)), []))
+    commands_per_s = len(latencies) / (time.perf_counter() - t0)
+
+    for device in devices:
+        await device.send(CMD_START_SPEED_DEV(port=device.port, speed=100, abs_max_power=100).COMMAND)
+    await asyncio.sleep(.2)
+    values = sum(device.values for device in devices)
+    await asyncio.sleep(duration)
+    values = sum(device.values for device in devices) - values
+
+    for device in devices:
+        await device.close()
+    # let the server notice the closed connections
+    await asyncio.sleep(.2)
+    tcp.close()
+    await tcp.wait_closed()
+    for link in server.btleHubs:
+        link.stop(timeout=1.0)
+    server.btleHubs.clear()
+    hub.disconnect()
+    return {
+            'cmds_per_s': commands_per_s,
+            'p50': latencies[len(latencies) >> 1] * 1e3,
+            'p99': latencies[int(len(latencies) * .99)] * 1e3,
+            'values_per_s': values / duration,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--clients', type=int, default=4, help='number of clients, one motor each')
+    parser.add_argument('--count', type=int, default=200, help='commands per client in the latency phase')
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds of the throughput phase')
+    parser.add_argument('--rtt', type=float, default=0.0, help='seconds per write with response to the Hub')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        r = loop.run_until_complete(_run(args.clients, args.count, args.duration, args.rtt))
+    loop.close()
+    print(f"{'CLIENTS':<10}{'CMDS/S':>10}{'P50 ms':>10}{'P99 ms':>10}{'VALUES/S':>12}")
+    print(f"{args.clients:<10}{r['cmds_per_s']:>10.1f}{r['p50']:>10.3f}{r['p99']:>10.3f}{r['values_per_s']:>12.1f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# coding=utf-8
+"""
+    benchmarks.bench_fanout
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures the notifications an owner and N read-only observers of the same motor port receive, and the cost of
+    routing a notification to all of them.
+
+    A client owns port 0 of a simulated Hub and drives the motor, N clients observe the port, see
+    :meth:`legoBTLE.networking.routing.RoutingTable.observe`. All clients connect over TCP to an in-process server of
+    :mod:`legoBTLE.networking.server`. The values per second each client receives are reported, and whether the
+    commands of the observers were ignored, i.e., did not move the motor. Then
+    :meth:`legoBTLE.networking.server.BTLEDelegate._route_notification` alone is timed for 1 + N subscribers::
+
+        python -m benchmarks.bench_fanout --observers 1 4 16
+
+    The server's messages are discarded while the benchmark runs.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_GENERAL_NOTIFICATION_HUB_REQ
+from legoBTLE.legoWP.message.downstream import CMD_PORT_NOTIFICATION_DEV_REQ
+from legoBTLE.legoWP.message.downstream import CMD_START_SPEED_DEV
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.networking import server
+from legoBTLE.networking.routing import RoutingTable
+from legoBTLE.networking.sender import ClientSender
+from legoBTLE.networking.sender import OVERFLOW
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+PORT: int = 0x00
+# a PORT_VALUE notification of port 0 as the Hub sends it
+FRAME: bytes = bytes((0x08, 0x00, UPS_PORT_VALUE, PORT, 0x10, 0x00, 0x00, 0x00))
+
+
+class Client:
+    """A device connection reduced to the wire format, counting the port values."""
+
+    def __init__(self, observe: bool):
+        self.observe: bool = observe
+        self.values: int = 0
+        self._writer = None
+        self._task = None
+        return
+
+    async def connect(self, host: str, port: int) -> None:
+        reader, self._writer = await asyncio.open_connection(host, port)
+        self._task = asyncio.ensure_future(self._listen(reader))
+        await self.send(CMD_EXT_SRV_CONNECT_REQ(port=PORT, observe=self.observe).COMMAND)
+        return
+
+    async def send(self, command: bytearray) -> None:
+        self._writer.writelines((command[:2], command[1:]))
+        await self._writer.drain()
+        return
+
+    async def close(self) -> None:
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._writer.close()
+        return
+
+    async def _listen(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            size = (await reader.readexactly(1))[0]
+            frame = await reader.readexactly(size)
+            if frame[2] == UPS_PORT_VALUE:
+                self.values += 1
+
+
+async def _stream(observers: int, duration: float) -> dict:
+    loop = asyncio.get_event_loop()
+    server.connectedDevices = RoutingTable(hubs=1)
+    tcp = await server.start_server('127.0.0.1', 0, debug=False)
+    address = tcp.sockets[0].getsockname()[:2]
+    hub = await server.connectBTLE(loop=loop, deviceaddr='SIM:00', simulate=True)
+    server.btleHubs.append(server.linkBTLE(hub, loop))
+
+    owner = Client(observe=False)
+    clients = [owner] + [Client(observe=True) for _ in range(observers)]
+    for client in clients:
+        await client.connect(*address)
+    await owner.send(CMD_GENERAL_NOTIFICATION_HUB_REQ().COMMAND)
+    await owner.send(CMD_PORT_NOTIFICATION_DEV_REQ(port=bytes((PORT,))).COMMAND)
+    await asyncio.sleep(.1)
+    # the motor must not move on the commands of the observers
+    values = owner.values
+    for client in clients[1:]:
+        await client.send(CMD_START_SPEED_DEV(port=PORT, speed=-100, abs_max_power=100).COMMAND)
+    await asyncio.sleep(.1)
+    ignored = owner.values == values
+
+    await owner.send(CMD_START_SPEED_DEV(port=PORT, speed=100, abs_max_power=100).COMMAND)
+    await asyncio.sleep(.2)
+    before = [client.values for client in clients]
+    await asyncio.sleep(duration)
+    values = [client.values - b for client, b in zip(clients, before)]
+
+    for client in clients:
+        await client.close()
+    await asyncio.sleep(.2)
+    tcp.close()
+    await tcp.wait_closed()
+    for link in server.btleHubs:
+        link.stop(timeout=1.0)
+    server.btleHubs.clear()
+    hub.disconnect()
+    return {
+            'owner': values[0] / duration,
+            'observer_min': min(values[1:], default=values[0]) / duration,
+            'observer_max': max(values[1:], default=values[0]) / duration,
+            'ignored': ignored,
+            }
+
+
+async def _route(observers: int, count: int) -> float:
+    """Microseconds per routed notification with the owner and `observers` observers subscribed."""
+    server.connectedDevices = table = RoutingTable(hubs=1)
+    delegate = server.BTLEDelegate(loop=asyncio.get_event_loop(), hub=0)
+    senders = [ClientSender(writer=None, maxsize=1 << 10, policy=OVERFLOW.DROP_OLDEST, name=f"C{i}")
+               for i in range(1 + observers)]
+    table.register(0, PORT, (None, None, senders[0], 0))
+    for i, sender in enumerate(senders[1:], 1):
+        table.observe(0, PORT, (None, None, sender, i))
+    route = delegate._route_notification
+    t0 = time.perf_counter()
+    for _ in range(count):
+        route(FRAME)
+    dt = time.perf_counter() - t0
+    for sender in senders:
+        await sender.close()
+    return dt / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--observers', type=int, nargs='+', default=[0, 1, 4, 16], help='numbers of observers')
+    parser.add_argument('--duration', type=float, default=1.0, help='seconds of streaming per row')
+    parser.add_argument('--count', type=int, default=100000, help='notifications routed per row')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    rows = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for observers in args.observers:
+            r = loop.run_until_complete(_stream(observers, args.duration))
+            r['route_us'] = loop.run_until_complete(_route(observers, args.count))
+            rows.append((observers, r))
+    loop.close()
+    print(f"{'OBSERVERS':<10}{'OWNER/S':>10}{'OBS MIN/S':>11}{'OBS MAX/S':>11}{'CMDS IGNORED':>14}{'ROUTE us':>10}")
+    for observers, r in rows:
+        print(f"{observers:<10}{r['owner']:>10.1f}{r['observer_min']:>11.1f}{r['observer_max']:>11.1f}"
+              f"{str(r['ignored']):>14}{r['route_us']:>10.2f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+# coding=utf-8
+"""
+    benchmarks.bench_notification_pump
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compares the former polling of the Hub (``_listenBTLE`` rescheduling itself every 1.5 ms and waiting up to 1 ms for
+    notifications on the event loop thread) with the :class:`legoBTLE.networking.btle_io.BTLEReader` thread.
+
+    Two figures are measured for each variant:
+
+    *  the CPU time the process burns per second while the Hub is idle,
+    *  the latency from the moment the Hub emits a notification until a client connected via TCP has read it.
+
+    The Hub is replaced by a peripheral whose notifications are injected from a producer thread, so that the
+    benchmark runs without bluetooth hardware::
+
+        python -m benchmarks.bench_notification_pump --idle 5 --count 2000
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import os
+import select
+import statistics
+import threading
+import time
+from collections import deque
+
+from legoBTLE.networking.btle_io import BTLEReader
+
+
+class PipePeripheral:
+    """Minimal stand-in for a bluepy ``Peripheral`` fed by :meth:`inject`."""
+
+    def __init__(self):
+        self._delegate = None
+        self._pending: deque = deque()
+        self._r, self._w = os.pipe()
+        return
+
+    def withDelegate(self, delegate):
+        self._delegate = delegate
+        return self
+
+    def fileno(self) -> int:
+        return self._r
+
+    def inject(self, data: bytes) -> None:
+        self._pending.append(data)
+        os.write(self._w, b'\x00')
+        return
+
+    def waitForNotifications(self, timeout: float) -> bool:
+        # like bluepy, a timeout of 0 does not poll but blocks until the next notification
+        if timeout and not select.select((self._r,), (), (), timeout)[0]:
+            return False
+        os.read(self._r, 1)
+        self._delegate.handleNotification(0x0e, self._pending.popleft())
+        return True
+
+    def writeCharacteristic(self, handle, val, withResponse=False):
+        return None
+
+
+class Delegate:
+    """Writes each notification the way the server does: the length byte first, then the message."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, threaded: bool):
+        self._loop = loop
+        self._threaded = threaded
+        self.writer = None
+        return
+
+    def handleNotification(self, cHandle, data):
+        if self._threaded:
+            self._loop.call_soon_threadsafe(self._route, data)
+        else:
+            self._route(data)
+        return
+
+    def _route(self, data):
+        self.writer.write(data[0:1])
+        self.writer.write(data)
+        return
+
+
+def _listen_polling(peripheral, loop):
+    """The former scheduling of ``legoBTLE.networking.server._listenBTLE``."""
+    try:
+        peripheral.waitForNotifications(.001)
+    finally:
+        loop.call_later(.0015, _listen_polling, peripheral, loop)
+    return
+
+
+async def _run(variant: str, idle: float, count: int, rate: float) -> dict:
+    loop = asyncio.get_event_loop()
+    peripheral = PipePeripheral()
+    delegate = Delegate(loop, threaded=(variant == 'reader'))
+    peripheral.withDelegate(delegate)
+
+    connected = asyncio.Event()
+
+    async def _on_client(reader, writer):
+        delegate.writer = writer
+        connected.set()
+        return
+
+    server = await asyncio.start_server(_on_client, '127.0.0.1', 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    client_reader, client_writer = await asyncio.open_connection(host, port)
+    await connected.wait()
+
+    if variant == 'reader':
+        pump = BTLEReader(peripheral)
+        pump.start()
+    else:
+        pump = None
+        loop.call_soon(_listen_polling, peripheral, loop)
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    await asyncio.sleep(idle)
+    idle_cpu = (time.process_time() - cpu0) / (time.perf_counter() - wall0)
+
+    sent: dict = {}
+
+    def _produce():
+        for seq in range(count):
+            frame = bytearray(b'\x08\x00\x45\x00') + seq.to_bytes(4, 'little', signed=True)
+            sent[seq] = time.perf_counter_ns()
+            peripheral.inject(bytes(frame))
+            time.sleep(1.0 / rate)
+        return
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    latencies = []
+    for _ in range(count):
+        length = (await client_reader.readexactly(1))[0]
+        frame = await client_reader.readexactly(length)
+        latencies.append(time.perf_counter_ns() - sent[int.from_bytes(frame[4:8], 'little', signed=True)])
+    producer.join()
+
+    if pump is not None:
+        pump.stop(timeout=1.0)
+    client_writer.close()
+    server.close()
+    await server.wait_closed()
+    latencies.sort()
+    return {
+            'idle_cpu': idle_cpu,
+            'p50': latencies[len(latencies) // 2] / 1e3,
+            'p99': latencies[int(len(latencies) * .99)] / 1e3,
+            'mean': statistics.mean(latencies) / 1e3,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--idle', type=float, default=3.0, help='seconds to measure the idle CPU load')
+    parser.add_argument('--count', type=int, default=2000, help='number of notifications to send')
+    parser.add_argument('--rate', type=float, default=200.0, help='notifications per second')
+    args = parser.parse_args()
+
+    print(f"{'VARIANT':<10}{'IDLE CPU':>12}{'MEAN µs':>12}{'P50 µs':>12}{'P99 µs':>12}")
+    for variant in ('polling', 'reader'):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        r = loop.run_until_complete(_run(variant, args.idle, args.count, args.rate))
+        loop.close()
+        print(f"{variant:<10}{r['idle_cpu']:>11.1%}{r['mean']:>12.1f}{r['p50']:>12.1f}{r['p99']:>12.1f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
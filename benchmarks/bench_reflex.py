@@ -0,0 +1,226 @@
+# coding=utf-8
+"""
+    benchmarks.bench_reflex
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures how fast a stalled motor is stopped by the stall detection of the client and by a reflex rule of the
+    server.
+
+    A client owns port 0 of a simulated Hub and turns the motor by a large number of degrees. After a random time the
+    motor is blocked, see :attr:`legoBTLE.networking.simulator.SimulatedMotor.blocked`, and the time until the STOP
+    command reaches the Hub is taken. The client either watches the values itself like
+    :meth:`legoBTLE.device.AMotor.AMotor._stall_detection`, i.e., sleeps for the window, compares and sends STOP, or
+    has added a :class:`legoBTLE.networking.reflex.StallRule` with the same window to the in-process server of
+    :mod:`legoBTLE.networking.server`. The fire count and reaction latency the server reports are shown as well,
+    and the cost of evaluating a rule per notification::
+
+        python -m benchmarks.bench_reflex --trials 20 --window 100
+
+    The server's messages are discarded while the benchmark runs.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import time
+
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_REFLEX_REQ
+from legoBTLE.legoWP.message.downstream import CMD_GENERAL_NOTIFICATION_HUB_REQ
+from legoBTLE.legoWP.message.downstream import CMD_MODE_DATA_DIRECT
+from legoBTLE.legoWP.message.downstream import CMD_PORT_NOTIFICATION_DEV_REQ
+from legoBTLE.legoWP.message.downstream import CMD_START_MOVE_DEV_DEGREES
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.legoWP.types import REFLEX_RULE
+from legoBTLE.legoWP.types import SUB_COMMAND
+from legoBTLE.legoWP.types import WRITEDIRECT_MODE
+from legoBTLE.networking import server
+from legoBTLE.networking.reflex import ReflexEngine
+from legoBTLE.networking.reflex import StallRule
+from legoBTLE.networking.reflex import ThresholdRule
+from legoBTLE.networking.routing import RoutingTable
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+DNS_PORT_CMD: int = MESSAGE_TYPE.DNS_PORT_CMD[0]
+WRITE_DIRECT_MODE_DATA: int = SUB_COMMAND.WRITE_DIRECT_MODE_DATA[0]
+PORT: int = 0x00
+STOP: CMD_MODE_DATA_DIRECT = CMD_MODE_DATA_DIRECT(port=PORT, preset_mode=WRITEDIRECT_MODE.SET_MOTOR_POWER)
+MOVE: CMD_START_MOVE_DEV_DEGREES = CMD_START_MOVE_DEV_DEGREES(port=PORT, degrees=1000000, speed=50,
+                                                              abs_max_power=100)
+
+
+class Client:
+    """A motor device reduced to the wire format, keeping the latest position."""
+
+    def __init__(self):
+        self.value: int = 0
+        self._writer = None
+        self._task = None
+        return
+
+    async def connect(self, host: str, port: int) -> None:
+        reader, self._writer = await asyncio.open_connection(host, port)
+        self._task = asyncio.ensure_future(self._listen(reader))
+        await self.send(CMD_EXT_SRV_CONNECT_REQ(port=PORT).COMMAND)
+        await self.send(CMD_GENERAL_NOTIFICATION_HUB_REQ().COMMAND)
+        await self.send(CMD_PORT_NOTIFICATION_DEV_REQ(port=bytes((PORT,))).COMMAND)
+        return
+
+    async def send(self, command: bytearray) -> None:
+        self._writer.writelines((command[:2], command[1:]))
+        await self._writer.drain()
+        return
+
+    async def close(self) -> None:
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._writer.close()
+        return
+
+    async def stall_detection(self, window: float, min_delta: int) -> None:
+        """The loop of :meth:`legoBTLE.device.AMotor.AMotor._stall_detection`."""
+        while True:
+            m0 = self.value
+            await asyncio.sleep(window)
+            if abs(self.value - m0) < min_delta:
+                await self.send(STOP.COMMAND)
+                return
+
+    async def _listen(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            size = (await reader.readexactly(1))[0]
+            frame = await reader.readexactly(size)
+            if frame[2] == UPS_PORT_VALUE and frame[3] == PORT:
+                self.value = int.from_bytes(frame[4:], 'little', signed=True)
+
+
+async def _stall(reflex: bool, trials: int, window: float, min_delta: int) -> dict:
+    loop = asyncio.get_event_loop()
+    server.connectedDevices = RoutingTable(hubs=1)
+    tcp = await server.start_server('127.0.0.1', 0, debug=False)
+    address = tcp.sockets[0].getsockname()[:2]
+    hub = await server.connectBTLE(loop=loop, deviceaddr='SIM:00', simulate=True)
+    # the time the STOP reaches the Hub, taken in the writer's thread
+    stopped = []
+    write = hub.writeCharacteristic
+
+    def writeCharacteristic(handle: int, val: bytes, withResponse: bool = False):
+        if (handle == 0x0e and len(val) > 6
+                and val[2] == DNS_PORT_CMD and val[5] == WRITE_DIRECT_MODE_DATA and val[6] == 0x00):
+            stopped.append(time.perf_counter())
+        return write(handle, val, withResponse)
+
+    hub.writeCharacteristic = writeCharacteristic
+    server.btleHubs.append(server.linkBTLE(hub, loop))
+
+    client = Client()
+    await client.connect(*address)
+    if reflex:
+        await client.send(CMD_EXT_SRV_REFLEX_REQ(port=PORT, rule=REFLEX_RULE.STALL, a=min_delta,
+                                                 b=int(window * 1000), action=STOP).COMMAND)
+    await asyncio.sleep(.1)
+
+    motor = hub.motor(PORT)
+    reactions, missed = [], 0
+    for _ in range(trials):
+        await client.send(MOVE.COMMAND)
+        guard = None if reflex else asyncio.ensure_future(client.stall_detection(window, min_delta))
+        await asyncio.sleep(random.uniform(.1, .3))
+        stopped.clear()
+        motor.blocked = True
+        blocked = time.perf_counter()
+        t_end = blocked + 10 * window + 1.0
+        while not stopped and time.perf_counter() < t_end:
+            await asyncio.sleep(.001)
+        if stopped:
+            reactions.append(stopped[0] - blocked)
+        else:
+            missed += 1
+        if guard is not None:
+            guard.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await guard
+        motor.blocked = False
+    stats = server.reflex_stats()
+
+    await client.close()
+    await asyncio.sleep(.2)
+    tcp.close()
+    await tcp.wait_closed()
+    for link in server.btleHubs:
+        link.stop(timeout=1.0)
+    server.btleHubs.clear()
+    hub.disconnect()
+    reactions.sort()
+    return {
+            'p50': _ms(reactions, .5),
+            'max': _ms(reactions, 1.0),
+            'missed': missed,
+            'fired': sum(s['fired'] for s in stats),
+            'latency_mean': max((s['latency_mean'] for s in stats), default=0.0) * 1e3,
+            'latency_max': max((s['latency_max'] for s in stats), default=0.0) * 1e3,
+            }
+
+
+def _notify(rule: str, count: int) -> float:
+    """Microseconds per PORT_VALUE evaluated by a :class:`ReflexEngine` with one rule on the port."""
+    engine = ReflexEngine(write=lambda hub, command: None)
+    action = bytes(STOP.COMMAND[1:])
+    if rule == 'STALL':
+        engine.add(StallRule(0, PORT, action, min_delta=2, window=60.0))
+        engine.notify(0, bytes((0x05, 0x00, MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0], PORT, 0x01)))
+    elif rule == 'THRESHOLD':
+        engine.add(ThresholdRule(0, PORT, action, threshold=1 << 30, kind=REFLEX_RULE.CROSSING[0]))
+    frames = [bytes((0x08, 0x00, UPS_PORT_VALUE, PORT)) + i.to_bytes(4, 'little', signed=True) for i in range(256)]
+    notify = engine.notify
+    t0 = time.perf_counter()
+    for i in range(count):
+        notify(0, frames[i & 0xff], t0)
+    dt = time.perf_counter() - t0
+    # cancels the timer of the stall rule
+    engine.drop(None)
+    return dt / count * 1e6
+
+
+def _ms(samples: list, q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] * 1e3 if samples else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--trials', type=int, default=20, help='stalls per variant')
+    parser.add_argument('--window', type=float, default=100.0, help='milliseconds without movement until stalled')
+    parser.add_argument('--min-delta', type=int, default=2, help='degrees that count as moving')
+    parser.add_argument('--count', type=int, default=100000, help='notifications evaluated per rule')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    rows = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name, reflex in (('CLIENT', False), ('SERVER REFLEX', True)):
+            rows.append((name, loop.run_until_complete(_stall(reflex, args.trials, args.window / 1000,
+                                                              args.min_delta))))
+    notify = [(rule, _notify(rule, args.count)) for rule in ('NONE', 'STALL', 'THRESHOLD')]
+    loop.close()
+    print(f"STALL -> STOP AT THE HUB, WINDOW {args.window:.0f} ms, {args.trials} STALLS")
+    print(f"{'STALL DETECTION':<16}{'P50 ms':>9}{'MAX ms':>9}{'MISSED':>8}{'FIRED':>7}{'LAT MEAN ms':>13}"
+          f"{'LAT MAX ms':>12}")
+    for name, r in rows:
+        print(f"{name:<16}{r['p50']:>9.1f}{r['max']:>9.1f}{r['missed']:>8}{r['fired']:>7}"
+              f"{r['latency_mean']:>13.3f}{r['latency_max']:>12.3f}")
+    print()
+    print(f"{'RULE ON PORT':<16}{'NOTIFY us':>10}")
+    for rule, us in notify:
+        print(f"{rule:<16}{us:>10.2f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
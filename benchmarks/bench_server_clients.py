@@ -0,0 +1,129 @@
+# coding=utf-8
+"""
+    benchmarks.bench_server_clients
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures how many client messages per second the server receives and processes with N clients at once.
+
+    Each client registers its own port and then sends a stream of ``START_SPEED`` commands followed by a disconnect
+    request, and waits for the server's acknowledgement of the disconnect. The commands are processed by
+    :meth:`legoBTLE.networking.server.ClientProtocol._message` up to the write to the Hub; no Hub is connected, so
+    the receive path, i.e., framing, metrics and routing, is measured on its own. The
+    :class:`legoBTLE.networking.server.ClientProtocol` is compared with the former ``readexactly`` loop around
+    the same processing::
+
+        python -m benchmarks.bench_server_clients --clients 8 --count 20000
+
+    The server's messages are discarded while the benchmark runs.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+from asyncio.streams import IncompleteReadError
+
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_DISCONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_START_SPEED_DEV
+from legoBTLE.legoWP.types import PERIPHERAL_EVENT
+from legoBTLE.networking import server
+from legoBTLE.networking.framer import Framer
+from legoBTLE.networking.framer import READ_SIZE
+from legoBTLE.networking.routing import RoutingTable
+
+EXT_SRV_DISCONNECTED: int = PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED[0]
+# the commands are written in chunks of this many messages
+CHUNK: int = 256
+
+
+def _wire(command: bytes) -> bytes:
+    """The command as a device sends it: handle, size and the message starting with its length byte."""
+    return bytes(command[:2] + command[1:])
+
+
+async def _legacy_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """The receive loop before the protocol: two ``readexactly`` per message around the same processing."""
+    protocol = server.ClientProtocol(debug=False)
+    protocol.connection_made(writer.transport)
+    try:
+        while True:
+            carrier_info = bytearray(await reader.readexactly(n=2))
+            data = bytearray(await reader.readexactly(n=carrier_info[1]))
+            pending = protocol._message(carrier_info[0], data)
+            if pending is not None:
+                await server.btleHubs[pending[0]].writer.write(*pending[1:])
+    except (IncompleteReadError, ConnectionError):
+        protocol.connection_lost(None)
+    return
+
+
+async def _client(host: str, tcp_port: int, port: int, count: int) -> None:
+    reader, writer = await asyncio.open_connection(host, tcp_port)
+    framer = Framer()
+    writer.write(_wire(CMD_EXT_SRV_CONNECT_REQ(port=port).COMMAND))
+    while not framer.feed(await reader.read(READ_SIZE)):
+        pass
+
+    command = _wire(CMD_START_SPEED_DEV(port=port, speed=50, abs_max_power=100).COMMAND)
+    for sent in range(0, count, CHUNK):
+        writer.write(command * min(CHUNK, count - sent))
+        await writer.drain()
+    writer.write(_wire(CMD_EXT_SRV_DISCONNECT_REQ(port=bytes((port,))).COMMAND))
+    while True:
+        chunk = await reader.read(READ_SIZE)
+        if not chunk:
+            raise ConnectionError(f"[bench_server_clients]-[ERR]: CLIENT {port} LOST THE CONNECTION...")
+        if any(frame[-1] == EXT_SRV_DISCONNECTED for frame in framer.feed(chunk)):
+            break
+    writer.close()
+    return
+
+
+async def _run(clients: int, count: int, protocol: bool) -> float:
+    """Runs `clients` clients sending `count` commands each and returns the messages per second."""
+    server.connectedDevices = RoutingTable(hubs=1)
+    if protocol:
+        tcp = await server.start_server('127.0.0.1', 0, debug=False)
+    else:
+        tcp = await asyncio.start_server(_legacy_handler, '127.0.0.1', 0)
+    host, tcp_port = tcp.sockets[0].getsockname()[:2]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, tcp_port, port, count) for port in range(clients)))
+    dt = time.perf_counter() - t0
+    tcp.close()
+    await tcp.wait_closed()
+    await asyncio.sleep(.1)
+    return clients * (count + 2) / dt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--clients', type=int, default=8, help='number of clients, one port each')
+    parser.add_argument('--count', type=int, default=20000, help='commands per client')
+    parser.add_argument('--uvloop', action='store_true', help='run on uvloop, if installed')
+    args = parser.parse_args()
+
+    if args.uvloop:
+        if server.uvloop is None:
+            parser.error('uvloop is not installed')
+        server.uvloop.install()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name, protocol in (('READEXACTLY', False), ('BUFFERED PROTOCOL', True)):
+            results.append((name, loop.run_until_complete(_run(args.clients, args.count, protocol))))
+    loop.close()
+    print(f"{'RECEIVE PATH':<20}{'CLIENTS':>8}{'MSG/S':>12}{'US/MSG':>10}")
+    for name, rate in results:
+        print(f"{name:<20}{args.clients:>8}{rate:>12.0f}{1e6 / rate:>10.2f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# coding=utf-8
+"""
+    benchmarks.bench_slow_consumer
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures what a client reading slower than the Hub sends gets with and without coalescing and a maximum rate.
+
+    The Hub side sends a ``PORT_VALUE`` per millisecond for each of 4 ports, i.e., a motor notifying every degree,
+    and a ``PORT_CMD_FEEDBACK`` per port every 50 ms to a :class:`legoBTLE.networking.sender.ClientSender`. The client
+    is simulated by a writer whose ``drain()`` takes as long as the client needs to read the bytes at
+    ``--bandwidth`` bytes per second. Reported are the queue depth the server has to hold, the latency of the
+    feedback frames, the age of the values when they arrive, and whether the order guarantee held, i.e., the
+    feedback frames arrived in order and no frame overtook a feedback frame or was overtaken by one::
+
+        python -m benchmarks.bench_slow_consumer --bandwidth 20000 --duration 2
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.networking.sender import ClientSender
+from legoBTLE.networking.sender import OVERFLOW
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+UPS_PORT_CMD_FEEDBACK: int = MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0]
+PORTS: int = 4
+FEEDBACK_EVERY: int = 50
+# every frame carries a sequence number and its time of sending
+VALUE: struct.Struct = struct.Struct('<BBBBId')
+FEEDBACK: struct.Struct = struct.Struct('<BBBBBId')
+
+
+class SlowWriter:
+    """The writer interface of a client that reads `bandwidth` bytes per second."""
+
+    def __init__(self, bandwidth: float):
+        self.bandwidth: float = bandwidth
+        self.frames: list = []
+        self._pending: int = 0
+        return
+
+    def writelines(self, chunks) -> None:
+        now = time.perf_counter()
+        for chunk in chunks[1::2]:
+            self.frames.append((now, bytes(chunk)))
+            self._pending += len(chunk) + 1
+        return
+
+    async def drain(self) -> None:
+        pending, self._pending = self._pending, 0
+        await asyncio.sleep(pending / self.bandwidth)
+        return
+
+
+async def _run(bandwidth: float, duration: float, coalesce: bool, max_rate: int) -> dict:
+    writer = SlowWriter(bandwidth)
+    sender = ClientSender(writer, maxsize=1 << 16, policy=OVERFLOW.BLOCK, name='SLOW', coalesce=coalesce)
+    for port in range(PORTS):
+        sender.set_max_rate(0, port, max_rate)
+    sender.start()
+
+    seq = 0
+    ms = 0
+    depth = 0
+    t_end = time.perf_counter() + duration
+    while time.perf_counter() < t_end:
+        for port in range(PORTS):
+            seq += 1
+            sender.send(VALUE.pack(VALUE.size, 0x00, UPS_PORT_VALUE, port, seq, time.perf_counter()))
+            if ms % FEEDBACK_EVERY == port:
+                seq += 1
+                sender.send(FEEDBACK.pack(FEEDBACK.size, 0x00, UPS_PORT_CMD_FEEDBACK, port, 0x0a, seq,
+                                          time.perf_counter()))
+        depth = max(depth, sender.depth)
+        ms += 1
+        await asyncio.sleep(.001)
+    produced = seq
+    # whatever is still queued is not counted
+    stats = sender.stats()
+    await sender.close()
+
+    feedback_latency, value_age, seqs, feedback_at = [], [], [], []
+    last_value = [0] * PORTS
+    in_order = True
+    for received, frame in writer.frames:
+        if frame[2] == UPS_PORT_CMD_FEEDBACK:
+            *_, s, sent = FEEDBACK.unpack(frame)
+            feedback_at.append(len(seqs))
+            feedback_latency.append(received - sent)
+        else:
+            *_, s, sent = VALUE.unpack(frame)
+            value_age.append(received - sent)
+            # the values of a port arrive in order
+            in_order = in_order and s > last_value[frame[3]]
+            last_value[frame[3]] = s
+        seqs.append(s)
+    # no frame before a feedback frame has a higher sequence number, none after it a lower one
+    in_order = in_order and all(max(seqs[:i], default=0) < seqs[i] < min(seqs[i + 1:], default=produced + 1)
+                                for i in feedback_at)
+    feedback_latency.sort()
+    value_age.sort()
+    return {
+            'values': len(value_age),
+            'feedback': len(feedback_latency),
+            'fb_p50': _ms(feedback_latency, .5),
+            'fb_max': _ms(feedback_latency, 1.0),
+            'age_p50': _ms(value_age, .5),
+            'depth': max(depth, stats['max_depth']),
+            'coalesced': stats['coalesced'],
+            'in_order': in_order,
+            }
+
+
+def _ms(samples: list, q: float) -> float:
+    return samples[min(int(len(samples) * q), len(samples) - 1)] * 1e3 if samples else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--bandwidth', type=float, default=20000.0, help='bytes per second the client reads')
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds per variant')
+    parser.add_argument('--max-rate', type=int, default=50, help='values per second and port of the last variant')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    rows = []
+    for name, coalesce, max_rate in (('EVERY VALUE', False, 0),
+                                     ('COALESCE', True, 0),
+                                     (f"COALESCE + {args.max_rate}/S", True, args.max_rate)):
+        rows.append((name, loop.run_until_complete(_run(args.bandwidth, args.duration, coalesce, max_rate))))
+    loop.close()
+    print(f"{'SENDER':<18}{'VALUES':>8}{'AGE P50 ms':>12}{'FEEDBACK':>10}{'FB P50 ms':>11}{'FB MAX ms':>11}"
+          f"{'MAX DEPTH':>11}{'COALESCED':>11}{'IN ORDER':>10}")
+    for name, r in rows:
+        print(f"{name:<18}{r['values']:>8}{r['age_p50']:>12.1f}{r['feedback']:>10}{r['fb_p50']:>11.1f}"
+              f"{r['fb_max']:>11.1f}{r['depth']:>11}{r['coalesced']:>11}{str(r['in_order']):>10}")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# coding=utf-8
+"""
+    benchmarks.bench_telemetry
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measures publishing port values to shared memory and reading them from other processes at the same time.
+
+    The main process publishes the values 0, 1, 2, ... to one port of a
+    :class:`legoBTLE.networking.telemetry.TelemetryWriter` as fast as it can, while N reader processes poll the
+    latest value and the history with a :class:`legoBTLE.networking.telemetry.TelemetryReader`. Since each value
+    equals its count minus one, every read is checked for consistency, i.e., torn reads would be counted::
+
+        python -m benchmarks.bench_telemetry --readers 2 --duration 2
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from legoBTLE.networking.telemetry import TelemetryReader
+from legoBTLE.networking.telemetry import TelemetryWriter
+
+PORT: int = 0x01
+HISTORY: int = 64
+
+
+def _read(name: str, duration: float, results: multiprocessing.Queue) -> None:
+    reader = TelemetryReader(name)
+    latest = histories = torn = 0
+    t_end = time.monotonic() + duration
+    while time.monotonic() < t_end:
+        for _ in range(100):
+            sample = reader.latest(0, PORT)
+            if sample is not None and sample.value != sample.count - 1:
+                torn += 1
+        latest += 100
+        values = [value for _, value in reader.history(0, PORT)]
+        if any(b - a != 1 for a, b in zip(values, values[1:])):
+            torn += 1
+        histories += 1
+    results.put((latest / duration, histories / duration, torn, reader.retries))
+    reader.close()
+    return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--readers', type=int, default=2, help='number of reader processes')
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds to publish and read')
+    args = parser.parse_args()
+
+    name = f"legobtle-bench-{os.getpid()}"
+    writer = TelemetryWriter(name, history=HISTORY)
+    writer.publish(0, PORT, 0.0)
+    results = multiprocessing.Queue()
+    readers = [multiprocessing.Process(target=_read, args=(name, args.duration, results))
+               for _ in range(args.readers)]
+    for reader in readers:
+        reader.start()
+    t0 = time.perf_counter()
+    t_end = t0 + args.duration
+    count = 1
+    while time.perf_counter() < t_end:
+        for _ in range(1000):
+            writer.publish(0, PORT, float(count))
+            count += 1
+    dt = time.perf_counter() - t0
+    stats = [results.get() for _ in readers]
+    for reader in readers:
+        reader.join()
+    writer.close()
+
+    print(f"PUBLISHED {count} VALUES, {dt / count * 1e6:.2f} us EACH, {count / dt:.0f}/s")
+    print(f"{'READER':<8}{'LATEST/S':>12}{'HISTORY/S':>12}{'TORN':>6}{'RETRIES':>9}")
+    for i, (latest, histories, torn, retries) in enumerate(stats):
+        print(f"{i:<8}{latest:>12.0f}{histories:>12.0f}{torn:>6}{retries:>9}")
+    return
+
+
+if __name__ == '__main__':
+    main()
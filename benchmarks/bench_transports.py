@@ -0,0 +1,116 @@
+# coding=utf-8
+"""
+    benchmarks.bench_transports
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compares the round trip latency device -> server -> device of the transports of
+    :mod:`legoBTLE.networking.transport`.
+
+    An in-process server of :mod:`legoBTLE.networking.server`, no Hub connected, listens on TCP, a Unix domain
+    socket and the in-process loopback in turn. A client alternately sends a disconnect and a connect request for
+    its port and waits for the server's acknowledgement of each; every acknowledgement is one round trip through
+    the transport and the server's receive and send paths. For the transport alone, the same requests are also
+    sent to a server that just echoes them::
+
+        python -m benchmarks.bench_transports --count 5000
+
+    The server's messages are discarded while the benchmark runs.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+from typing import List
+
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_DISCONNECT_REQ
+from legoBTLE.networking import server
+from legoBTLE.networking import transport
+from legoBTLE.networking.framer import Framer
+from legoBTLE.networking.framer import READ_SIZE
+from legoBTLE.networking.routing import RoutingTable
+
+
+class Echo(asyncio.Protocol):
+    """Sends back what it receives, preceded by its length, as the server frames its messages."""
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        return
+
+    def data_received(self, data: bytes) -> None:
+        self.transport.write(bytes((len(data),)) + data)
+        return
+
+
+def _wire(command: bytes) -> bytes:
+    """The command as a device sends it: handle, size and the message starting with its length byte."""
+    return bytes(command[:2] + command[1:])
+
+
+async def _run(host: str, port: int, count: int, echo: bool) -> List[float]:
+    """Returns the sorted round trip times in seconds."""
+    if echo:
+        tcp = await transport.create_server(Echo, host, port)
+    else:
+        tcp = await server.start_server(host, port, debug=False)
+    if transport.kind(host) == 'tcp':
+        port = tcp.sockets[0].getsockname()[1]
+    reader, writer = await transport.open_connection(host, port)
+    framer = Framer()
+    requests = (_wire(CMD_EXT_SRV_CONNECT_REQ(port=0).COMMAND), _wire(CMD_EXT_SRV_DISCONNECT_REQ(port=b'\x00').COMMAND))
+    latencies = []
+    for i in range(count + 1):
+        t0 = time.perf_counter()
+        writer.write(requests[i & 1])
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                raise ConnectionError(f"[bench_transports]-[ERR]: CONNECTION TO [{host}:{port}] LOST...")
+            if framer.feed(chunk):
+                break
+        latencies.append(time.perf_counter() - t0)
+    writer.close()
+    tcp.close()
+    await tcp.wait_closed()
+    await asyncio.sleep(.05)
+    # the first round trip registers the client
+    return sorted(latencies[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--count', type=int, default=5000, help='round trips per transport')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server.connectedDevices = RoutingTable(hubs=1)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        addresses = (
+                ('TCP', '127.0.0.1', 0),
+                ('UNIX', transport.UNIX + os.path.join(directory, 'legobtle.sock'), 0),
+                ('LOOPBACK', transport.LOOPBACK, 8888),
+                )
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for echo in (True, False):
+                for name, host, port in addresses:
+                    results.append((name + (' ECHO' if echo else ' SERVER'),
+                                    loop.run_until_complete(_run(host, port, args.count, echo))))
+    loop.close()
+    print(f"{'TRANSPORT':<18}{'RTT/S':>10}{'P50 us':>10}{'P99 us':>10}")
+    for name, latencies in results:
+        print(f"{name:<18}{len(latencies) / sum(latencies):>10.0f}{latencies[len(latencies) >> 1] * 1e6:>10.1f}"
+              f"{latencies[int(len(latencies) * .99)] * 1e6:>10.1f}")
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# coding=utf-8
+"""
+    benchmarks.bench_upstream_decode
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compares the time to decode one upstream message with the dataclasses of
+    :mod:`legoBTLE.legoWP.message.upstream` and with :mod:`legoBTLE.legoWP.message.decoder`.
+
+    ``PORT_VALUE`` and ``PORT_CMD_FEEDBACK`` are decoded from fixed messages. Since the classes declare
+    ``__slots__`` and derive their other attributes on access, the decoders only save the calls of the generated
+    ``__init__`` and of ``__post_init__``, i.e., expect about 1.2-1.4x, not more; a decoder that is not faster than
+    its class must not be registered. With ``--log``, the upstream frames of a traffic log written by
+    :class:`legoBTLE.networking.recorder.TrafficRecorder` are decoded as well::
+
+        python -m benchmarks.bench_upstream_decode --number 100000 --log traffic.lbtr
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import timeit
+
+from legoBTLE.legoWP.message.decoder import decode
+from legoBTLE.legoWP.message.decoder import decode_port_cmd_feedback
+from legoBTLE.legoWP.message.decoder import decode_port_value
+from legoBTLE.legoWP.message.upstream import PORT_CMD_FEEDBACK
+from legoBTLE.legoWP.message.upstream import PORT_VALUE
+from legoBTLE.legoWP.message.upstream import UpStreamMessageBuilder
+
+MESSAGES = (
+        ('PORT_VALUE', bytearray(b'\x08\x00\x45\x00\xd5\x02\x00\x00'), PORT_VALUE, decode_port_value),
+        ('PORT_CMD_FEEDBACK', bytearray(b'\x05\x00\x82\x00\x0a'), PORT_CMD_FEEDBACK, decode_port_cmd_feedback),
+        ('PORT_CMD_FEEDBACK x3', bytearray(b'\x09\x00\x82\x10\x0a\x00\x0a\x01\x0a'), PORT_CMD_FEEDBACK,
+         decode_port_cmd_feedback),
+        )
+
+
+def _per_call(func, number: int) -> float:
+    """The best time of 5 runs per call in µs."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1].strip())
+    parser.add_argument('--number', type=int, default=100000, help='decodes per run')
+    parser.add_argument('--log', help='a traffic log to decode the upstream frames of')
+    args = parser.parse_args()
+
+    print(f"{'MESSAGE':<24}{'CLASS µs':>10}{'DECODER µs':>12}{'SPEEDUP':>10}")
+    for name, data, cls, decoder in MESSAGES:
+        t_cls = _per_call(lambda: cls(data), args.number)
+        t_dec = _per_call(lambda: decoder(data), args.number)
+        print(f"{name:<24}{t_cls:>10.3f}{t_dec:>12.3f}{t_cls / t_dec:>9.1f}x")
+
+    if args.log:
+        from legoBTLE.networking.recorder import DIRECTION
+        from legoBTLE.networking.recorder import TrafficReplay
+
+        replay = TrafficReplay(args.log)
+        frames = [bytearray(r.frame) for r in replay if r.direction == DIRECTION.UPSTREAM]
+        replay.close()
+        if frames:
+            number = max(1, args.number // len(frames))
+
+            def _builder():
+                for frame in frames:
+                    UpStreamMessageBuilder(frame).build()
+
+            def _decoder():
+                for frame in frames:
+                    decode(frame)
+
+            t_cls = _per_call(_builder, number) / len(frames)
+            t_dec = _per_call(_decoder, number) / len(frames)
+            print(f"{f'LOG ({len(frames)} FRAMES)':<24}{t_cls:>10.3f}{t_dec:>12.3f}{t_cls / t_dec:>9.1f}x")
+    return
+
+
+if __name__ == '__main__':
+    main()
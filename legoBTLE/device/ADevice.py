@@ -13,28 +13,31 @@ from abc import abstractmethod
 from asyncio import Event
 from asyncio import Future
 from asyncio import sleep
-from asyncio.streams import IncompleteReadError
 from typing import Awaitable
 from typing import Callable
 from typing import List
 from typing import Tuple
 from typing import Union
 
-from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ, CMD_EXT_SRV_DISCONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_DISCONNECT_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_MAX_RATE_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_REFLEX_CLEAR_REQ
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_REFLEX_REQ
 from legoBTLE.legoWP.message.downstream import CMD_HW_RESET
 from legoBTLE.legoWP.message.downstream import CMD_PORT_NOTIFICATION_DEV_REQ
 from legoBTLE.legoWP.message.downstream import DOWNSTREAM_MESSAGE
 from legoBTLE.legoWP.message.upstream import DEV_GENERIC_ERROR_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import DEV_PORT_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import EXT_SERVER_NOTIFICATION
+from legoBTLE.legoWP.message.decoder import UPSTREAM_REGISTRY  # the registry with the fast decoders
 from legoBTLE.legoWP.message.upstream import HUB_ACTION_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import HUB_ALERT_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import HUB_ATTACHED_IO_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import PORT_CMD_FEEDBACK
 from legoBTLE.legoWP.message.upstream import PORT_VALUE
-from legoBTLE.legoWP.message.upstream import UpStreamMessageBuilder
 from legoBTLE.legoWP.types import C
 from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.networking.client import connect
 from legoBTLE.networking.prettyprint.debug import debug_info
 from legoBTLE.networking.prettyprint.debug import debug_info_begin
 from legoBTLE.networking.prettyprint.debug import debug_info_end
@@ -185,6 +188,9 @@ class ADevice(ABC):
     def server(self) -> Tuple[str, int]:
         """The Server information (host, port)
         
+        The host also selects the transport: an address for TCP, ``'unix:/path'`` for a Unix domain socket or
+        ``'loop:'`` for a server in the same event loop, see :mod:`legoBTLE.networking.transport`.
+        
         Returns
         -------
         tuple : str, int
@@ -214,6 +220,19 @@ class ADevice(ABC):
         """
         return self.server[1]
     
+    @property
+    def hub_id(self) -> int:
+        """
+        For convenience, the Hub the device is attached to, i.e., the optional third part of the server information.
+        
+        A server driving several Hubs forwards the commands of the device to the Hub with this index.
+        
+        :returns: The Hub index, ``0`` if the server information has no third part.
+        :rtype: int
+        
+        """
+        return self.server[2] if len(self.server) > 2 else 0
+    
     @property
     @abstractmethod
     def port(self) -> bytes:
@@ -517,7 +536,7 @@ class ADevice(ABC):
         
         Raises
         ------
-        ConnectionError, IncompleteReadError
+        ConnectionError
         
         """
         dbg_cmd = self.debug if dbg_cmd is None else dbg_cmd
@@ -525,7 +544,7 @@ class ADevice(ABC):
         command = CMD_EXT_SRV_DISCONNECT_REQ(port=self.port)
         
         debug_info_header(f"[{self.name}:{self.port}] {C.OKBLUE}{C.BOLD} +++ {cmd_id} +++ {C.ENDC}", debug=dbg_cmd)
-        if self.ext_srv_disconnected.set():
+        if self.ext_srv_disconnected.is_set():
             debug_info(f"[{self.name}:{self.port}] +++ {cmd_id}: ALREADY DISCONNECTED", debug=dbg_cmd)
             debug_info_footer(f"[{self.name}:{self.port}] {C.OKBLUE}{C.BOLD}+++ {cmd_id} +++ {C.ENDC}", debug=dbg_cmd)
             return True  # already disconnected
@@ -552,32 +571,120 @@ class ADevice(ABC):
                 debug_info_footer(f"{cmd_id} +++ [{self.name}:{self.port}]", debug=dbg_cmd)
                 raise ConnectionError(f"[{self.name}:??]- [MSG]: UNABLE TO ESTABLISH CONNECTION... aborting...")
             else:
-                try:
-                    bytesToRead: bytes = await self.connection[0].readexactly(1)  # waiting for answer from Server
-                    data = bytearray(await self.connection[0].readexactly(bytesToRead[0]))
-                except IncompleteReadError as ire:
-                    debug_info(
-                        f"{cmd_id} +++ [{self.name}:{self.port}]: Sending CMD_EXT_SRV_DISCONNECT_REQ: failed... "
-                        f"Server didn't answer... (->{ire.args})",
+                # the answer is dispatched by the shared connection, which then forgets the device
+                await self.ext_srv_disconnected.wait()
+                if delay_after is not None:
+                    debug_info_begin(
+                        f"{cmd_id} +++ [{self.name}:{self.port}]: DELAY_AFTER / WAITING FOR {delay_after}",
+                        debug=dbg_cmd)
+                    
+                    await sleep(delay_after)
+                    
+                    debug_info_end(
+                        f"{cmd_id} +++ [{self.name}:{self.port}]: DELAY_AFTER / WAITING FOR {delay_after}",
                         debug=dbg_cmd)
-                    debug_info_footer(f"{cmd_id} +++ [{self.name}:{self.port}]", debug=dbg_cmd)
-                    raise ire
-                else:
-                    UpStreamMessageBuilder(data=data, debug=dbg_cmd).build()
-                    if delay_after is not None:
-                        debug_info_begin(
-                            f"{cmd_id} +++ [{self.name}:{self.port}]: DELAY_AFTER / WAITING FOR {delay_after}",
-                            debug=dbg_cmd)
-                        
-                        await sleep(delay_after)
-                        
-                        debug_info_end(
-                            f"{cmd_id} +++ [{self.name}:{self.port}]: DELAY_AFTER / WAITING FOR {delay_after}",
-                            debug=dbg_cmd)
         
         debug_info_footer(f"{cmd_id} +++ [{self.name}:{self.port}]", debug=dbg_cmd)
         return s
     
+    async def EXT_SRV_MAX_RATE_REQ(self,
+                                   max_rate: int = 0,
+                                   cmd_id: str = 'EXT_SRV_MAX_RATE_REQ',
+                                   dbg_cmd: bool = None,
+                                   ) -> bool:
+        """Asks the server to send at most `max_rate` port values per second to this device.
+        
+        Useful for a UI or a logger that does not need every value of a fast motor, see
+        :meth:`legoBTLE.networking.sender.ClientSender.set_max_rate`. The server sends the latest value whenever the
+        port is due; command feedback, errors and attach events are not affected. The server does not answer.
+        
+        Parameters
+        ----------
+        max_rate : int, default 0
+            Values per second, up to 65535; ``0`` for all values.
+        cmd_id : str, optional
+            An arbitrary id to identify this method (e.g. in debugging message).
+        dbg_cmd : bool, optional
+            Switch on/off debug message specifically for this method.
+            If `None`, the setting at object creation decides.
+            
+        Returns
+        -------
+        bool
+            True if the request has been sent, False otherwise.
+        
+        """
+        dbg_cmd = self.debug if dbg_cmd is None else dbg_cmd
+        command = CMD_EXT_SRV_MAX_RATE_REQ(port=self.port, max_rate=max_rate)
+        debug_info(f"{cmd_id} +++ [{self.name}:{self.port}]: SEND CMD: {command.COMMAND.hex()}", debug=dbg_cmd)
+        return await self._cmd_send(command)
+    
+    async def EXT_SRV_REFLEX_REQ(self,
+                                 rule: Union[bytes, int],
+                                 action: DOWNSTREAM_MESSAGE,
+                                 a: int = 0,
+                                 b: int = 0,
+                                 cmd_id: str = 'EXT_SRV_REFLEX_REQ',
+                                 dbg_cmd: bool = None,
+                                 ) -> bool:
+        """Asks the server to send `action` to the Hub by itself whenever the values of this device meet `rule`.
+        
+        The server evaluates the rule on each notification of the port, so that the Hub gets the command without
+        the round trip to this device, see :mod:`legoBTLE.networking.reflex`. Only the device that registered the
+        port may add rules; they are removed when it disconnects. The server does not answer.
+        
+        Parameters
+        ----------
+        rule : Union[bytes, int]
+            One of :class:`legoBTLE.legoWP.types.REFLEX_RULE`.
+        action : DOWNSTREAM_MESSAGE
+            The command the server sends, e.g., built like in :meth:`legoBTLE.device.AMotor.AMotor.STOP`.
+        a : int, default 0
+            The threshold, or the minimum change of the value for :attr:`REFLEX_RULE.STALL`.
+        b : int, default 0
+            The window in milliseconds for :attr:`REFLEX_RULE.STALL`.
+        cmd_id : str, optional
+            An arbitrary id to identify this method (e.g. in debugging message).
+        dbg_cmd : bool, optional
+            Switch on/off debug message specifically for this method.
+            If `None`, the setting at object creation decides.
+            
+        Returns
+        -------
+        bool
+            True if the request has been sent, False otherwise.
+        
+        """
+        dbg_cmd = self.debug if dbg_cmd is None else dbg_cmd
+        command = CMD_EXT_SRV_REFLEX_REQ(port=self.port, rule=rule, a=a, b=b, action=action)
+        debug_info(f"{cmd_id} +++ [{self.name}:{self.port}]: SEND CMD: {command.COMMAND.hex()}", debug=dbg_cmd)
+        return await self._cmd_send(command)
+    
+    async def EXT_SRV_REFLEX_CLEAR_REQ(self,
+                                       cmd_id: str = 'EXT_SRV_REFLEX_CLEAR_REQ',
+                                       dbg_cmd: bool = None,
+                                       ) -> bool:
+        """Asks the server to remove the reflex rules of this device, see :meth:`EXT_SRV_REFLEX_REQ`.
+        
+        Parameters
+        ----------
+        cmd_id : str, optional
+            An arbitrary id to identify this method (e.g. in debugging message).
+        dbg_cmd : bool, optional
+            Switch on/off debug message specifically for this method.
+            If `None`, the setting at object creation decides.
+            
+        Returns
+        -------
+        bool
+            True if the request has been sent, False otherwise.
+        
+        """
+        dbg_cmd = self.debug if dbg_cmd is None else dbg_cmd
+        command = CMD_EXT_SRV_REFLEX_CLEAR_REQ(port=self.port)
+        debug_info(f"{cmd_id} +++ [{self.name}:{self.port}]: SEND CMD: {command.COMMAND.hex()}", debug=dbg_cmd)
+        return await self._cmd_send(command)
+    
     async def RESET(self,
                     wait_cond: Union[Awaitable, Callable] = None,
                     wait_cond_timeout: float = None,
@@ -717,10 +824,12 @@ class ADevice(ABC):
             (bool): Flag indicating success/failure.
 
         """
+        command = cmd.COMMAND
+        if self.hub_id:
+            command = command[:2] + bytes((self.hub_id,)) + command[3:]
         try:
-            self.connection[1].write(cmd.COMMAND[:2])
-            await self.connection[1].drain()
-            self.connection[1].write(cmd.COMMAND[1:])
+            # one call, so that the commands of the devices sharing the connection are not interleaved
+            self.connection[1].writelines((command[:2], command[1:]))
             await self.connection[1].drain()  # cmd sent
         except (
                 AttributeError, ConnectionRefusedError, ConnectionAbortedError,
@@ -735,9 +844,13 @@ class ADevice(ABC):
     
     async def EXT_SRV_CONNECT_REQ(self, host: str = '127.0.0.1',
                                   srv_port: int = 8888,
+                                  observe: bool = False,
                                   ) -> Tuple[str, bool]:
         """Performs the actual Connection Request and does the listening to the Port afterwards.
         
+        The device registers over the connection all devices of the process share with the server, see
+        :class:`legoBTLE.networking.client.ClientConnection`, which also receives the messages for the device.
+        
         The method is modelled as data, though not entirely stringent.
         
         This method is a coroutine.
@@ -748,6 +861,9 @@ class ADevice(ABC):
             The IP Address of the Server.
         srv_port : int
             The port to connect to on the Server.
+        observe : bool, default False
+            If ``True``, the device only watches its port, e.g., for a dashboard: it receives the notifications of
+            the port, while the commands are sent by the client owning the port, which may be this process.
 
         Returns
         ---
@@ -765,104 +881,27 @@ class ADevice(ABC):
                     f"[{self.name}]-[MSG]: ATTEMPTING TO REGISTER [{self.name}:{self.port[0]}] WITH SERVER "
                     f"[{self.server[0]}:"
                     f"{self.server[1]}]...")
-            reader, writer = await asyncio.open_connection(host=self.server[0], port=self.server[1])
-            self.connection_set((reader, writer))
-        except ConnectionError:
+            # all devices of the process share one connection per server, the observing ones another one
+            connection = await connect(host=self.server[0], port=self.server[1], observe=observe)
+        except (ConnectionError, OSError):
             raise ConnectionError(
                 f"COULD NOT CONNECT [{self.name}:{self.port[0]}] with [{self.server[0]}:{self.server[1]}...")
         else:
             try:
-                answer = await self._connect_srv()
-                debug_info(f"[{self.name}:{self.port[0]}]-[MSG]: RECEIVED CON_REQ ANSWER: {answer.hex()}",
-                           debug=self.debug)
-                
-                await self._dispatch_return_data(data=answer)
-                await self.ext_srv_connected.wait()
-                task = asyncio.create_task(self._listen_srv())  # start listening to port
+                await connection.register(self, observe=observe)
+                debug_info(f"[{self.name}:{self.port[0]}]-[MSG]: RECEIVED CON_REQ ANSWER...", debug=self.debug)
                 return self.name, True
             except (TypeError, ConnectionError) as ce:
                 raise ConnectionError(
                     f"COULD NOT CONNECT [{self.name}:{self.port[0]}] TO [{self.server[0]}:{self.server[1]}...\r\n"
                     f"{ce.args}")
     
-    async def _connect_srv(self) -> bytearray:
-        """Connect the device (anything that subclasses from device) to the Devices Command sending Server.
-        
-        The method starts with sending a Connect Request and upon acknowledgement constantly listens for Messages
-        from the Server.
-
-        This method is a coroutine.
-        
-        :return: Boolean, indicating if connection to Server could be established or not.
-        :rtype: bool
-        
-        """
-        
-        s: bool = False
-        
-        for _ in range(1, 3):
-            current_command = CMD_EXT_SRV_CONNECT_REQ(port=self.port)
-            debug_info(
-                    f"[{self.name}:{self.port[0]}]-[MSG]: Sending CMD_EXT_SRV_CONNECT_REQ: "
-                    f"{current_command.COMMAND.hex()}",
-                    debug=self.debug)
-            s = await self._cmd_send(current_command)
-            if not s:
-                debug_info(f"[{self.name}:{self.port[0]}]-[MSG]: Sending CMD_EXT_SRV_CONNECT_REQ: failed... retrying",
-                           debug=self.debug)
-                continue
-            else:
-                break
-        if not s:
-            raise ConnectionError(f"[{self.name}:??]- [MSG]: UNABLE TO ESTABLISH CONNECTION... aborting...")
-        else:
-            bytes_to_read = await self.connection[0].readexactly(n=1)
-            data = bytearray(await self.connection[0].readexactly(n=bytes_to_read[0]))
-        return data
-    
-    async def _listen_srv(self) -> bool:
-        """Listen to the device's Server Port.
-        
-        This Method is a coroutine
-        
-        Returns
-        -------
-        bool
-            Flag indicating state of listener (TRUE:listening/FAlSE: not listening).
-        
-        """
-        await self.ext_srv_connected.wait()
-        debug_info(
-            f"{C.BOLD}{C.OKBLUE}[{self.name}:{self.port[0]}]-[MSG]: LISTENING ON SOCKET [{self.socket}]...{C.ENDC}",
-            debug=self.debug)
-        while self.ext_srv_connected.is_set():
-            try:
-                bytes_to_read = await self.connection[0].readexactly(n=1)
-                debug_info(
-                    f"{C.BOLD}{C.OKBLUE}[{self.name}:{self.port[0]}]-[MSG]: reading {bytes_to_read} / "
-                    f"{bytes_to_read[0]}]...{C.ENDC}",
-                    debug=self.debug)
-                data = bytearray(await self.connection[0].readexactly(n=bytes_to_read[0]))
-            except (ConnectionError, IOError) as e:
-                self.ext_srv_connected.clear()
-                self.ext_srv_disconnected.set()
-                debug_info(f"CONNECTION LOST... {e.args}", debug=self.debug)
-                return False
-            else:
-                try:
-                    await self._dispatch_return_data(data)
-                except TypeError as te:
-                    raise TypeError(f"[{self.name}:{self.port[0]}]-[ERR]: Dispatching received data failed... "
-                                    f"Aborting")
-            await asyncio.sleep(.001)
-        
-        debug_info(f"{C.BOLD}{C.OKBLUE}[{self.server[0]}:{self.server[1]}]-[MSG]: CONNECTION CLOSED...{C.ENDC}",
-                   debug=self.debug)
-        return False
-    
     async def _dispatch_return_data(self, data: bytearray) -> bool:
         """Build an :class:`UPSTREAM_MESSAGE` and dispatch.
         
+        The message type byte selects the decoder and the handler from
+        :data:`legoBTLE.legoWP.message.upstream.UPSTREAM_REGISTRY`.
+        
         Args:
             data (bytearray): the raw data
 
@@ -870,25 +909,10 @@ class ADevice(ABC):
             (bool): Flag indicating Success/Failure.
             
         """
-        RETURN_MESSAGE = UpStreamMessageBuilder(data, debug=True).build()
-        if RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD:
-            await self.ext_srv_notification_set(RETURN_MESSAGE, cmd_debug=self.debug)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_PORT_VALUE:
-            await self.port_value_set(RETURN_MESSAGE)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK:
-            await self.cmd_feedback_notification_set(RETURN_MESSAGE)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR:
-            await self.error_notification_set(RETURN_MESSAGE)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_PORT_NOTIFICATION:
-            await self.port_notification_set(RETURN_MESSAGE)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO:
-            await self.hub_attached_io_notification_set(RETURN_MESSAGE)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ACTION:
-            await self.hub_action_notification_set(RETURN_MESSAGE)
-        elif RETURN_MESSAGE.m_header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ALERT:
-            await self.hub_alert_notification_set(RETURN_MESSAGE)
-        else:
+        entry = UPSTREAM_REGISTRY[data[2]]
+        if entry is None:
             raise TypeError(f"[{self.name}:{self.port}]-[ERR] Cannot dispatch CMD-ANSWER FROM DEVICE: {data.hex()}...")
+        await entry.handle(self, entry.decode(data))
         return True
     
     @property
@@ -24,6 +24,7 @@ import numpy as np
 from colorama import Fore, Style
 
 from legoBTLE.device.ADevice import ADevice
+from legoBTLE.legoWP.message import encoder
 from legoBTLE.legoWP.message.downstream import CMD_GOTO_ABS_POS_DEV
 from legoBTLE.legoWP.message.downstream import CMD_MODE_DATA_DIRECT
 from legoBTLE.legoWP.message.downstream import CMD_SET_ACC_DEACC_PROFILE
@@ -31,9 +32,11 @@ from legoBTLE.legoWP.message.downstream import CMD_START_MOVE_DEV_DEGREES
 from legoBTLE.legoWP.message.downstream import CMD_START_MOVE_DEV_TIME
 from legoBTLE.legoWP.message.downstream import CMD_START_PWR_DEV
 from legoBTLE.legoWP.message.downstream import CMD_START_SPEED_DEV
+from legoBTLE.legoWP.message.template import COMMANDS
 from legoBTLE.legoWP.types import C
 from legoBTLE.legoWP.types import DIRECTIONAL_VALUE
 from legoBTLE.legoWP.types import MOVEMENT
+from legoBTLE.legoWP.types import REFLEX_RULE
 from legoBTLE.legoWP.types import SI
 from legoBTLE.legoWP.types import SUB_COMMAND
 from legoBTLE.legoWP.types import WRITEDIRECT_MODE
@@ -275,6 +278,50 @@ class AMotor(ADevice):
         
         return True
     
+    async def EXT_SRV_STALL_REFLEX_REQ(self,
+                                       stall_bias: Optional[float] = None,
+                                       time_to_stalled: Optional[float] = None,
+                                       cmd_id: Optional[str] = None,
+                                       cmd_debug: Optional[bool] = None,
+                                       ) -> bool:
+        """Lets the server stop the motor by itself when it stalls.
+        
+        The server-side counterpart of the stall detection of the motor: while a command runs, the server sends
+        :meth:`STOP` to the Hub as soon as the motor has moved less than `stall_bias` degrees within
+        `time_to_stalled` seconds, without waiting for this device to notice, see
+        :class:`legoBTLE.networking.reflex.StallRule`. The port values must be enabled, e.g., with
+        :meth:`REQ_PORT_NOTIFICATION`.
+        
+        Parameters
+        ----------
+        stall_bias : float, optional
+            Degrees, :attr:`stall_bias` if not given.
+        time_to_stalled : float, optional
+            Seconds, :attr:`time_to_stalled` if not given.
+        cmd_id : str, optional
+            An arbitrary id to identify this method (e.g. in debugging message).
+        cmd_debug : bool, optional
+            Switch on/off debug message specifically for this method.
+            If `None`, the setting at object creation decides.
+        
+        Returns
+        -------
+        bool
+            True if the request has been sent, False otherwise.
+        
+        """
+        stall_bias = self.stall_bias if stall_bias is None else stall_bias
+        time_to_stalled = self.time_to_stalled if time_to_stalled is None else time_to_stalled
+        if time_to_stalled is None:
+            raise ValueError(f"[{self.name}:{self.port[0]}]-[ERR]: time_to_stalled NOT SET...")
+        return await self.EXT_SRV_REFLEX_REQ(rule=REFLEX_RULE.STALL,
+                                             action=self._stop_command(),
+                                             a=max(int(stall_bias), 1),
+                                             b=max(int(time_to_stalled * 1000), 1),
+                                             cmd_id=self.EXT_SRV_STALL_REFLEX_REQ.__qualname__ if cmd_id is None
+                                             else cmd_id,
+                                             dbg_cmd=cmd_debug)
+    
     @property
     @abstractmethod
     def wheel_diameter(self) -> float:
@@ -851,12 +898,14 @@ class AMotor(ADevice):
             _power = power * int(np.sign(power)) * self.clockwise_direction
         
         _cmd_debug = self.debug if cmd_debug is None else cmd_debug
-        command = CMD_START_PWR_DEV(
-                synced=False,
-                port=self.port,
-                power=_power,
-                start_cond=start_cond,
-                completion_cond=MOVEMENT.ONCOMPLETION_UPDATE_STATUS
+        command = COMMANDS.command(
+                CMD_START_PWR_DEV, encoder.START_PWR,
+                {'synced': False,
+                 'port': self.port,
+                 'start_cond': start_cond,
+                 'completion_cond': MOVEMENT.ONCOMPLETION_UPDATE_STATUS,
+                 },
+                power=int(_power),
                 )
         
         debug_info_header(f"NAME: {self.name} / PORT: {self.port} # START_POWER_UNREGULATED", debug=_cmd_debug)
@@ -982,16 +1031,19 @@ class AMotor(ADevice):
             _speed = speed * self.clockwise_direction  # normalize speed
         _cmd_debug = self.debug if cmd_debug is None else cmd_debug
         
-        command = CMD_START_SPEED_DEV(
-                synced=False,
-                port=self.port,
-                start_cond=start_cond,
-                completion_cond=completion_cond,
-                speed=_speed,
-                abs_max_power=abs_max_power,
-                use_profile=use_profile,
-                use_acc_profile=use_acc_profile,
-                use_dec_profile=use_dec_profile)
+        command = COMMANDS.command(
+                CMD_START_SPEED_DEV, encoder.START_SPEED,
+                {'synced': False,
+                 'port': self.port,
+                 'start_cond': start_cond,
+                 'completion_cond': completion_cond,
+                 'use_profile': use_profile,
+                 'use_acc_profile': use_acc_profile,
+                 'use_dec_profile': use_dec_profile,
+                 },
+                speed=int(_speed),
+                abs_max_power=int(abs_max_power),
+                )
         
         debug_info_header(f"{self.name}:{self.port}.START_SPEED_UNREGULATED()", debug=_cmd_debug)
         debug_info(f"{self.name}:{self.port}.START_SPEED_UNREGULATED(): AT THE GATES - WAITING", debug=_cmd_debug)
@@ -1110,20 +1162,23 @@ class AMotor(ADevice):
         _gearRatio = self.gear_ratio
         _cmd_debug = self.debug if cmd_debug is None else cmd_debug
         
-        command = CMD_GOTO_ABS_POS_DEV(
-                synced=False,
-                port=self.port,
-                start_cond=start_cond,
-                completion_cond=completion_cond,
-                speed=_speed,
-                abs_pos=position,
-                gearRatio=_gearRatio,
-                abs_max_power=abs_max_power,
-                on_completion=on_completion,
-                use_profile=use_profile,
-                use_acc_profile=use_acc_profile,
-                use_dec_profile=use_dec_profile,
+        # only the encoded abs_pos is scaled by the gear ratio, so that the template needs no gearRatio
+        command = COMMANDS.command(
+                CMD_GOTO_ABS_POS_DEV, encoder.GOTO_ABS_POS,
+                {'synced': False,
+                 'port': self.port,
+                 'start_cond': start_cond,
+                 'completion_cond': completion_cond,
+                 'use_profile': use_profile,
+                 'use_acc_profile': use_acc_profile,
+                 'use_dec_profile': use_dec_profile,
+                 },
+                abs_pos=int(round(position * _gearRatio)),
+                speed=int(_speed),
+                abs_max_power=int(abs_max_power),
+                on_completion=int(on_completion),
                 )
+        command.abs_pos, command.gearRatio = position, _gearRatio
         
         debug_info_header(f"COMMAND {cmd_id} +*+ <MOTOR {self.name} -- PORT {self.port[0]}>", debug=_cmd_debug)
         debug_info_begin(
@@ -1236,13 +1291,7 @@ class AMotor(ADevice):
         if delay_before:
             await asyncio.sleep(delay_before)
         
-        command = CMD_MODE_DATA_DIRECT(synced=self.synced,
-                                       port=self.port,
-                                       start_cond=MOVEMENT.ONSTART_EXEC_IMMEDIATELY,
-                                       completion_cond=MOVEMENT.ONCOMPLETION_UPDATE_STATUS,
-                                       preset_mode=WRITEDIRECT_MODE.SET_MOTOR_POWER,
-                                       motor_position=0,
-                                       )
+        command = self._stop_command()
         
         debug_info_begin(f"    <MOTOR {self.name} -- PORT {self.port[0]}>: sending {command.COMMAND.hex()}",
                          debug=cmd_debug)
@@ -1263,6 +1312,16 @@ class AMotor(ADevice):
         
         return s
     
+    def _stop_command(self) -> CMD_MODE_DATA_DIRECT:
+        return COMMANDS.command(CMD_MODE_DATA_DIRECT, encoder.WRITE_DIRECT_VALUE,
+                                {'synced': self.synced,
+                                 'port': self.port,
+                                 'start_cond': MOVEMENT.ONSTART_EXEC_IMMEDIATELY,
+                                 'completion_cond': MOVEMENT.ONCOMPLETION_UPDATE_STATUS,
+                                 'preset_mode': WRITEDIRECT_MODE.SET_MOTOR_POWER,
+                                 'motor_position': 0,
+                                 })
+    
     async def SET_POSITION(self,
                            pos: int = 0,
                            wait_cond: Union[Awaitable, Callable] = None,
@@ -1276,12 +1335,14 @@ class AMotor(ADevice):
         _wcd = None
         cmd_debug = self.debug if cmd_debug is None else cmd_debug
         
-        command = CMD_MODE_DATA_DIRECT(
-                port=self.port,
-                start_cond=MOVEMENT.ONSTART_EXEC_IMMEDIATELY,
-                completion_cond=MOVEMENT.ONCOMPLETION_UPDATE_STATUS,
-                preset_mode=WRITEDIRECT_MODE.SET_POSITION,
-                motor_position=pos,
+        command = COMMANDS.command(
+                CMD_MODE_DATA_DIRECT, encoder.WRITE_DIRECT_POSITION,
+                {'port': self.port,
+                 'start_cond': MOVEMENT.ONSTART_EXEC_IMMEDIATELY,
+                 'completion_cond': MOVEMENT.ONCOMPLETION_UPDATE_STATUS,
+                 'preset_mode': WRITEDIRECT_MODE.SET_POSITION,
+                 },
+                motor_position=int(round(pos)),
                 )
         
         debug_info_header(f"THE {cmd_id} ++ <MOTOR {self.name} -- PORT {self.port[0]}>", debug=cmd_debug)
@@ -1426,18 +1487,20 @@ class AMotor(ADevice):
         
         cmd_debug = self.debug if cmd_debug is None else cmd_debug
         
-        command = CMD_START_MOVE_DEV_DEGREES(
-                synced=False,
-                port=self.port,
-                start_cond=start_cond,
-                completion_cond=completion_cond,
+        command = COMMANDS.command(
+                CMD_START_MOVE_DEV_DEGREES, encoder.MOVE_DEGREES,
+                {'synced': False,
+                 'port': self.port,
+                 'start_cond': start_cond,
+                 'completion_cond': completion_cond,
+                 'use_profile': use_profile,
+                 'use_acc_profile': use_acc_profile,
+                 'use_dec_profile': use_dec_profile,
+                 },
                 degrees=_degrees,
                 speed=_speed,
-                abs_max_power=_abs_max_power,
-                on_completion=on_completion,
-                use_profile=use_profile,
-                use_acc_profile=use_acc_profile,
-                use_dec_profile=use_dec_profile,
+                abs_max_power=int(_abs_max_power),
+                on_completion=int(on_completion),
                 )
         
         debug_info_header(f"COMMAND {cmd_id} +*+ <{self.name}: {self.port[0]}>", debug=cmd_debug)
@@ -1575,17 +1638,20 @@ class AMotor(ADevice):
             _speed = speed * self.clockwise_direction  # normalize speed
         _cmd_debug = self.debug if cmd_debug is None else cmd_debug
         
-        command = CMD_START_MOVE_DEV_TIME(
-                port=self.port,
-                start_cond=start_cond,
-                completion_cond=completion_cond,
-                time=time,
-                speed=_speed,
-                power=power,
-                on_completion=on_completion,
-                use_profile=use_profile,
-                use_acc_profile=use_acc_profile,
-                use_dec_profile=use_dec_profile)
+        command = COMMANDS.command(
+                CMD_START_MOVE_DEV_TIME, encoder.MOVE_TIME,
+                {'port': self.port,
+                 'start_cond': start_cond,
+                 'completion_cond': completion_cond,
+                 'use_profile': use_profile,
+                 'use_acc_profile': use_acc_profile,
+                 'use_dec_profile': use_dec_profile,
+                 },
+                time=int(time),
+                speed=int(_speed),
+                power=int(power),
+                on_completion=int(on_completion),
+                )
         
         async with self.port_free_condition:
             await self.port_free.wait()
@@ -68,7 +68,8 @@ class Hub(ADevice):
         Parameters
         ----------
         server : tuple[str, int]
-            A tuple of the string hostname and int port
+            A tuple of the string hostname and int port, optionally followed by the int index of the Hub if the
+            server drives several Hubs.
         name : str
             A friendly name.
         debug : bool
@@ -171,7 +172,6 @@ class Hub(ADevice):
                 self._ext_srv_disconnected.clear()
                 self._port_free.set()
             elif ext_srv_notification.m_event == PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED:
-                self._connection[1].close()
                 self._ext_srv_connected.clear()
                 self._ext_srv_disconnected.set()
                 self._port_free.clear()
@@ -31,6 +31,7 @@ from legoBTLE.legoWP.message.upstream import HUB_ATTACHED_IO_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import PORT_CMD_FEEDBACK
 from legoBTLE.legoWP.message.upstream import PORT_VALUE
 from legoBTLE.legoWP.types import CMD_FEEDBACK_MSG
+from legoBTLE.legoWP.types import FEEDBACK_FLAGS
 from legoBTLE.legoWP.types import MOVEMENT
 from legoBTLE.legoWP.types import PERIPHERAL_EVENT
 from legoBTLE.legoWP.types import PORT
@@ -67,7 +68,8 @@ class SingleMotor(AMotor):
         Parameters
         ----------
         server : Tuple[str, int]
-            Tuple with (Host, Port) Information, e.g., ('127.0.0.1', 8888).
+            Tuple with (Host, Port) Information, e.g., ('127.0.0.1', 8888). An optional third element selects the
+            Hub of a server driving several Hubs, e.g., ('127.0.0.1', 8888, 1).
         port : Union[PORT, int, bytes]
             The port, e.g., b'\x02' of the SingleMotor (:class:`legoBTLE.legoWP.types.PORT` can be utilised).
         name : str, default 'SingleMotor'
@@ -600,7 +602,7 @@ class SingleMotor(AMotor):
         """
         debug = self._debug if debug is None else debug
         
-        debug_info_header(f"[{self._name}].[{self.__name__}]", debug)
+        debug_info_header(f"[{self._name}].[{type(self).__name__}]", debug)
         if notification is not None:
             self._ext_srv_notification = notification
             print(f"IN EXTSERVER_NOTIFICATION: {self._name} / NOT NONE {bytes(self._ext_srv_notification.m_event)} / TYPE: {PERIPHERAL_EVENT.EXT_SRV_CONNECTED}")
@@ -614,7 +616,6 @@ class SingleMotor(AMotor):
                 self._port_free.set()
                 print(f"IN EXTSERVER_NOTIFICATION: {self._name} / NOTIFICATION: SUCCESS")
             elif self._ext_srv_notification.m_event == PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED:
-                self._connection[1].close()
                 self._ext_srv_connected.clear()
                 self._ext_srv_disconnected.set()
                 self._port2hub_connected.clear()
@@ -745,14 +746,20 @@ class SingleMotor(AMotor):
             This is a setter
             
         """
-        debug_info_header(f"<{self.name} -- {self.port[0]}> - CMD_FEEDBACK", debug=self._debug)
-        debug_info_begin(f"<{self.name}:{self.port[0]}> - CMD_FEEDBACK: NOTIFICATION-MSG-DETAILS", debug=self._debug)
-        debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: PORT: {notification.m_port[0]}", debug=self._debug)
-        debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: MSG_CONTENT: {notification.COMMAND.hex()}", debug=self._debug)
-        if notification.COMMAND[len(notification.COMMAND) - 1] == int.from_bytes(b'\x01', 'little'):
-            
-            debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS: CMD STARTED", debug=self._debug)
-            debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS CODE: {notification.COMMAND[len(notification.COMMAND) - 1]}", debug=self._debug)
+        code = notification.COMMAND[-1]
+        flags = FEEDBACK_FLAGS[code]
+        if self._debug:
+            debug_info_header(f"<{self.name} -- {self.port[0]}> - CMD_FEEDBACK", debug=True)
+            debug_info_begin(f"<{self.name}:{self.port[0]}> - CMD_FEEDBACK: NOTIFICATION-MSG-DETAILS", debug=True)
+            debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: PORT: {notification.m_port[0]}", debug=True)
+            debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: MSG_CONTENT: {notification.COMMAND.hex()}",
+                       debug=True)
+        if flags.EMPTY_BUF_CMD_IN_PROGRESS:
+            if self._debug:
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS: CMD STARTED",
+                           debug=True)
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS CODE: {code}",
+                           debug=True)
             
             self._set_cmd_running(True)
             if self._stall_guard is None:  # if stall_guard not running start it
@@ -763,15 +770,16 @@ class SingleMotor(AMotor):
             
             self._port_free.clear()
             
-            debug_info_end(f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
-                           debug=self._debug)
+            if self._debug:
+                debug_info_end(f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
+                               debug=True)
             
-        elif notification.COMMAND[len(notification.COMMAND) - 1] == int.from_bytes(b'\x0a', 'little'):
-            debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: REPORTED CMD-STATUS: CMD EXECUTED",
-                       debug=self._debug)
-            debug_info(
-                    f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS CODE: {notification.COMMAND[len(notification.COMMAND) - 1]}",
-                    debug=self._debug)
+        elif flags.EMPTY_BUF_CMD_COMPLETED:
+            if self._debug:
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: REPORTED CMD-STATUS: CMD EXECUTED",
+                           debug=True)
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS CODE: {code}",
+                           debug=True)
             
             self._set_cmd_running(False)
             self.__e_port_value_rcv.clear()
@@ -779,22 +787,23 @@ class SingleMotor(AMotor):
             
             # self.E_MOTOR_STALLED.clear()
             
-            debug_info_end(
-                    f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
-                    debug=self._debug)
+            if self._debug:
+                debug_info_end(
+                        f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
+                        debug=True)
         else:
-            debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:REPORTED CMD-STATUS: CMD DISCARDED",
-                       debug=self._debug)
-            debug_info(
-                f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:CMD-STATUS CODE: {notification.COMMAND[len(notification.COMMAND) - 1]}",
-                debug=self._debug)
-
+            if self._debug:
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:REPORTED CMD-STATUS: CMD DISCARDED",
+                           debug=True)
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:CMD-STATUS CODE: {code}",
+                           debug=True)
             self._set_cmd_running(False)
             self.__e_port_value_rcv.clear()
             self.port_free.set()
             
-        debug_info_end(f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS", debug=self._debug)
-        debug_info_footer(f"<{self.name} -- {self.port[0]}> - CMD_FEEDBACK", debug=self._debug)
+        if self._debug:
+            debug_info_end(f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS", debug=True)
+            debug_info_footer(f"<{self.name} -- {self.port[0]}> - CMD_FEEDBACK", debug=True)
         # self._cmd_feedback_log.append((datetime.timestamp(datetime.now()), notification.m_cmd_status))
         self._current_cmd_feedback_notification = notification
         return True
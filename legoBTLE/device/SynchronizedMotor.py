@@ -45,6 +45,7 @@ from legoBTLE.legoWP.types import C
 from legoBTLE.legoWP.types import CMD_FEEDBACK_MSG
 from legoBTLE.legoWP.types import CONNECTION
 from legoBTLE.legoWP.types import DIRECTIONAL_VALUE
+from legoBTLE.legoWP.types import FEEDBACK_FLAGS
 from legoBTLE.legoWP.types import MOVEMENT
 from legoBTLE.legoWP.types import PERIPHERAL_EVENT
 from legoBTLE.legoWP.types import PORT
@@ -84,7 +85,8 @@ class SynchronizedMotor(AMotor):
         motor_a, motor_b : AMotor
             The motor instance, that make up this SynchronizedMotor.
         server : Tuple[str, int]
-            The server connection information, e.g., `('127.0.0.1', 8888)`.
+            The server connection information, e.g., `('127.0.0.1', 8888)`. An optional third element selects the
+            Hub of a server driving several Hubs, e.g., `('127.0.0.1', 8888, 1)`.
         name : str, default 'SynchronizedMotor'
             An arbitrary name for this SynchronizedMotor.
         time_to_stalled : float, default 0.2
@@ -322,7 +324,6 @@ class SynchronizedMotor(AMotor):
                 self._port_free.set()
             
             elif ext_srv_notification.m_event == PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED:
-                self._connection[1].close()
                 self._port_free.clear()
                 self._ext_srv_connected.clear()
                 self._ext_srv_disconnected.set()
@@ -1252,55 +1253,61 @@ class SynchronizedMotor(AMotor):
         return self._current_cmd_feedback_notification
     
     async def cmd_feedback_notification_set(self, notification: PORT_CMD_FEEDBACK):
-        debug_info_header(f"<{self.name}:{self.port[0]}> - CMD_FEEDBACK", debug=self._debug)
-        debug_info_begin(f"<{self.name}:{self.port[0]}> - CMD_FEEDBACK: NOTIFICATION-MSG-DETAILS", debug=self._debug)
-        debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: PORT: {notification.m_port[0]}", debug=self._debug)
-        debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: MSG_CONTENT: {notification.COMMAND.hex()}",
-                   debug=self._debug)
+        code = notification.COMMAND[-1]
+        flags = FEEDBACK_FLAGS[code]
+        if self._debug:
+            debug_info_header(f"<{self.name}:{self.port[0]}> - CMD_FEEDBACK", debug=True)
+            debug_info_begin(f"<{self.name}:{self.port[0]}> - CMD_FEEDBACK: NOTIFICATION-MSG-DETAILS", debug=True)
+            debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: PORT: {notification.m_port[0]}", debug=True)
+            debug_info(f"<{self.name}:{self.port[0]}> - <CMD_FEEDBACK]: MSG_CONTENT: {notification.COMMAND.hex()}",
+                       debug=True)
         
-        if notification.COMMAND[len(notification.COMMAND) - 1] == int.from_bytes(b'\x01', 'little'):
-        
-            debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS: CMD STARTED",
-                       debug=self._debug)
-            debug_info(
-                f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS CODE: {notification.COMMAND[len(notification.COMMAND) - 1]}",
-                debug=self._debug)
+        if flags.EMPTY_BUF_CMD_IN_PROGRESS:
+            if self._debug:
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS: CMD STARTED",
+                           debug=True)
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]: CMD-STATUS CODE: {code}",
+                           debug=True)
         
             self._set_cmd_running(True)
             self._port_free.clear()
             self._motor_a.port_free.clear()
             self._motor_b.port_free.clear()
             
-            debug_info_end(
-                f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
-                debug=self._debug)
+            if self._debug:
+                debug_info_end(
+                    f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
+                    debug=True)
 
-        elif notification.COMMAND[len(notification.COMMAND) - 1] == int.from_bytes(b'\x0a', 'little'):
-            debug_info(f"PORT {notification.m_port[0]}: RECEIVED CMD_STATUS: CMD FINISHED ", debug=self._debug)
-            debug_info(f"STATUS: {notification.COMMAND[len(notification.COMMAND) - 1]}", debug=self._debug)
+        elif flags.EMPTY_BUF_CMD_COMPLETED:
+            if self._debug:
+                debug_info(f"PORT {notification.m_port[0]}: RECEIVED CMD_STATUS: CMD FINISHED ", debug=True)
+                debug_info(f"STATUS: {code}", debug=True)
             
             self._set_cmd_running(False)
             self._port_free.set()
             self._motor_a.port_free.set()
             self._motor_b.port_free.set()
 
-            debug_info_end(
-                    f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
-                    debug=self._debug)
+            if self._debug:
+                debug_info_end(
+                        f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS:{notification.m_port[0]}",
+                        debug=True)
         else:
-            debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:REPORTED CMD-STATUS: CMD DISCARDED",
-                       debug=self._debug)
-            debug_info(
-                    f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:CMD-STATUS CODE: {notification.COMMAND[len(notification.COMMAND) - 1]}",
-                    debug=self._debug)
+            if self._debug:
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:REPORTED CMD-STATUS: CMD DISCARDED",
+                           debug=True)
+                debug_info(f"[{self.name}:{notification.m_port[0]}]-[CMD_FEEDBACK]:CMD-STATUS CODE: {code}",
+                           debug=True)
             
             self._set_cmd_running(False)
             self._port_free.set()
             self._motor_a.port_free.set()
             self._motor_b.port_free.set()
 
-        debug_info_end(f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS", debug=self._debug)
-        debug_info_footer(f"<{self.name}:{self.port[0]}> -[CMD_FEEDBACK]", debug=self._debug)
+        if self._debug:
+            debug_info_end(f"[{self.name}:{self.port[0]}]-[CMD_FEEDBACK]: NOTIFICATION-MSG-DETAILS", debug=True)
+            debug_info_footer(f"<{self.name}:{self.port[0]}> -[CMD_FEEDBACK]", debug=True)
         self._cmd_feedback_log.append((datetime.timestamp(datetime.now()), notification.m_cmd_status))
         self._current_cmd_feedback_notification = notification
         return
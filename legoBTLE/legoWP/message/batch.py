@@ -0,0 +1,173 @@
+# coding=utf-8
+"""
+    legoBTLE.legoWP.message.batch
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Decoding of many ``PORT_VALUE`` messages at once into a NumPy structured array.
+
+    Creating one :class:`legoBTLE.legoWP.message.upstream.PORT_VALUE` per frame does not scale to the millions of
+    frames of a recorded session. :func:`decode_port_values` decodes all ``PORT_VALUE`` frames of a buffer or of a
+    list of frames in one go and returns one row per frame, see :data:`PORT_VALUE_DTYPE`. Frames of other message
+    types are skipped, so that the upstream traffic can be passed as is.
+
+    The frame layout is the one of :data:`legoBTLE.legoWP.message.decoder.PORT_VALUE_FORMATS`: length, hub_id,
+    message type, port and the value as int8, int16 or int32, depending on the length. ``PORT_VALUE`` frames of other
+    lengths, i.e., combined values, are skipped as well.
+
+    Example::
+
+        from legoBTLE.legoWP.message.batch import decode_traffic_log
+        from legoBTLE.networking.recorder import TrafficReplay
+
+        values = decode_traffic_log(TrafficReplay('traffic.lbtr'))
+        port0 = values[values['port'] == 0]
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import math
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+from legoBTLE.legoWP.message.decoder import Buffer
+from legoBTLE.legoWP.message.decoder import PORT_VALUE_FORMATS
+from legoBTLE.legoWP.message.decoder import UPS_PORT_VALUE
+
+# one row per PORT_VALUE message, timestamp as recorded in ns, 0 if unknown
+PORT_VALUE_DTYPE: np.dtype = np.dtype([
+        ('timestamp', '<u8'),
+        ('port', 'u1'),
+        ('value', '<i4'),
+        ('deg', '<f8'),
+        ('rad', '<f8'),
+        ])
+
+# the NumPy type of the value by the message length, derived from the struct formats
+VALUE_DTYPES: Dict[int, np.dtype] = {length: np.dtype(f"<{fmt.format[-1]}") for length, fmt in
+                                     PORT_VALUE_FORMATS.items()}
+
+DEG_TO_RAD: float = math.pi / 180
+
+
+def frame_offsets(data: Buffer) -> np.ndarray:
+    """The offsets of the frames in `data`.
+
+    Parameters
+    ----------
+    data : Buffer
+        Frames one after the other, each starting with its length byte.
+
+    Returns
+    -------
+    np.ndarray
+        The offset of each frame.
+
+    Raises
+    ------
+    ValueError
+        If a frame has length 0 or the last frame is cut off.
+
+    """
+    offsets = []
+    append = offsets.append
+    offset, end = 0, len(data)
+    while offset < end:
+        length = data[offset]
+        if length == 0:
+            raise ValueError(f"[batch]-[ERR]: FRAME OF LENGTH 0 AT OFFSET {offset}...")
+        append(offset)
+        offset += length
+    if offset != end:
+        raise ValueError(f"[batch]-[ERR]: LAST FRAME AT OFFSET {offsets[-1]} IS CUT OFF...")
+    return np.array(offsets, dtype=np.int64)
+
+
+def decode_port_values(frames: Union[Buffer, Sequence[Buffer]],
+                       timestamps: Optional[Sequence[int]] = None) -> np.ndarray:
+    """Decodes the ``PORT_VALUE`` messages among `frames`.
+
+    Parameters
+    ----------
+    frames : Union[Buffer, Sequence[Buffer]]
+        Either one buffer with the frames one after the other, as sent by the server, or a sequence of frames.
+        Each frame starts with its length byte.
+    timestamps : Sequence[int], optional
+        The timestamp of each frame, of all frames, not only the ``PORT_VALUE`` frames.
+
+    Returns
+    -------
+    np.ndarray
+        A structured array of :data:`PORT_VALUE_DTYPE`, one row per ``PORT_VALUE`` frame in the original order.
+
+    """
+    if isinstance(frames, (bytes, bytearray, memoryview)):
+        buffer = frames
+        offsets = frame_offsets(buffer)
+    else:
+        lengths = np.fromiter(map(len, frames), dtype=np.int64, count=len(frames))
+        buffer = b''.join(frames)
+        offsets = np.cumsum(lengths) - lengths
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.uint64)
+    return _decode(np.frombuffer(buffer, dtype=np.uint8), offsets, timestamps)
+
+
+def _decode(raw: np.ndarray, offsets: np.ndarray, timestamps: Optional[np.ndarray]) -> np.ndarray:
+    lengths = raw[offsets]
+    selected = (raw[offsets + 2] == UPS_PORT_VALUE) & np.isin(lengths, tuple(VALUE_DTYPES))
+    offsets, lengths = offsets[selected], lengths[selected]
+
+    values = np.zeros(len(offsets), dtype=PORT_VALUE_DTYPE)
+    if timestamps is not None:
+        values['timestamp'] = timestamps[selected]
+    values['port'] = raw[offsets + 3]
+    for length, value_dtype in VALUE_DTYPES.items():
+        rows = np.flatnonzero(lengths == length)
+        if rows.size:
+            columns = offsets[rows, np.newaxis] + np.arange(4, length)
+            values['value'][rows] = raw[columns].view(value_dtype)[:, 0]
+    values['deg'] = values['value']
+    values['rad'] = values['deg'] * DEG_TO_RAD
+    return values
+
+
+def decode_traffic_log(replay) -> np.ndarray:
+    """Decodes the ``PORT_VALUE`` messages of a traffic log.
+
+    Parameters
+    ----------
+    replay : legoBTLE.networking.recorder.TrafficReplay
+        The log.
+
+    Returns
+    -------
+    np.ndarray
+        A structured array of :data:`PORT_VALUE_DTYPE` with the recorded timestamps.
+
+    """
+    from legoBTLE.networking.recorder import DIRECTION
+    from legoBTLE.networking.recorder import FILE_HEADER
+    from legoBTLE.networking.recorder import RECORD_HEADER
+
+    # only the record offsets are found one by one, like in TrafficReplay.__iter__, the rest is vectorized
+    data = replay.data
+    header_size, unused = RECORD_HEADER.size, bytes(8)
+    records = []
+    append = records.append
+    offset, end = FILE_HEADER.size, len(data) - header_size
+    while offset <= end:
+        if data[offset:offset + 8] == unused:
+            break
+        append(offset)
+        offset += header_size + (data[offset + 12] | data[offset + 13] << 8)
+    records = np.array(records, dtype=np.int64)
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    records = records[raw[records + 8] == DIRECTION.UPSTREAM]
+    timestamps = raw[records[:, np.newaxis] + np.arange(8)].view('<u8')[:, 0]
+    return _decode(raw, records + header_size, timestamps)
@@ -0,0 +1,140 @@
+# coding=utf-8
+"""
+    legoBTLE.legoWP.message.decoder
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Fast decoding of the frequent upstream messages.
+
+    The dataclasses of :mod:`legoBTLE.legoWP.message.upstream` are created through the generated ``__init__``,
+    which calls ``__post_init__``, which slices the ``COMMAND``. The functions here create instances of the very same
+    classes, with the same public attributes, in a single call:
+
+    *  the value is read with a precompiled :class:`struct.Struct` straight from the received buffer,
+    *  single bytes, e.g., ``m_port``, are taken from a table instead of being sliced.
+
+    A ``bytes`` or ``bytearray`` is kept as ``COMMAND`` like the classes do, a ``memoryview`` is copied first, as it
+    usually refers to a receive buffer that is reused. The header and the derived attributes, e.g.,
+    ``m_port_value_RAD`` or ``m_cmd_status``, are computed on access by the classes themselves.
+
+    Only ``PORT_VALUE`` and ``PORT_CMD_FEEDBACK`` are worth it, see ``benchmarks/bench_upstream_decode.py``.
+
+    Importing the module registers these decoders in :data:`legoBTLE.legoWP.message.upstream.UPSTREAM_REGISTRY`.
+
+    Example::
+
+        from legoBTLE.legoWP.message.decoder import decode
+        msg = decode(b'\\x08\\x00\\x45\\x00\\xd5\\x02\\x00\\x00')  # PORT_VALUE, msg.m_port_value == 725.0
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import struct
+from typing import Dict
+from typing import Tuple
+from typing import Union
+
+from legoBTLE.legoWP.message.upstream import PORT_CMD_FEEDBACK
+from legoBTLE.legoWP.message.upstream import PORT_VALUE
+from legoBTLE.legoWP.message.upstream import UPSTREAM_MESSAGE
+from legoBTLE.legoWP.message.upstream import UPSTREAM_REGISTRY
+from legoBTLE.legoWP.message.upstream import register_upstream
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+UPS_PORT_CMD_FEEDBACK: int = MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0]
+
+# the single byte strings 0x00 to 0xff
+BYTE: Tuple[bytes, ...] = tuple(bytes((i,)) for i in range(256))
+
+# the value of a PORT_VALUE message by the length of the message, i.e., by the size of the value: int8, int16 or
+# int32
+PORT_VALUE_FORMATS: Dict[int, struct.Struct] = {
+        5: struct.Struct('<4xb'),
+        6: struct.Struct('<4xh'),
+        8: struct.Struct('<4xi'),
+        }
+_unpack_value = {length: fmt.unpack_from for length, fmt in PORT_VALUE_FORMATS.items()}
+_new = object.__new__
+
+
+def decode_port_value(data: Buffer) -> PORT_VALUE:
+    """Decodes a ``PORT_VALUE`` message.
+
+    Parameters
+    ----------
+    data : Buffer
+        The message, starting with its length byte.
+
+    Returns
+    -------
+    PORT_VALUE
+        The message, as if created by ``PORT_VALUE(data)``.
+
+    """
+    if type(data) is memoryview:
+        data = bytearray(data)
+    msg = _new(PORT_VALUE)
+    msg.COMMAND = data
+    msg.m_port = BYTE[data[3]]
+    unpack = _unpack_value.get(len(data))
+    if unpack is not None:
+        msg.m_port_value = float(unpack(data)[0])
+    else:
+        msg.m_port_value = float(int.from_bytes(data[4:], 'little', signed=True))
+    return msg
+
+
+def decode_port_cmd_feedback(data: Buffer) -> PORT_CMD_FEEDBACK:
+    """Decodes a ``PORT_CMD_FEEDBACK`` message.
+
+    Parameters
+    ----------
+    data : Buffer
+        The message, starting with its length byte.
+
+    Returns
+    -------
+    PORT_CMD_FEEDBACK
+        The message, as if created by ``PORT_CMD_FEEDBACK(data)``.
+
+    """
+    if type(data) is memoryview:
+        data = bytearray(data)
+    msg = _new(PORT_CMD_FEEDBACK)
+    msg.COMMAND = data
+    msg.m_port = BYTE[data[3]]
+    length = data[0]
+    if length >= 0x07:
+        msg.m_port_a = data[5]
+        if length >= 0x09:
+            msg.m_port_b = data[7]
+    return msg
+
+
+# the message types decoded here, they accept any buffer and copy a memoryview
+DECODERS = {
+        UPS_PORT_VALUE: decode_port_value,
+        UPS_PORT_CMD_FEEDBACK: decode_port_cmd_feedback,
+        }
+for _m_type, _decoder in DECODERS.items():
+    register_upstream(_m_type, decode=_decoder)
+
+
+def decode(data: Buffer) -> UPSTREAM_MESSAGE:
+    """Decodes any upstream message with the decoder registered for its type.
+
+    Returns
+    -------
+    UPSTREAM_MESSAGE
+        The message, ``None`` for unknown message types.
+
+    """
+    entry = UPSTREAM_REGISTRY[data[2]]
+    if entry is None:
+        return None
+    if type(data) is not bytearray and data[2] not in DECODERS:
+        data = bytearray(data)
+    return entry.decode(data)
@@ -14,13 +14,12 @@
 
 # UPS == UPSTREAM === FROM DEVICE
 # DNS == DOWNSTREAM === TO DEVICE
-import uuid
 from dataclasses import dataclass
 from dataclasses import field
 from typing import Union
 
-import bitstring
-
+from legoBTLE.legoWP.message import encoder
+from legoBTLE.legoWP.message.encoder import command_id
 from legoBTLE.legoWP.types import COMMAND_STATUS
 from legoBTLE.legoWP.types import CONNECTION
 from legoBTLE.legoWP.types import HUB_ACTION
@@ -31,17 +30,27 @@ from legoBTLE.legoWP.types import MESSAGE_TYPE
 from legoBTLE.legoWP.types import MOVEMENT
 from legoBTLE.legoWP.types import PERIPHERAL_EVENT
 from legoBTLE.legoWP.types import PORT
+from legoBTLE.legoWP.types import REFLEX_RULE
 from legoBTLE.legoWP.types import SERVER_SUB_COMMAND
 from legoBTLE.legoWP.types import SUB_COMMAND
 from legoBTLE.legoWP.types import WRITEDIRECT_MODE
 
 
+def _length(command: bytearray) -> bytes:
+    """The length byte of a message without handle and length byte."""
+    return (1 + len(command)).to_bytes(1, 'little', signed=True)
+
+
+def _profile(use_profile: int, use_acc_profile: int, use_dec_profile: int) -> int:
+    return (use_profile << 2) + use_acc_profile + use_dec_profile
+
+
 @dataclass
 class CMD_COMMON_MESSAGE_HEADER:
     m_type: bytes = field(init=True)
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.hub_id: bytes = b'\x00'
         self.header: bytearray = bytearray(self.hub_id[:1] + self.m_type[:1])
 
@@ -72,7 +81,7 @@ class CMD_SET_ACC_DEACC_PROFILE(DOWNSTREAM_MESSAGE):
     profile_nr: int = 0
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         if self.time_to_full_zero_speed in range(0, 10000):
             if isinstance(self.port, PORT):
                 self.port: bytes = self.port.value
@@ -81,19 +90,16 @@ class CMD_SET_ACC_DEACC_PROFILE(DOWNSTREAM_MESSAGE):
             else:
                 self.port: bytes = self.port
             
-            self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD).header
-            self.COMMAND: bytearray = bytearray(
-                    self.header +
-                    self.port +
-                    bitstring.Bits(uintle=(self.start_cond & self.completion_cond), length=8).bytes +
-                    self.profile_type +
-                    self.time_to_full_zero_speed.to_bytes(2, 'little', signed=False) +
-                    self.profile_nr.to_bytes(1, 'little', signed=False)
+            layout = encoder.ACC_DEACC_PROFILE
+            self.header: bytearray = bytearray(layout.header)
+            self.COMMAND: bytearray = layout.encode(
+                    self.port[0],
+                    int(self.start_cond & self.completion_cond),
+                    self.profile_type,
+                    self.time_to_full_zero_speed.__index__(),
+                    self.profile_nr.__index__(),
                     )
-            self.m_length = (1 + len(self.COMMAND)).to_bytes(1, 'little', signed=False)
-            self.COMMAND = bytearray(self.handle
-                                     + self.m_length
-                                     + self.COMMAND)
+            self.m_length = layout.m_length
         else:
             raise ValueError(f"[{self.port[0]}:CMD_SET_ACC_DEACC_PROFILE]-[ERR]: time_to_full_zero_speed = "
                              f"{self.time_to_full_zero_speed} exceeds the range limit of [0..10000]...")
@@ -103,12 +109,14 @@ class CMD_SET_ACC_DEACC_PROFILE(DOWNSTREAM_MESSAGE):
 @dataclass
 class CMD_EXT_SRV_CONNECT_REQ(DOWNSTREAM_MESSAGE):
     port: Union[PORT, int, bytes] = field(init=True)
+    # subscribe read-only instead of registering as the owner of the port
+    observe: bool = field(init=True, default=False)
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\x00'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
-        self.subCMD = SERVER_SUB_COMMAND.REG_W_SERVER
+        self.subCMD = SERVER_SUB_COMMAND.OBSERVE_W_SERVER if self.observe else SERVER_SUB_COMMAND.REG_W_SERVER
         if isinstance(self.port, PORT):
             self.port: bytes = self.port.value
         elif isinstance(self.port, int):
@@ -122,7 +130,7 @@ class CMD_EXT_SRV_CONNECT_REQ(DOWNSTREAM_MESSAGE):
                         + self.port
                         + self.subCMD)
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -141,14 +149,128 @@ class CMD_EXT_SRV_DISCONNECT_REQ(DOWNSTREAM_MESSAGE):
     port: Union[PORT, int, bytes] = field(init=True, default=b'')
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\x00'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
         self.subCMD = SERVER_SUB_COMMAND.DISCONNECT_F_SERVER
         
         self.COMMAND = self.header + self.port + self.subCMD
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
+        
+        self.COMMAND = bytearray(
+                self.handle +
+                self.m_length +
+                self.COMMAND
+                )
+        return
+
+
+@dataclass
+class CMD_EXT_SRV_MAX_RATE_REQ(DOWNSTREAM_MESSAGE):
+    """Asks the server to send at most `max_rate` PORT_VALUE notifications per second of `port`, 0 for all."""
+    port: Union[PORT, int, bytes] = field(init=True)
+    max_rate: int = field(init=True, default=0)
+    
+    def __post_init__(self):
+        self.id: bytes = command_id()
+        self.handle: bytes = b'\x00'
+        self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
+        self.subCMD = SERVER_SUB_COMMAND.SET_MAX_RATE
+        if isinstance(self.port, PORT):
+            self.port: bytes = self.port.value
+        elif isinstance(self.port, int):
+            self.port: bytes = int.to_bytes(self.port, length=1, byteorder='little', signed=False)
+        elif not isinstance(self.port, bytes):
+            raise TypeError(f"PORT NR HAS WRONG TYPE: {type(self.port)} -> Union[PORT, int, bytes]...")
+        
+        self.COMMAND = (self.header
+                        + self.port
+                        + int.to_bytes(self.max_rate, length=2, byteorder='little', signed=False)
+                        + self.subCMD)
+        
+        self.m_length: bytes = _length(self.COMMAND)
+        
+        self.COMMAND = bytearray(
+                self.handle +
+                self.m_length +
+                self.COMMAND
+                )
+        return
+
+
+@dataclass
+class CMD_EXT_SRV_REFLEX_REQ(DOWNSTREAM_MESSAGE):
+    """Asks the server to send `action` to the Hub by itself whenever the notifications of `port` meet `rule`.
+    
+    The meaning of `a` and `b` depends on the rule, see :mod:`legoBTLE.networking.reflex`:
+    
+    *  :attr:`REFLEX_RULE.STALL`: `a` is the minimum change of the value, `b` the window in milliseconds,
+    *  :attr:`REFLEX_RULE.RISING`, :attr:`REFLEX_RULE.FALLING`, :attr:`REFLEX_RULE.CROSSING`: `a` is the threshold.
+    
+    `action` is a port output command to the same port, e.g., the STOP of the motor; the server refuses any other.
+    """
+    port: Union[PORT, int, bytes] = field(init=True)
+    rule: Union[bytes, int] = field(init=True, default=REFLEX_RULE.STALL)
+    a: int = field(init=True, default=0)
+    b: int = field(init=True, default=0)
+    action: Union[DOWNSTREAM_MESSAGE, bytearray, bytes] = field(init=True, default=b'')
+    
+    def __post_init__(self):
+        self.id: bytes = command_id()
+        self.handle: bytes = b'\x00'
+        self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
+        self.subCMD = SERVER_SUB_COMMAND.ADD_REFLEX
+        if isinstance(self.port, PORT):
+            self.port: bytes = self.port.value
+        elif isinstance(self.port, int):
+            self.port: bytes = int.to_bytes(self.port, length=1, byteorder='little', signed=False)
+        elif not isinstance(self.port, bytes):
+            raise TypeError(f"PORT NR HAS WRONG TYPE: {type(self.port)} -> Union[PORT, int, bytes]...")
+        if isinstance(self.rule, int):
+            self.rule: bytes = int.to_bytes(self.rule, length=1, byteorder='little', signed=False)
+        # the action as the server writes it to the Hub, i.e., starting with its length byte
+        if isinstance(self.action, DOWNSTREAM_MESSAGE):
+            self.action: bytes = bytes(self.action.COMMAND[1:])
+        
+        self.COMMAND = (self.header
+                        + self.port
+                        + self.rule
+                        + int.to_bytes(self.a, length=4, byteorder='little', signed=True)
+                        + int.to_bytes(self.b, length=4, byteorder='little', signed=True)
+                        + self.action
+                        + self.subCMD)
+        
+        self.m_length: bytes = _length(self.COMMAND)
+        
+        self.COMMAND = bytearray(
+                self.handle +
+                self.m_length +
+                self.COMMAND
+                )
+        return
+
+
+@dataclass
+class CMD_EXT_SRV_REFLEX_CLEAR_REQ(DOWNSTREAM_MESSAGE):
+    """Asks the server to remove all reflex rules this client added for `port`."""
+    port: Union[PORT, int, bytes] = field(init=True)
+    
+    def __post_init__(self):
+        self.id: bytes = command_id()
+        self.handle: bytes = b'\x00'
+        self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
+        self.subCMD = SERVER_SUB_COMMAND.CLEAR_REFLEX
+        if isinstance(self.port, PORT):
+            self.port: bytes = self.port.value
+        elif isinstance(self.port, int):
+            self.port: bytes = int.to_bytes(self.port, length=1, byteorder='little', signed=False)
+        elif not isinstance(self.port, bytes):
+            raise TypeError(f"PORT NR HAS WRONG TYPE: {type(self.port)} -> Union[PORT, int, bytes]...")
+        
+        self.COMMAND = self.header + self.port + self.subCMD
+        
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -163,13 +285,13 @@ class EXT_SRV_CONNECTED_SND(DOWNSTREAM_MESSAGE):
     port: Union[PORT, int, bytes] = field(init=True, default=b'')
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\xff'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
         
         self.COMMAND = self.header + self.port + PERIPHERAL_EVENT.EXT_SRV_CONNECTED
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -184,13 +306,13 @@ class EXT_SRV_DISCONNECTED_SND(DOWNSTREAM_MESSAGE):
     port: Union[PORT, int, bytes] = field(init=True, default=b'')
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\xff'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[:1]).header
         
         self.COMMAND = self.header + self.port + PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -205,12 +327,12 @@ class CMD_HUB_ACTION_HUB_SND(DOWNSTREAM_MESSAGE):
     hub_action: bytes = field(init=True, default=HUB_ACTION.DNS_HUB_FAST_SHUTDOWN)
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\x0f'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_HUB_ACTION[:1]).header
         self.COMMAND = self.header + bytearray(self.hub_action)
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -225,7 +347,7 @@ class HUB_ALERT_UPDATE_REQ(DOWNSTREAM_MESSAGE):
     hub_alert: bytes = field(init=True, default=HUB_ALERT_TYPE.LOW_V)
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\x0f'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_HUB_ALERT[:1]).header
         self.hub_alert_op: bytes = HUB_ALERT_OP.DNS_UPDATE_REQUEST
@@ -236,7 +358,7 @@ class HUB_ALERT_UPDATE_REQ(DOWNSTREAM_MESSAGE):
                 self.hub_alert_op
                 )
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -252,7 +374,7 @@ class HUB_ALERT_NOTIFICATION_REQ(DOWNSTREAM_MESSAGE):
     hub_alert_op: bytes = field(init=True, default=HUB_ALERT_OP.DNS_UPDATE_ENABLE)
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle: bytes = b'\x0f'
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_HUB_ALERT[:1]).header
         
@@ -262,7 +384,7 @@ class HUB_ALERT_NOTIFICATION_REQ(DOWNSTREAM_MESSAGE):
                 self.hub_alert_op
                 )
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -286,7 +408,7 @@ class CMD_PORT_NOTIFICATION_DEV_REQ(DOWNSTREAM_MESSAGE):
     notif_enabled: bytes = field(init=True, default=COMMAND_STATUS.ENABLED)
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_NOTIFICATION[:1]).header
         self.COMMAND = bytearray(self.header +
                                  self.port +
@@ -295,7 +417,7 @@ class CMD_PORT_NOTIFICATION_DEV_REQ(DOWNSTREAM_MESSAGE):
                                  b'\x00' * (4 - len(self.delta_interval)) +
                                  self.notif_enabled)
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(
                 self.handle +
@@ -342,39 +464,23 @@ class CMD_START_PWR_DEV(DOWNSTREAM_MESSAGE):
     use_dec_profile: int = MOVEMENT.USE_DEC_PROFILE
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         ports = [self.port, ]
         ports = list(map(lambda x: x.value if isinstance(x, PORT) else x, ports))
         [self.port, ] = list(
                 map(lambda x: x.to_bytes(1, 'little', signed=False) if isinstance(x, int) else x, ports))
         
-        self.COMMAND: bytearray = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(uintle=(self.start_cond & self.completion_cond), length=8).bytes
-                )
-                
+        startup_completion = int(self.start_cond & self.completion_cond)
         if self.synced:
-            self.COMMAND += bytearray(
-                    SUB_COMMAND.START_PWR_UNREGULATED_SYNC +
-                    (
-                            bitstring.Bits(intle=(self.power_a), length=8).bytes +
-                            bitstring.Bits(intle=(self.power_b), length=8).bytes
-                        )
-                    )
-            self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+            layout = encoder.START_PWR_SYNC
+            self.COMMAND: bytearray = layout.encode(self.port[0], startup_completion,
+                                                    SUB_COMMAND.START_PWR_UNREGULATED_SYNC,
+                                                    int(self.power_a), int(self.power_b))
         else:
-            self.COMMAND += bytearray(
-                    bitstring.Bits(intle=(self.power), length=8).bytes
-                    )
-            self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-
-        self.COMMAND: bytearray = bytearray(
-                self.handle +
-                self.m_length +
-                self.COMMAND
-                )
+            layout = encoder.START_PWR
+            self.COMMAND: bytearray = layout.encode(self.port[0], startup_completion, int(self.power))
+        self.m_length: bytes = layout.m_length
         return
     
     # a: CMD_START_PWR_DEV = CMD_START_PWR_DEV(port=PORT.LED, direction=MOVEMENT.HOLD, power=-90)
@@ -416,43 +522,27 @@ class CMD_START_SPEED_DEV(DOWNSTREAM_MESSAGE):
     use_dec_profile: int = MOVEMENT.USE_DEC_PROFILE
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         ports = [self.port, ]
         ports = list(map(lambda x: x.value if isinstance(x, PORT) else x, ports))
         [self.port, ] = list(
                 map(lambda x: x.to_bytes(1, 'little', signed=False) if isinstance(x, int) else x, ports))
         
+        startup_completion = int(self.start_cond & self.completion_cond)
+        profile = int(_profile(self.use_profile, self.use_acc_profile, self.use_dec_profile))
         if self.synced:
             self.subCmd: bytes = SUB_COMMAND.TURN_SPD_UNLIMITED_SYNC
-            maxSpdEff_CCWCW: bytearray = bytearray(
-                    bitstring.Bits(intle=(self.speed_a), length=8).bytes +
-                    bitstring.Bits(intle=(self.speed_b), length=8).bytes
-                    )
+            layout = encoder.START_SPEED_SYNC
+            self.COMMAND: bytearray = layout.encode(self.port[0], startup_completion, self.subCmd,
+                                                    int(self.speed_a), int(self.speed_b), int(self.abs_max_power),
+                                                    profile)
         else:
             self.subCmd: bytes = SUB_COMMAND.TURN_SPD_UNLIMITED
-            maxSpdEff_CCWCW: bytearray = bytearray(
-                    bitstring.Bits(intle=(self.speed), length=8).bytes
-                    )
-        
-        self.COMMAND: bytearray = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(self.start_cond & self.completion_cond), length=8).bytes +
-                self.subCmd +
-                maxSpdEff_CCWCW +
-                bitstring.Bits(uintle=self.abs_max_power, length=8).bytes +
-                bitstring.Bits(uintle=((self.use_profile << 2) + self.use_acc_profile + self.use_dec_profile),
-                               length=8).bytes
-                )
-        
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-        
-        self.COMMAND: bytearray = bytearray(
-                self.handle +
-                self.m_length +
-                self.COMMAND
-                )
+            layout = encoder.START_SPEED
+            self.COMMAND: bytearray = layout.encode(self.port[0], startup_completion, self.subCmd,
+                                                    int(self.speed), int(self.abs_max_power), profile)
+        self.m_length: bytes = layout.m_length
         return
     
     # a: CMD_START_SPEED_DEV = CMD_START_SPEED_DEV(synced=False, speed=-90, abs_max_power=100, port=b'\x03')
@@ -476,46 +566,27 @@ class CMD_START_MOVE_DEV_TIME(DOWNSTREAM_MESSAGE):
     use_dec_profile: int = MOVEMENT.USE_DEC_PROFILE
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         ports = [self.port, ]
         ports = list(map(lambda x: x.value if isinstance(x, PORT) else x, ports))
         [self.port, ] = list(
                 map(lambda x: x.to_bytes(1, 'little', signed=False) if isinstance(x, int) else x, ports))
         
-        self.subCMD: bytes
-        speedEff: bytes
+        startup_completion = int(self.start_cond & self.completion_cond)
+        profile = int(_profile(self.use_profile, self.use_acc_profile, self.use_dec_profile))
         if self.synced:
             self.subCMD: bytes = SUB_COMMAND.TURN_FOR_TIME_SYNC
-            speedEff: bytearray = bytearray(
-                    bitstring.Bits(intle=self.speed_a, length=8).bytes +
-                    bitstring.Bits(intle=self.speed_b, length=8).bytes
-                    )
+            layout = encoder.MOVE_TIME_SYNC
+            self.COMMAND = layout.encode(self.port[0], startup_completion, self.subCMD, int(self.time),
+                                         int(self.speed_a), int(self.speed_b), int(self.power),
+                                         int(self.on_completion), profile)
         else:
             self.subCMD: bytes = SUB_COMMAND.TURN_FOR_TIME
-            speedEff: bytearray = bytearray(
-                    bitstring.Bits(intle=self.speed, length=8).bytes
-                    )
-        
-        self.COMMAND = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(self.start_cond & self.completion_cond), length=8).bytes +
-                self.subCMD +
-                bitstring.Bits(uintle=self.time, length=16).bytes +
-                speedEff +
-                bitstring.Bits(uintle=self.power, length=8).bytes +
-                bitstring.Bits(intle=self.on_completion, length=8).bytes +
-                bitstring.Bits(uintle=((self.use_profile << 2) + self.use_acc_profile + self.use_dec_profile),
-                               length=8).bytes
-                )
-        
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-        
-        self.COMMAND = bytearray(self.handle +
-                                 self.m_length +
-                                 self.COMMAND
-                                 )
+            layout = encoder.MOVE_TIME
+            self.COMMAND = layout.encode(self.port[0], startup_completion, self.subCMD, int(self.time),
+                                         int(self.speed), int(self.power), int(self.on_completion), profile)
+        self.m_length: bytes = layout.m_length
         return
     
     # a: CMD_START_MOVE_DEV_TIME = CMD_START_MOVE_DEV_TIME(port=b'\x03', synced=False, speed=23, time=2560,
@@ -541,7 +612,7 @@ class CMD_START_MOVE_DEV_DEGREES(DOWNSTREAM_MESSAGE):
     use_dec_profile: int = MOVEMENT.USE_DEC_PROFILE
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         
         if isinstance(self.port, PORT):
@@ -551,16 +622,16 @@ class CMD_START_MOVE_DEV_DEGREES(DOWNSTREAM_MESSAGE):
         else:
             self.port: bytes = self.port
             
-        speedEff: bytes
+        startup_completion = int(self.start_cond & self.completion_cond)
+        profile = int(_profile(self.use_profile, self.use_acc_profile, self.use_dec_profile))
         if self.synced:
             self.subCMD: bytes = SUB_COMMAND.TURN_FOR_DEGREES_SYNC
-            speedEff: bytearray = bytearray(
-                    bitstring.Bits(intle=self.speed_a, length=8).bytes +
-                    bitstring.Bits(intle=self.speed_b, length=8).bytes
-                    )
+            layout = encoder.MOVE_DEGREES_SYNC
+            speedEff = (int(self.speed_a), int(self.speed_b))
         else:
             self.subCMD: bytes = SUB_COMMAND.TURN_FOR_DEGREES
-            speedEff: bytearray = bytearray(int.to_bytes(self.speed, 1, 'little', signed=True))
+            layout = encoder.MOVE_DEGREES
+            speedEff = (self.speed.__index__(),)
         
         # tachoL: int = ((self.degrees * 2) * abs(self.speed_a) * _sign(self.speed_a)) / \
         #              (abs(self.speed_a) + abs(self.speed_b))
@@ -568,25 +639,9 @@ class CMD_START_MOVE_DEV_DEGREES(DOWNSTREAM_MESSAGE):
         # tachoR: int = ((self.degrees * 2) * abs(self.speed_b) * _sign(self.speed_b)) / \
         #              (abs(self.speed_a) + abs(self.speed_b))
         
-        self.COMMAND = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(self.start_cond & self.completion_cond), length=8).bytes +
-                self.subCMD +
-                bitstring.Bits(intle=self.degrees, length=32).bytes +
-                speedEff +
-                bitstring.Bits(intle=self.abs_max_power, length=8).bytes +
-                bitstring.Bits(intle=self.on_completion, length=8).bytes +
-                bitstring.Bits(uintle=((self.use_profile << 2) + self.use_acc_profile + self.use_dec_profile),
-                               length=8).bytes
-                )
-        
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-        
-        self.COMMAND = bytearray(self.handle
-                                 + self.m_length
-                                 + self.COMMAND
-                                 )
+        self.COMMAND = layout.encode(self.port[0], startup_completion, self.subCMD, int(self.degrees), *speedEff,
+                                     int(self.abs_max_power), int(self.on_completion), profile)
+        self.m_length: bytes = layout.m_length
         return
         
         # a: CMD_START_MOVE_DEV_DEGREES = CMD_START_MOVE_DEV_DEGREES(synced=False, port=b'\x05', speed=72,
@@ -648,7 +703,7 @@ class CMD_GOTO_ABS_POS_DEV(DOWNSTREAM_MESSAGE):
         #
         # tachoR: int = ((self.degrees * 2) * abs(self.speed_b) * _sign(self.speed_b)) / \
         #               (abs(self.speed_a) + abs(self.speed_b))
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         
         if isinstance(self.port, PORT):
@@ -660,35 +715,16 @@ class CMD_GOTO_ABS_POS_DEV(DOWNSTREAM_MESSAGE):
         
         if self.synced:
             self.subCMD: bytes = SUB_COMMAND.GOTO_ABSOLUTE_POS_SYNC
-            absPosEff: bytearray = bytearray(
-                    bitstring.Bits(intle=(int(round(self.abs_pos_a * self.gearRatio))), length=32).bytes +
-                    bitstring.Bits(intle=(int(round(self.abs_pos_b * self.gearRatio))), length=32).bytes
-                    )
+            layout = encoder.GOTO_ABS_POS_SYNC
+            absPosEff = (int(round(self.abs_pos_a * self.gearRatio)), int(round(self.abs_pos_b * self.gearRatio)))
         else:
             self.subCMD: bytes = SUB_COMMAND.GOTO_ABSOLUTE_POS
-            absPosEff: bytearray = bytearray(
-                    bitstring.Bits(intle=(int(round(self.abs_pos * self.gearRatio))), length=32).bytes
-                    )
-        self.COMMAND = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(self.start_cond & self.completion_cond), length=8).bytes +
-                self.subCMD +
-                absPosEff +
-                bitstring.Bits(intle=self.speed, length=8).bytes +
-                bitstring.Bits(intle=self.abs_max_power, length=8).bytes +
-                bitstring.Bits(intle=self.on_completion, length=8).bytes +
-                bitstring.Bits(intle=((self.use_profile << 2) + self.use_acc_profile + self.use_dec_profile),
-                               length=8).bytes
-                )
-        
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-        
-        self.COMMAND = bytearray(
-                self.handle +
-                self.m_length +
-                self.COMMAND
-                )
+            layout = encoder.GOTO_ABS_POS
+            absPosEff = (int(round(self.abs_pos * self.gearRatio)),)
+        self.COMMAND = layout.encode(self.port[0], int(self.start_cond & self.completion_cond), self.subCMD,
+                                     *absPosEff, int(self.speed), int(self.abs_max_power), int(self.on_completion),
+                                     int(_profile(self.use_profile, self.use_acc_profile, self.use_dec_profile)))
+        self.m_length: bytes = layout.m_length
         return
 
 
@@ -708,7 +744,7 @@ class CMD_SETUP_DEV_VIRTUAL_PORT(DOWNSTREAM_MESSAGE):
     port_b: Union[PORT, int, bytes] = None
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_VIRTUAL_PORT_SETUP[:1]).header
         if isinstance(self.port_a, PORT):
             self.port_a: bytes = self.port_a.value
@@ -741,13 +777,12 @@ class CMD_SETUP_DEV_VIRTUAL_PORT(DOWNSTREAM_MESSAGE):
                     self.port
                     )
         
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
+        self.m_length: bytes = _length(self.COMMAND)
         
         self.COMMAND = bytearray(self.handle +
                                  self.m_length +
                                  self.COMMAND
                                  )
-        print(f"VIRT SETUP COMMAND: {self.COMMAND.hex()}")
         return
 
 
@@ -775,7 +810,7 @@ class CMD_SET_POSITION_L_R(DOWNSTREAM_MESSAGE):
     dev_value_b: int = 0  # stops and sets to zero
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         """The values for the attributes for this command are set.
         
         Returns
@@ -796,20 +831,10 @@ class CMD_SET_POSITION_L_R(DOWNSTREAM_MESSAGE):
         else:
             self.port: bytes = self.port
         
-        self.COMMAND: bytearray = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(start_cond & completion_cond), length=8).bytes +
-                self.sub_cmd +
-                bitstring.Bits(intle=self.dev_value_a, length=32).bytes +
-                bitstring.Bits(intle=self.dev_value_b, length=32).bytes
-                )
-        
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-        
-        self.COMMAND = bytearray(self.handle +
-                                 self.m_length +
-                                 self.COMMAND)
+        layout = encoder.SET_POSITION_L_R
+        self.COMMAND: bytearray = layout.encode(self.port[0], int(start_cond & completion_cond), self.sub_cmd,
+                                                int(self.dev_value_a), int(self.dev_value_b))
+        self.m_length: bytes = layout.m_length
         return
 
 
@@ -846,7 +871,7 @@ class CMD_MODE_DATA_DIRECT(DOWNSTREAM_MESSAGE):
     color: int = HUB_COLOR.BLUE
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         # same as MESSAGE_TYPE.DNS_PORT_CMD[:1] but we got MESSAGE_TYPE initialized on the way.
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         self.sub_cmd: bytes = SUB_COMMAND.WRITE_DIRECT_MODE_DATA
@@ -858,52 +883,46 @@ class CMD_MODE_DATA_DIRECT(DOWNSTREAM_MESSAGE):
         else:
             self.port: bytes = self.port
         
-        self.COMMAND: bytearray = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(self.start_cond & self.completion_cond), length=8).bytes +
-                self.sub_cmd +
-                self.preset_mode
-                )
-        
+        startup_completion = int(self.start_cond & self.completion_cond)
+        # SET_LED_COLOR and SET_MOTOR_POWER share the same mode byte, SET_LED_COLOR is tested first
         if self.preset_mode == WRITEDIRECT_MODE.SET_LED_RGB:
-            self.COMMAND: bytearray = bytearray(
-                    self.COMMAND +
-                    bitstring.Bits(intle=self.red, length=8).bytes +
-                    bitstring.Bits(intle=self.green, length=8).bytes +
-                    bitstring.Bits(intle=self.blue, length=8).bytes
-                    )
+            layout = encoder.WRITE_DIRECT_RGB
+            values = (int(self.red), int(self.green), int(self.blue))
         elif self.preset_mode == WRITEDIRECT_MODE.SET_LED_COLOR:
-            self.COMMAND: bytearray = bytearray(
-                    self.COMMAND +
-                    bitstring.Bits(intle=self.color, length=8).bytes
-                    )
+            layout = encoder.WRITE_DIRECT_VALUE
+            values = (int(self.color),)
         elif self.preset_mode == WRITEDIRECT_MODE.SET_POSITION:
             if self.synced:
-                self.COMMAND: bytearray = bytearray(
-                        self.COMMAND +
-                        bitstring.Bits(intle=int(round(self.motor_position * self.gearRatio)), length=32).bytes +
-                        bitstring.Bits(intle=int(round(self.motor_position_a * self.gearRatio)), length=32).bytes +
-                        bitstring.Bits(intle=int(round(self.motor_position_b * self.gearRatio)), length=32).bytes
-                        )
+                layout = encoder.WRITE_DIRECT_POSITION_SYNC
+                values = (int(round(self.motor_position * self.gearRatio)),
+                          int(round(self.motor_position_a * self.gearRatio)),
+                          int(round(self.motor_position_b * self.gearRatio)))
             else:
-                self.COMMAND: bytearray = bytearray(
-                        self.COMMAND +
-                        bitstring.Bits(intle=int(round(self.motor_position * self.gearRatio)), length=32).bytes
-                        )
+                layout = encoder.WRITE_DIRECT_POSITION
+                values = (int(round(self.motor_position * self.gearRatio)),)
         elif self.preset_mode == WRITEDIRECT_MODE.SET_MOTOR_POWER:
+            layout = encoder.WRITE_DIRECT_VALUE
+            values = (int(self.motor_power),)
+        else:
+            layout = None
+        
+        if layout is not None:
+            self.COMMAND: bytearray = layout.encode(self.port[0], startup_completion, self.sub_cmd,
+                                                    self.preset_mode, *values)
+            self.m_length: bytes = layout.m_length
+        else:
             self.COMMAND: bytearray = bytearray(
-                    self.COMMAND +
-                    bitstring.Bits(intle=self.motor_power, length=8).bytes
+                    self.header +
+                    self.port +
+                    startup_completion.to_bytes(1, 'little', signed=True) +
+                    self.sub_cmd +
+                    self.preset_mode
                     )
-        
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-        
-        self.COMMAND = bytearray(self.handle +
-                                 self.m_length +
-                                 self.COMMAND
-                                 )
-        print(self.COMMAND.hex())
+            self.m_length: bytes = _length(self.COMMAND)
+            self.COMMAND = bytearray(self.handle +
+                                     self.m_length +
+                                     self.COMMAND
+                                     )
         return
 
 
@@ -923,7 +942,7 @@ class CMD_GENERAL_NOTIFICATION_HUB_REQ(DOWNSTREAM_MESSAGE):
     COMMAND: bytearray = bytearray(b'\x0f\x04\x00\x01\x00')
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.handle = b'\x0f'
         self.length = b'\x04'
         self.header = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.UPS_DNS_GENERAL_HUB_NOTIFICATIONS[:1]).header
@@ -935,7 +954,7 @@ class CMD_HW_RESET(DOWNSTREAM_MESSAGE):
     port: Union[PORT, int, bytes]
     
     def __post_init__(self):
-        self.id: bytes = uuid.uuid4().bytes
+        self.id: bytes = command_id()
         self.header: bytearray = CMD_COMMON_MESSAGE_HEADER(MESSAGE_TYPE.DNS_PORT_CMD[:1]).header
         self.sub_cmd: bytes = SUB_COMMAND.WRITE_DIRECT
         start_cond: int = MOVEMENT.ONSTART_EXEC_IMMEDIATELY
@@ -948,21 +967,8 @@ class CMD_HW_RESET(DOWNSTREAM_MESSAGE):
         else:
             self.port: bytes = self.port
         
-        self.COMMAND: bytearray = bytearray(
-                self.header +
-                self.port +
-                bitstring.Bits(intle=(start_cond & completion_cond), length=8).bytes +
-                self.sub_cmd +
-                b'\xd4' +
-                b'\x11'
-                )
-
-        self.COMMAND += (self.COMMAND[-1] ^ self.COMMAND[-2] ^ 0xff).to_bytes(1, 'little', signed=False)
-
-        self.m_length: bytes = bitstring.Bits(intle=(1 + len(self.COMMAND)), length=8).bytes
-
-        self.COMMAND = bytearray(self.handle +
-                                 self.m_length +
-                                 self.COMMAND
-                                 )
+        layout = encoder.HW_RESET
+        self.COMMAND: bytearray = layout.encode(self.port[0], int(start_cond & completion_cond), self.sub_cmd,
+                                                b'\xd4\x11', 0x11 ^ 0xd4 ^ 0xff)
+        self.m_length: bytes = layout.m_length
         return
@@ -0,0 +1,140 @@
+# coding=utf-8
+"""
+    legoBTLE.legoWP.message.encoder
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Fast encoding of the downstream messages.
+
+    Each downstream message of fixed length is described by a :class:`Layout`: the message type and its fields in
+    the :mod:`struct` format characters. The layout precompiles one :class:`struct.Struct` for the whole message,
+    i.e., handle, length, hub_id, message type and the fields, so that encoding a message is a single
+    ``pack_into``, either into a new ``bytearray`` or into a preallocated buffer.
+
+    The classes of :mod:`legoBTLE.legoWP.message.downstream` encode their ``COMMAND`` with the layouts defined here.
+
+    Example::
+
+        from legoBTLE.legoWP.message.encoder import START_SPEED
+        command = START_SPEED.encode(0x00, 0x11, 0x07, 50, 100, 0x03)
+        # command == bytearray(b'\\x0e\\x09\\x00\\x81\\x00\\x11\\x07\\x32\\x64\\x03')
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import itertools
+import struct
+from typing import Dict
+from typing import Tuple
+
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+
+HUB_ID: int = 0x00
+# the handle of DOWNSTREAM_MESSAGE
+HANDLE: int = 0x0e
+
+_command_ids = itertools.count(1)
+
+
+def command_id() -> bytes:
+    """A new id for a downstream message.
+
+    The ids are 16 bytes long, like the ``uuid4`` used before, and unique within the process.
+    """
+    return next(_command_ids).to_bytes(16, 'little')
+
+
+class Layout:
+    """The layout of a downstream message of fixed length.
+
+    Parameters
+    ----------
+    m_type : bytes
+        The message type, e.g., ``MESSAGE_TYPE.DNS_PORT_CMD``.
+    fields : str
+        The fields following the common message header, as blank separated ``name:format`` pairs with a
+        :mod:`struct` format character each, e.g., ``'port:B speed:b'``.
+    handle : int, default HANDLE
+        The first byte of the message.
+
+    """
+
+    __slots__ = ('names', 'formats', 'fields', 'struct', 'size', 'm_length', 'header', '_prefix')
+
+    def __init__(self, m_type: bytes, fields: str, handle: int = HANDLE):
+        names, formats = zip(*(f.split(':') for f in fields.split()))
+        self.names: Tuple[str, ...] = names
+        self.formats: Tuple[str, ...] = formats
+        # the offset in the message and the struct of each field on its own
+        self.fields: Dict[str, Tuple[int, struct.Struct]] = {}
+        offset = 4
+        for name, fmt in zip(names, formats):
+            field_struct = struct.Struct('<' + fmt)
+            self.fields[name] = (offset, field_struct)
+            offset += field_struct.size
+        self.struct: struct.Struct = struct.Struct('<BBBB' + ''.join(formats))
+        self.size: int = self.struct.size
+        # the length byte counts everything but the handle
+        self.m_length: bytes = bytes((self.size - 1,))
+        self.header: bytes = bytes((HUB_ID, m_type[0]))
+        self._prefix: Tuple[int, int, int, int] = (handle, self.size - 1, HUB_ID, m_type[0])
+        return
+
+    def encode(self, *values, out: bytearray = None, offset: int = 0) -> bytearray:
+        """Encodes a message with the field `values`.
+
+        Parameters
+        ----------
+        values :
+            The values of the fields in the order of the layout.
+        out : bytearray, optional
+            The buffer to write the message into, a new one if not given.
+        offset : int, default 0
+            Where to write the message in `out`.
+
+        Returns
+        -------
+        bytearray
+            The buffer.
+
+        Raises
+        ------
+        struct.error
+            If a value does not fit its field.
+
+        """
+        if out is None:
+            out = bytearray(self.size)
+        self.struct.pack_into(out, offset, *self._prefix, *values)
+        return out
+
+
+_PORT_CMD: bytes = MESSAGE_TYPE.DNS_PORT_CMD
+
+# startup_completion is start_cond & completion_cond, use_profile is (use_profile << 2) + use_acc + use_dec
+ACC_DEACC_PROFILE = Layout(_PORT_CMD, 'port:B startup_completion:B profile_type:c time:H profile_nr:B')
+START_PWR = Layout(_PORT_CMD, 'port:B startup_completion:B power:b')
+START_PWR_SYNC = Layout(_PORT_CMD, 'port:B startup_completion:B sub_cmd:2s power_a:b power_b:b')
+START_SPEED = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c speed:b abs_max_power:B use_profile:B')
+START_SPEED_SYNC = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c speed_a:b speed_b:b abs_max_power:B '
+                                     'use_profile:B')
+MOVE_TIME = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c time:H speed:b power:B on_completion:b '
+                              'use_profile:B')
+MOVE_TIME_SYNC = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c time:H speed_a:b speed_b:b power:B '
+                                   'on_completion:b use_profile:B')
+MOVE_DEGREES = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c degrees:i speed:b abs_max_power:b '
+                                 'on_completion:b use_profile:B')
+MOVE_DEGREES_SYNC = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c degrees:i speed_a:b speed_b:b '
+                                      'abs_max_power:b on_completion:b use_profile:B')
+GOTO_ABS_POS = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c abs_pos:i speed:b abs_max_power:b '
+                                 'on_completion:b use_profile:b')
+GOTO_ABS_POS_SYNC = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c abs_pos_a:i abs_pos_b:i speed:b '
+                                      'abs_max_power:b on_completion:b use_profile:b')
+SET_POSITION_L_R = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c dev_value_a:i dev_value_b:i')
+WRITE_DIRECT_POSITION = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c preset_mode:c motor_position:i')
+WRITE_DIRECT_POSITION_SYNC = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c preset_mode:c motor_position:i '
+                                               'motor_position_a:i motor_position_b:i')
+WRITE_DIRECT_RGB = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c preset_mode:3s red:b green:b blue:b')
+# the color of the Hub LED or the motor power
+WRITE_DIRECT_VALUE = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c preset_mode:c value:b')
+HW_RESET = Layout(_PORT_CMD, 'port:B startup_completion:b sub_cmd:c reset:2s checksum:B')
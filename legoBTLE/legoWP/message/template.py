@@ -0,0 +1,220 @@
+# coding=utf-8
+"""
+    legoBTLE.legoWP.message.template
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Pre-encoded downstream commands of which only some fields change.
+
+    Most commands a motor sends differ only in one or two fields, e.g., the speed of
+    :class:`legoBTLE.legoWP.message.downstream.CMD_START_SPEED_DEV`, while port, sub-command and start/completion
+    condition stay the same. A :class:`CommandTemplate` encodes such a command once, with all constant fields, and
+    afterwards only patches the variable fields in place through the :class:`legoBTLE.legoWP.message.encoder.Layout`
+    of the command. The length byte belongs to the layout and is checked once, when the template is created.
+
+    :class:`CommandCache` holds the templates and, in a bounded LRU, the most recent fully encoded commands, so
+    that exact repeats, e.g., ``STOP``, are neither patched nor encoded.
+
+    Example::
+
+        from legoBTLE.legoWP.message import encoder
+        from legoBTLE.legoWP.message.downstream import CMD_START_SPEED_DEV
+        from legoBTLE.legoWP.message.template import COMMANDS
+
+        command = COMMANDS.command(CMD_START_SPEED_DEV, encoder.START_SPEED, {'port': 0x00},
+                                   speed=50, abs_max_power=100)
+        # command.COMMAND == CMD_START_SPEED_DEV(port=0x00, speed=50, abs_max_power=100).COMMAND
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any
+from typing import Dict
+from typing import Tuple
+from typing import Type
+
+from legoBTLE.legoWP.message.downstream import DOWNSTREAM_MESSAGE
+from legoBTLE.legoWP.message.encoder import Layout
+from legoBTLE.legoWP.message.encoder import command_id
+
+
+class CommandTemplate:
+    """A command with constant fields and variable fields that are patched in place.
+
+    Parameters
+    ----------
+    cls : Type[DOWNSTREAM_MESSAGE]
+        The class of the command.
+    layout : Layout
+        The layout of the command, its field names are those the variable fields are set by.
+    constants : Dict[str, Any]
+        The arguments of `cls` that are the same for all commands of this template.
+    values :
+        The initial variable fields, arguments of `cls` as well.
+
+    Raises
+    ------
+    ValueError
+        If the command `cls` creates does not have the length of `layout`.
+
+    """
+
+    __slots__ = ('cls', 'layout', 'prototype', '_buffer', '_attributes')
+
+    def __init__(self, cls: Type[DOWNSTREAM_MESSAGE], layout: Layout, constants: Dict[str, Any], **values):
+        self.cls: Type[DOWNSTREAM_MESSAGE] = cls
+        self.layout: Layout = layout
+        # a complete command, the instances are copies of it with the variable fields updated
+        self.prototype: DOWNSTREAM_MESSAGE = cls(**constants, **values)
+        if len(self.prototype.COMMAND) != layout.size or self.prototype.COMMAND[1] != layout.size - 1:
+            raise ValueError(f"[{cls.__name__}]-[ERR]: COMMAND {self.prototype.COMMAND.hex()} DOES NOT MATCH A "
+                             f"LAYOUT OF {layout.size} BYTES...")
+        self._buffer: bytearray = bytearray(self.prototype.COMMAND)
+        # the layout fields that are attributes of the command as well
+        self._attributes: frozenset = frozenset(f.name for f in fields(cls)).intersection(layout.names)
+        return
+
+    @property
+    def data(self) -> bytes:
+        """The command as currently patched."""
+        return bytes(self._buffer)
+
+    def set(self, **values) -> 'CommandTemplate':
+        """Patches the variable fields in place.
+
+        Parameters
+        ----------
+        values :
+            The new values by the field names of the layout.
+
+        Returns
+        -------
+        CommandTemplate
+            This template.
+
+        Raises
+        ------
+        KeyError
+            If a field is not part of the layout.
+        struct.error
+            If a value does not fit its field.
+
+        """
+        layout_fields = self.layout.fields
+        for name, value in values.items():
+            offset, field_struct = layout_fields[name]
+            field_struct.pack_into(self._buffer, offset, value)
+        return self
+
+    def command(self, **values) -> DOWNSTREAM_MESSAGE:
+        """A new command from this template.
+
+        Parameters
+        ----------
+        values :
+            The variable fields that change, by the field names of the layout.
+
+        Returns
+        -------
+        DOWNSTREAM_MESSAGE
+            An instance of the template's class with its own copy of the patched ``COMMAND``.
+
+        """
+        if values:
+            self.set(**values)
+        return self._message(self._buffer, values)
+
+    def _message(self, data: bytes, values: Dict[str, Any]) -> DOWNSTREAM_MESSAGE:
+        msg = self.cls.__new__(self.cls)
+        attributes = msg.__dict__ = self.prototype.__dict__.copy()
+        if self._attributes.issuperset(values):
+            attributes.update(values)
+        else:
+            attributes.update((name, values[name]) for name in self._attributes.intersection(values))
+        attributes['id'] = command_id()
+        attributes['COMMAND'] = bytearray(data)
+        return msg
+
+
+class CommandCache:
+    """The templates of the commands sent and the most recent encoded commands.
+
+    Parameters
+    ----------
+    max_templates : int, default 64
+        The number of templates kept.
+    max_commands : int, default 256
+        The number of encoded commands kept for exact repeats.
+
+    """
+
+    def __init__(self, max_templates: int = 64, max_commands: int = 256):
+        self._max_templates: int = max_templates
+        self._max_commands: int = max_commands
+        self._templates: 'OrderedDict[Tuple, CommandTemplate]' = OrderedDict()
+        self._commands: 'OrderedDict[Tuple[CommandTemplate, Tuple], bytes]' = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        return
+
+    def template(self, cls: Type[DOWNSTREAM_MESSAGE], layout: Layout, constants: Dict[str, Any],
+                 **values) -> CommandTemplate:
+        """The template for `cls` with the arguments `constants`, created with `values` if not in the cache."""
+        key = (cls, layout, tuple(constants.items()))
+        template = self._templates.get(key)
+        if template is None:
+            template = self._templates[key] = CommandTemplate(cls, layout, constants, **values)
+            if len(self._templates) > self._max_templates:
+                self._templates.popitem(last=False)
+        else:
+            self._templates.move_to_end(key)
+        return template
+
+    def command(self, cls: Type[DOWNSTREAM_MESSAGE], layout: Layout, constants: Dict[str, Any],
+                **values) -> DOWNSTREAM_MESSAGE:
+        """A new command, from the encoded commands if an exact repeat, otherwise from its template.
+
+        Parameters
+        ----------
+        cls : Type[DOWNSTREAM_MESSAGE]
+            The class of the command.
+        layout : Layout
+            The layout of the command.
+        constants : Dict[str, Any]
+            The arguments of `cls` that are the same for all commands of the template.
+        values :
+            The variable fields by the field names of the layout.
+
+        Returns
+        -------
+        DOWNSTREAM_MESSAGE
+            An instance of `cls`, as if created by ``cls(**constants, **values)``.
+
+        """
+        template = self.template(cls, layout, constants, **values)
+        # the templates are unique per key, the encoded commands are therefore keyed by the template itself
+        key = (template, tuple(values.items()))
+        data = self._commands.get(key)
+        if data is not None:
+            self.hits += 1
+            self._commands.move_to_end(key)
+            return template._message(data, values)
+
+        self.misses += 1
+        command = template.command(**values)
+        self._commands[key] = bytes(command.COMMAND)
+        if len(self._commands) > self._max_commands:
+            self._commands.popitem(last=False)
+        return command
+
+    def clear(self):
+        """Removes all templates and encoded commands."""
+        self._templates.clear()
+        self._commands.clear()
+        return
+
+
+# the cache shared by all devices of the process
+COMMANDS: CommandCache = CommandCache()
@@ -18,16 +18,21 @@
 import math
 from collections import defaultdict
 from dataclasses import dataclass
-from dataclasses import field
-
-import numpy as np
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
 
 import legoBTLE
 from legoBTLE.legoWP import types
 from legoBTLE.legoWP.common_message_header import COMMON_MESSAGE_HEADER
-from legoBTLE.legoWP.types import CMD_FEEDBACK
+from legoBTLE.legoWP.types import CMD_FEEDBACK_FLAGS
 from legoBTLE.legoWP.types import CMD_RETURN_CODE
 from legoBTLE.legoWP.types import DEVICE_TYPE
+from legoBTLE.legoWP.types import FEEDBACK_FLAGS
 from legoBTLE.legoWP.types import HUB_ACTION
 from legoBTLE.legoWP.types import MESSAGE_TYPE
 from legoBTLE.legoWP.types import PERIPHERAL_EVENT
@@ -37,10 +42,11 @@ from legoBTLE.networking.prettyprint.debug import debug_info
 class UpStreamMessageBuilder:
     """Generates the various Message types for returned data from the server.
     
+    The message type byte selects the decoder from :data:`UPSTREAM_REGISTRY`.
+    
     """
     def __init__(self, data, debug=False):
         self._data: bytearray = data
-        self._header = COMMON_MESSAGE_HEADER(data[:3])
         self._debug: bool = debug
         self._lastBuildPort: int = -1
         return
@@ -51,66 +57,24 @@ class UpStreamMessageBuilder:
         Returns
         -------
         UPSTREAM_MESSAGE
-            The upstream message determined by the header.
+            The upstream message determined by the header, ``None`` for unknown message types.
             
         """
-        debug_info(f"[{self.__class__.__name__}]-[MSG]: DATA RECEIVED FOR PORT [{self._data[3]}], "
-                   f"STARTING UPSTREAMBUILDING: "
-                   f"{self._data.hex()}, {self._data[2]}\r\n RAW: {self._data}\r\nMESSAGE_TYPE: {self._header.m_type.hex()}", debug=self._debug)
-        if self._header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ACTION:
-            debug_info(f"GENERATING HUB_ACTION_NOTIFICATION for PORT {self._data[3]}", debug=self._debug)
-            ret = HUB_ACTION_NOTIFICATION(self._data)
-            self._lastBuildPort = -1
-            return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO:
-            debug_info(f"GENERATING HUB_ATTACHED_IO_NOTIFICATION for PORT {self._data[3]}", debug=self._debug)
-            ret = HUB_ATTACHED_IO_NOTIFICATION(self._data)
-            self._lastBuildPort = ret.m_port
-            return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR:
-            debug_info(f"GENERATING DEV_GENERIC_ERROR_NOTIFICATION for PORT {self._data[3]}", debug=self._debug)
-            ret = DEV_GENERIC_ERROR_NOTIFICATION(self._data)
-            self._lastBuildPort = -1
-            return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK:
-            debug_info(f"GENERATING PORT_CMD_FEEDBACK for PORT {self._data[3]}", debug=self._debug)
-            ret = PORT_CMD_FEEDBACK(self._data)
-            self._lastBuildPort = ret.m_port
-            return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_PORT_VALUE:
-            debug_info(f"GENERATING PORT_VALUE for PORT {self._data[3]}", debug=self._debug)
-            ret = PORT_VALUE(self._data)
-            self._lastBuildPort = ret.m_port
-            return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_PORT_NOTIFICATION:
-            debug_info(f"GENERATING DEV_PORT_NOTIFICATION for PORT {self._data[3]}", debug=self._debug)
-            ret = DEV_PORT_NOTIFICATION(self._data)
-            self._lastBuildPort = ret.m_port
-            return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD:
-            if self._data[-1] == PERIPHERAL_EVENT.EXT_SRV_RECV:
-                debug_info(f"GENERATING EXT_SERVER_CMD_ACK for PORT {self._data[3]}", debug=self._debug)
-                ret = EXT_SERVER_CMD_ACK(self._data)
-                return ret
-            else:
-                debug_info(f"GENERATING EXT_SERVER_NOTIFICATION for PORT {self._data[3]}", debug=self._debug)
-                ret = EXT_SERVER_NOTIFICATION(self._data)
-                return ret
-        
-        elif self._header.m_type == MESSAGE_TYPE.UPS_DNS_HUB_ALERT:
-            debug_info(f"GENERATING HUB_ALERT_NOTIFICATION for PORT {self._data[3]}", debug=self._debug)
-            ret = HUB_ALERT_NOTIFICATION(self._data)
-            self._lastBuildPort = ret.m_port
-            return ret
-        else:
-            debug_info(f"EXCEPTION TypeError PORT {self._data[3]}", debug=self._debug)
-            pass
+        data = self._data
+        entry = UPSTREAM_REGISTRY[data[2]]
+        if self._debug:
+            debug_info(f"[{self.__class__.__name__}]-[MSG]: DATA RECEIVED FOR PORT [{data[3]}], "
+                       f"STARTING UPSTREAMBUILDING: "
+                       f"{data.hex()}, {data[2]}\r\n RAW: {data}\r\nMESSAGE_TYPE: {data[2:3].hex()}", debug=True)
+        if entry is None:
+            if self._debug:
+                debug_info(f"EXCEPTION TypeError PORT {data[3]}", debug=True)
+            return None
+        if self._debug:
+            debug_info(f"GENERATING {entry.name} for PORT {data[3]}", debug=True)
+        ret = entry.decode(data)
+        self._lastBuildPort = getattr(ret, 'm_port', -1)
+        return ret
             
     @property
     def lastBuildPort(self) -> int:
@@ -126,79 +90,118 @@ class UPSTREAM_MESSAGE:
     """UPSTREAM_MESSAGE
 
     Absolute base class for all message of type :class:`UPSTREAM_MESSAGE`.
+    
+    The messages keep their attributes in ``__slots__``. Names, e.g., ``m_port_value_RAD`` or the ``*_str`` fields,
+    that are derived from other attributes are properties computed on access, ``m_header`` is created on first
+    access.
 
     """
+    __slots__ = ('_m_header',)
+    
     def __init__(self):
         self.m_header = None
-    pass
+    
+    @property
+    def m_header(self) -> COMMON_MESSAGE_HEADER:
+        header = getattr(self, '_m_header', None)
+        if header is None:
+            header = self._m_header = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
+        return header
+    
+    @m_header.setter
+    def m_header(self, header: COMMON_MESSAGE_HEADER):
+        self._m_header = header
 
 
 @dataclass
 class HUB_ACTION_NOTIFICATION(UPSTREAM_MESSAGE):
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_return')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_return = self.COMMAND[:-2:-1]
-        self.m_return_str: str = _key_name(HUB_ACTION, self.m_return)
+    
+    @property
+    def m_return_str(self) -> str:
+        return _key_name(HUB_ACTION, self.m_return)
 
 
 @dataclass
 class HUB_ATTACHED_IO_NOTIFICATION(UPSTREAM_MESSAGE):
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_port', 'm_io_event', 'm_device_type', 'm_port_a', 'm_port_b')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
 
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_port: bytes = self.COMMAND[3:4]
         self.m_io_event: bytes = self.COMMAND[4:5]
         if self.m_io_event == PERIPHERAL_EVENT.IO_ATTACHED:
             self.m_device_type = self.COMMAND[5:6]
-            self.m_device_type_str = _key_name(DEVICE_TYPE, self.m_device_type)
         if self.m_io_event == PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED:
             self.m_port_a: bytes = self.COMMAND[7:8]
             
             self.m_port_b: bytes = self.COMMAND[8:]
         return
+    
+    @property
+    def m_device_type_str(self) -> str:
+        """The device name, only for ``IO_ATTACHED`` events like ``m_device_type``."""
+        return _key_name(DEVICE_TYPE, self.m_device_type)
 # bytearray(b'\x0f\x00\x04d\x016\x00\x01\x00\x00\x00\x01\x00\x00\x00')
 
 
 @dataclass
 class EXT_SERVER_NOTIFICATION(UPSTREAM_MESSAGE):
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_port', 'm_event')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
         print(f"GENERATING EXT_SERVER_NOTIFICATION: COMMAND: {self.COMMAND}")
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_port: bytes = self.COMMAND[3:4]
         # self.m_cmd_code = self.COMMAND[4:5]
         # self.m_cmd_code_str: str = _key_name(MESSAGE_TYPE, self.m_cmd_code)
-        self.m_event = self.COMMAND[4:5]
-        self.m_event_str = _key_name(PERIPHERAL_EVENT, self.m_event)
+        # the last byte, the acknowledgement of a disconnect request carries the sub-command before the event
+        self.m_event = self.COMMAND[-1:]
         print(f"GENERATING EXT_SERVER_NOTIFICATION: PORT: {self.m_port} / Event: {self.m_event} / EVENT_STR:{self.m_event_str}")
         return
+    
+    @property
+    def m_event_str(self) -> str:
+        return _key_name(PERIPHERAL_EVENT, self.m_event)
 
 
 @dataclass
 class EXT_SERVER_CMD_ACK(EXT_SERVER_NOTIFICATION):
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ()
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
+        return
         
     # a: EXT_SERVER_CMD_ACK = EXT_SERVER_CMD_ACK(b'\x06\x00\x5c\x03\x01\x03')
 
 
 @dataclass
 class DEV_GENERIC_ERROR_NOTIFICATION(UPSTREAM_MESSAGE):
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_error_cmd', 'm_cmd_status')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_error_cmd = self.COMMAND[3:4]
-        self.m_error_cmd_str: str = _key_name(MESSAGE_TYPE, self.m_error_cmd)
         self.m_cmd_status = self.COMMAND[4:5]
-        self.m_cmd_status_str: str = _key_name(CMD_RETURN_CODE, self.m_cmd_status)
+    
+    @property
+    def m_error_cmd_str(self) -> str:
+        return _key_name(MESSAGE_TYPE, self.m_error_cmd)
+    
+    @property
+    def m_cmd_status_str(self) -> str:
+        return _key_name(CMD_RETURN_CODE, self.m_cmd_status)
     
     def __len__(self):
         return len(self.COMMAND)
@@ -211,49 +214,53 @@ class PORT_CMD_FEEDBACK(UPSTREAM_MESSAGE):
     This dataclass disassembles the byte string sent from the hub brick as command feedback for the status
     of the currently processed command.
     
+    ``m_cmd_status`` maps each port of the message to its feedback, the
+    :class:`legoBTLE.legoWP.types.CMD_FEEDBACK_FLAGS` of the feedback byte. It is created on first access.
+    
     .. seealso::
         `LEGO: Port Output Command Feedback <https://lego.github.io/lego-ble-wireless-protocol-docs/index.html#port-output-command-feedback>`_.
     
     """
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_port', 'm_port_a', 'm_port_b', '_m_cmd_status')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
-        self.m_cmd_status = defaultdict()
-        self.m_port = defaultdict()
-        fb_code = CMD_FEEDBACK()
-
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_port: bytes = self.COMMAND[3:4]
-        fb_code.asbyte = self.COMMAND[4]
-        self.m_cmd_status[self.COMMAND[3]] = fb_code.MSG
         if self.COMMAND[0] >= 0x07:
             self.m_port_a = self.COMMAND[5]
-            fb_code.asbyte = self.COMMAND[6]
-            self.m_cmd_status[self.COMMAND[5]] = fb_code.MSG
         if self.COMMAND[0] >= 0x09:
             self.m_port_b = self.COMMAND[7]
-            fb_code.asbyte = self.COMMAND[8]
-            self.m_cmd_status[self.COMMAND[7]] = fb_code.MSG
         return
     
+    @property
+    def m_cmd_status(self) -> Dict[int, CMD_FEEDBACK_FLAGS]:
+        status = getattr(self, '_m_cmd_status', None)
+        if status is None:
+            command = self.COMMAND
+            status = {command[3]: FEEDBACK_FLAGS[command[4]]}
+            if command[0] >= 0x07:
+                status[command[5]] = FEEDBACK_FLAGS[command[6]]
+            if command[0] >= 0x09:
+                status[command[7]] = FEEDBACK_FLAGS[command[8]]
+            self._m_cmd_status = status
+        return status
+    
     # a:PORT_CMD_FEEDBACK = PORT_CMD_FEEDBACK(b'\x05\x00\x82\x10\x0a')
     # a:PORT_CMD_FEEDBACK = PORT_CMD_FEEDBACK(b'\x09\x00\x82\x10\x0a\x03\x08\x02\x04')
     
     def __str__(self) -> str:
         
-        def get_status_str(msg) -> str:
-            if msg is None:
-                return 'None'
-            m_cmd_feedback = CMD_FEEDBACK()
-            m_cmd_feedback.asbyte = msg
-            return str((m_cmd_feedback.MSG.IDLE and 'IDLE')
-                       or (m_cmd_feedback.MSG.CURRENT_CMD_DISCARDED and 'CURRENT_CMD_DISCARDED ')
-                       or (m_cmd_feedback.MSG.EMPTY_BUF_CMD_COMPLETED and 'EMPTY_BUF_CMD_COMPLETED')
-                       or (m_cmd_feedback.MSG.EMPTY_BUF_CMD_IN_PROGRESS and 'EMPTY_BUF_CMD_IN_PROGRESS')
-                       or (m_cmd_feedback.MSG.BUSY and 'BUSY'))
+        def get_status_str(msg: int) -> str:
+            flags = FEEDBACK_FLAGS[msg]
+            return ((flags.IDLE and 'IDLE')
+                    or (flags.CURRENT_CMD_DISCARDED and 'CURRENT_CMD_DISCARDED ')
+                    or (flags.EMPTY_BUF_CMD_COMPLETED and 'EMPTY_BUF_CMD_COMPLETED')
+                    or (flags.EMPTY_BUF_CMD_IN_PROGRESS and 'EMPTY_BUF_CMD_IN_PROGRESS')
+                    or (flags.BUSY and 'BUSY')
+                    or '0')
         
-        return ','.join([get_status_str(self.COMMAND[4]), get_status_str(self.COMMAND[6]),
-                         get_status_str(self.COMMAND[8])]).strip()
+        return ','.join(get_status_str(self.COMMAND[i]) for i in range(4, len(self.COMMAND), 2)).strip()
     
     def __len__(self):
         return self.COMMAND[0]
@@ -270,15 +277,26 @@ class PORT_VALUE(UPSTREAM_MESSAGE):
         
     """
     
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_port', 'm_port_value')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
-        self.m_header: COMMON_MESSAGE_HEADER = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_port: bytes = self.COMMAND[3:4]
         self.m_port_value: float = float(int.from_bytes(self.COMMAND[4:], 'little', signed=True))
-        self.m_port_value_DEG: float = self.m_port_value
-        self.m_port_value_RAD: float = math.pi / 180 * self.m_port_value
-        self.m_direction = np.sign(self.m_port_value)
+    
+    @property
+    def m_port_value_DEG(self) -> float:
+        return self.m_port_value
+    
+    @property
+    def m_port_value_RAD(self) -> float:
+        return math.pi / 180 * self.m_port_value
+    
+    @property
+    def m_direction(self) -> float:
+        """The sign of the value: ``1.0``, ``-1.0`` or ``0.0``."""
+        return float((self.m_port_value > 0) - (self.m_port_value < 0))
     
     def get_port_value_EFF(self, gearRatio: float = 1.0) -> defaultdict:
         """Returns the port value adjusted by the installed gear train (currently a single set is supported).
@@ -311,16 +329,23 @@ class PORT_VALUE(UPSTREAM_MESSAGE):
 
 @dataclass
 class DEV_PORT_NOTIFICATION(UPSTREAM_MESSAGE):
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_port', 'm_unknown', 'm_status')
+    
+    COMMAND: bytearray
+    m_unknown_str = 'MUST BE MODES. IN THIS PROJECT NOT YET IMPLEMENTED'
     
     def __post_init__(self):
-        self.m_header = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_port: bytes = self.COMMAND[3:4]
-        self.m_type_str = _key_name(types.MESSAGE_TYPE, self.m_header.m_type)
         self.m_unknown: bytes = self.COMMAND[4:5]
-        self.m_unknown_str = 'MUST BE MODES. IN THIS PROJECT NOT YET IMPLEMENTED'
         self.m_status = self.COMMAND[-1:]
-        self.m_status_str = _key_name(types.PERIPHERAL_EVENT, self.m_status)
+    
+    @property
+    def m_type_str(self) -> str:
+        return _key_name(types.MESSAGE_TYPE, self.COMMAND[2:3])
+    
+    @property
+    def m_status_str(self) -> str:
+        return _key_name(types.PERIPHERAL_EVENT, self.m_status)
     
     def __len__(self):
         return self.COMMAND[0]
@@ -343,17 +368,101 @@ class HUB_ALERT_NOTIFICATION(UPSTREAM_MESSAGE):
         .. seealso:: `LEGO(c) Hub Alerts <https://lego.github.io/lego-ble-wireless-protocol-docs/index.html#hub-alerts>`_
     
     """
-    COMMAND: bytearray = field(init=True)
+    __slots__ = ('COMMAND', 'm_port', 'hub_alert_type', 'hub_alert_op', 'hub_alert_status')
+    
+    COMMAND: bytearray
     
     def __post_init__(self):
-        self.m_header = COMMON_MESSAGE_HEADER(data=self.COMMAND[:3])
         self.m_port: bytes = self.COMMAND[3:4]
         self.hub_alert_type = self.COMMAND[3:4]
-        self.hub_alert_type_str = _key_name(types.HUB_ALERT_TYPE, self.hub_alert_type)
         self.hub_alert_op = self.COMMAND[4:5]
-        self.hub_alert_op_str = _key_name(types.HUB_ALERT_OP, self.hub_alert_op)
         self.hub_alert_status = self.COMMAND[5:6]
-        self.hub_alert_status_str = _key_name(types.ALERT_STATUS, self.hub_alert_status)
+    
+    @property
+    def hub_alert_type_str(self) -> str:
+        return _key_name(types.HUB_ALERT_TYPE, self.hub_alert_type)
+    
+    @property
+    def hub_alert_op_str(self) -> str:
+        return _key_name(types.HUB_ALERT_OP, self.hub_alert_op)
+    
+    @property
+    def hub_alert_status_str(self) -> str:
+        return _key_name(types.ALERT_STATUS, self.hub_alert_status)
     
     # a: HUB_ALERT_NOTIFICATION = HUB_ALERT_NOTIFICATION(b'\x06\x00\x03\x03\x04\xff') #upstream
     # a: HUB_ALERT_NOTIFICATION = HUB_ALERT_NOTIFICATION(b'\x05\x00\x03\x02\x01') #downstream
+
+
+def _ext_server_message(data: bytearray) -> EXT_SERVER_NOTIFICATION:
+    if data[-1] == PERIPHERAL_EVENT.EXT_SRV_RECV[0]:
+        return EXT_SERVER_CMD_ACK(data)
+    return EXT_SERVER_NOTIFICATION(data)
+
+
+class UpStreamEntry(NamedTuple):
+    """How an upstream message type is decoded and handed to a device.
+    
+    name
+        The message name used in debug output.
+    decode
+        Creates the :class:`UPSTREAM_MESSAGE` from the received data.
+    handle
+        Called with the device and the message, returns the awaitable of the device's handler.
+    """
+    name: str
+    decode: Callable[[bytearray], UPSTREAM_MESSAGE]
+    handle: Callable[[Any, UPSTREAM_MESSAGE], Awaitable]
+
+
+# message type byte -> UpStreamEntry, None for the types that cannot be received
+UPSTREAM_REGISTRY: List[Optional[UpStreamEntry]] = [None] * 256
+
+
+def register_upstream(m_type: int,
+                      name: str = None,
+                      decode: Callable[[bytearray], UPSTREAM_MESSAGE] = None,
+                      handle: Callable[[Any, UPSTREAM_MESSAGE], Awaitable] = None) -> None:
+    """Registers how messages of type `m_type` are decoded and dispatched.
+    
+    Parameters
+    ----------
+    m_type : int
+        The message type byte.
+    name : str, optional
+        The message name, kept if the type is already registered.
+    decode : Callable[[bytearray], UPSTREAM_MESSAGE], optional
+        The decoder, kept if the type is already registered.
+    handle : Callable[[Any, UPSTREAM_MESSAGE], Awaitable], optional
+        The device handler, kept if the type is already registered.
+
+    Returns
+    -------
+    None
+    
+    """
+    current = UPSTREAM_REGISTRY[m_type]
+    if current is not None:
+        name = current.name if name is None else name
+        decode = current.decode if decode is None else decode
+        handle = current.handle if handle is None else handle
+    UPSTREAM_REGISTRY[m_type] = UpStreamEntry(name, decode, handle)
+    return
+
+
+register_upstream(MESSAGE_TYPE.UPS_DNS_HUB_ACTION[0], 'HUB_ACTION_NOTIFICATION', HUB_ACTION_NOTIFICATION,
+                  lambda device, msg: device.hub_action_notification_set(msg))
+register_upstream(MESSAGE_TYPE.UPS_HUB_ATTACHED_IO[0], 'HUB_ATTACHED_IO_NOTIFICATION', HUB_ATTACHED_IO_NOTIFICATION,
+                  lambda device, msg: device.hub_attached_io_notification_set(msg))
+register_upstream(MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR[0], 'DEV_GENERIC_ERROR_NOTIFICATION',
+                  DEV_GENERIC_ERROR_NOTIFICATION, lambda device, msg: device.error_notification_set(msg))
+register_upstream(MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0], 'PORT_CMD_FEEDBACK', PORT_CMD_FEEDBACK,
+                  lambda device, msg: device.cmd_feedback_notification_set(msg))
+register_upstream(MESSAGE_TYPE.UPS_PORT_VALUE[0], 'PORT_VALUE', PORT_VALUE,
+                  lambda device, msg: device.port_value_set(msg))
+register_upstream(MESSAGE_TYPE.UPS_PORT_NOTIFICATION[0], 'DEV_PORT_NOTIFICATION', DEV_PORT_NOTIFICATION,
+                  lambda device, msg: device.port_notification_set(msg))
+register_upstream(MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0], 'EXT_SERVER_NOTIFICATION', _ext_server_message,
+                  lambda device, msg: device.ext_srv_notification_set(msg, device.debug))
+register_upstream(MESSAGE_TYPE.UPS_DNS_HUB_ALERT[0], 'HUB_ALERT_NOTIFICATION', HUB_ALERT_NOTIFICATION,
+                  lambda device, msg: device.hub_alert_notification_set(msg))
@@ -26,6 +26,9 @@
 import ctypes
 from dataclasses import dataclass, field
 from enum import Enum, IntEnum
+from typing import Dict
+from typing import NamedTuple
+from typing import Tuple
 
 import numpy as np
 
@@ -38,16 +41,60 @@ def key_name(cls, value: bytearray):
     Parameters
     ----------
     cls :
+        A class of protocol constants, e.g., :class:`MESSAGE_TYPE`.
     value :
+        The value to look up, a single byte as ``bytes``, ``bytearray`` or ``int``.
 
     Returns
     -------
+    str
+        The name of the constant with this value, ``'NIL'`` if there is none.
 
     """
-    rev = {v.default[0:1]: k for k, v in cls.__new__(cls).__dataclass_fields__.items()}
-    return rev.get(bytes(value), 'NIL')
+    if type(value) is int:
+        return key_name_int(cls, value)
+    names = cls.__dict__.get('NAMES')
+    if names is None:
+        names = _names(cls)
+    return names.get(bytes(value), 'NIL')
 
 
+def key_name_int(cls, value: int) -> str:
+    """The name of the constant in `cls` whose first byte is `value`, ``'NIL'`` if there is none."""
+    names = cls.__dict__.get('NAMES_BY_INT')
+    if names is None:
+        return key_name(cls, bytes((value,)))
+    return names[value]
+
+
+def _names(cls) -> Dict[bytes, str]:
+    # a later constant with the same first byte wins, e.g., WRITEDIRECT_MODE.SET_LED_COLOR
+    return {v.default[0:1]: k for k, v in cls.__dataclass_fields__.items()}
+
+
+def lookup_tables(cls):
+    """Adds the reverse lookup tables to a class of protocol constants.
+
+    The tables are built once, when the class is defined:
+
+    *  ``NAMES``: the name of each constant by its first byte,
+    *  ``NAMES_BY_INT``: the same by the byte as ``int``, a tuple of 256 names with ``'NIL'`` for unused values,
+    *  ``VALUES``: the value of each constant by its name.
+
+    They are class attributes, not fields, and must not be changed.
+    """
+    names = _names(cls)
+    by_int = ['NIL'] * 256
+    for value, name in names.items():
+        if value:
+            by_int[value[0]] = name
+    cls.NAMES = names
+    cls.NAMES_BY_INT = tuple(by_int)
+    cls.VALUES = {k: v.default for k, v in cls.__dataclass_fields__.items()}
+    return cls
+
+
+@lookup_tables
 @dataclass(frozen=True, )
 class DEVICE_TYPE:
     """The various device types the LEGO(c) system can handle.
@@ -71,6 +118,7 @@ class DEVICE_TYPE:
     INTERNAL_LALLES: bytes = field(init=False, default=bytes(b'\x36'))
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class MESSAGE_TYPE:
     """This :dataclass: models the various message types that can occur.
@@ -95,6 +143,7 @@ class MESSAGE_TYPE:
     UPS_PORT_CMD_FEEDBACK: bytes = field(init=False, default=b'\x82')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class HUB_ALERT_TYPE:
     """The various Alerts that can occur.
@@ -107,6 +156,7 @@ class HUB_ALERT_TYPE:
     OVER_PWR_COND: bytes = field(init=False, default=b'\x04')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class HUB_ALERT_OP:
     DNS_UPDATE_ENABLE: bytes = field(init=False, default=b'\x01')
@@ -115,12 +165,14 @@ class HUB_ALERT_OP:
     UPS_UPDATE: bytes = field(init=False, default=b'\x04')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class ALERT_STATUS:
     ALERT: bytes = field(init=False, default=b'\x00')
     OK: bytes = field(init=False, default=b'\x01')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class HUB_ACTION:
     DNS_HUB_SWITCH_OFF: bytes = field(init=False, default=b'\x01')
@@ -136,6 +188,7 @@ class HUB_ACTION:
     UPS_HUB_WILL_BOOT: bytes = field(init=False, default=b'\x32')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class PERIPHERAL_EVENT:
     IO_DETACHED: bytes = field(init=False, default=b'\x00')
@@ -147,6 +200,7 @@ class PERIPHERAL_EVENT:
     EXT_SRV_RECV: bytes = field(init=False, default=b'\x05')
 
 
+@lookup_tables
 @dataclass(frozen=True, )
 class SUB_COMMAND:
     START_PWR_UNREGULATED: bytes = field(init=False, default=b'\x51\x00')
@@ -166,12 +220,33 @@ class SUB_COMMAND:
     WRITE_DIRECT: bytes = field(init=False, default=b'\x50')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class SERVER_SUB_COMMAND:
     REG_W_SERVER: bytes = field(init=False, default=b'\x00')
+    # read-only subscription to the notifications of a port owned by another client
+    OBSERVE_W_SERVER: bytes = field(init=False, default=b'\x01')
+    # maximum number of PORT_VALUE notifications per second the client wants of a port
+    SET_MAX_RATE: bytes = field(init=False, default=b'\x02')
+    # rule the server evaluates on the notifications of a port and the command it then sends, see REFLEX_RULE
+    ADD_REFLEX: bytes = field(init=False, default=b'\x03')
+    CLEAR_REFLEX: bytes = field(init=False, default=b'\x04')
     DISCONNECT_F_SERVER: bytes = field(init=False, default=b'\xdd')
 
 
+@lookup_tables
+@dataclass(frozen=True)
+class REFLEX_RULE:
+    """The conditions of the reflex rules, see :mod:`legoBTLE.networking.reflex`."""
+    # the value changes less than a minimum within a window while a command runs
+    STALL: bytes = field(init=False, default=b'\x01')
+    # the value crosses a threshold upwards, downwards or either way
+    RISING: bytes = field(init=False, default=b'\x02')
+    FALLING: bytes = field(init=False, default=b'\x03')
+    CROSSING: bytes = field(init=False, default=b'\x04')
+
+
+@lookup_tables
 @dataclass(frozen=True)
 class SUB_COMMAND_MODES:
     """
@@ -198,6 +273,30 @@ class CMD_FEEDBACK(ctypes.Union):
                 ("asbyte", c_uint8)]
 
 
+class CMD_FEEDBACK_FLAGS(NamedTuple):
+    """The bits of a command feedback byte as an immutable tuple, with the field names of
+    :class:`CMD_FEEDBACK_MSG`.
+    
+    Look them up in :data:`FEEDBACK_FLAGS` by the feedback byte instead of creating them.
+    """
+    EMPTY_BUF_CMD_IN_PROGRESS: bool
+    EMPTY_BUF_CMD_COMPLETED: bool
+    CURRENT_CMD_DISCARDED: bool
+    IDLE: bool
+    BUSY: bool
+
+
+def _feedback_flags(code: int) -> CMD_FEEDBACK_FLAGS:
+    fb_code = CMD_FEEDBACK()
+    fb_code.asbyte = code
+    return CMD_FEEDBACK_FLAGS(*(bool(getattr(fb_code.MSG, name)) for name in CMD_FEEDBACK_FLAGS._fields))
+
+
+# the feedback bits by feedback byte
+FEEDBACK_FLAGS: Tuple[CMD_FEEDBACK_FLAGS, ...] = tuple(_feedback_flags(code) for code in range(256))
+
+
+@lookup_tables
 @dataclass(frozen=True)
 class CMD_RETURN_CODE:
     RFR: bytes = field(init=False, default=b'\x00')
@@ -213,12 +312,14 @@ class CMD_RETURN_CODE:
     EXEC_FINISHED: bytes = field(init=False, default=b'\x0a')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class COMMAND_STATUS:
     DISABLED: bytes = field(init=False, default=b'\x00')
     ENABLED: bytes = field(init=False, default=b'\x01')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class WRITEDIRECT_MODE:
     SET_POSITION: bytes = field(init=False, default=b'\x02')
@@ -227,6 +328,7 @@ class WRITEDIRECT_MODE:
     SET_LED_RGB: bytes = field(init=False, default=b'\x00\x51\x01')
 
 
+@lookup_tables
 @dataclass(frozen=True)
 class CONNECTION:
     DISCONNECT: bytes = field(init=False, default=b'\x00')
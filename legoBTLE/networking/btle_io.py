@@ -0,0 +1,600 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.btle_io
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    This module holds the classes that move raw data between the bluetooth peripheral (the LEGO(c) Hub) and the
+    event loop of the server.
+
+    The peripheral is never polled. Instead, :class:`BTLEReader` sleeps in :func:`select.select` on the file
+    descriptor the peripheral delivers its notifications through and only talks to the peripheral once data is
+    actually waiting. The delegate of the peripheral is then called in the reader thread and is expected to hand the
+    data over to the event loop with :meth:`asyncio.AbstractEventLoop.call_soon_threadsafe`.
+
+    Note that bluepy's ``waitForNotifications(0)`` does not return at once: a timeout of ``0`` skips the poll and
+    blocks in ``readline()`` until the ``bluepy-helper`` prints the next line. Also, the text stream of the helper's
+    stdout may hold lines that a poll of the descriptor cannot see. The reader therefore replaces that stream by a
+    :class:`HelperOutput` and only calls into the peripheral, with a small positive timeout, while a line is waiting.
+
+    The opposite direction is handled by :class:`BTLEWriter`: commands are queued from the event loop and written to
+    the peripheral by a worker thread, so that the event loop never waits for the radio.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import asyncio
+import os
+import queue
+import select
+import threading
+import time
+from asyncio import AbstractEventLoop
+from collections import deque
+from typing import Callable
+from typing import Optional
+
+from legoBTLE.legoWP.types import C
+
+# seconds bluepy may wait for the rest of a notification that is known to be waiting
+DRAIN_TIMEOUT: float = .001
+# bytes read from the helper's stdout at once
+HELPER_READ_SIZE: int = 1 << 12
+
+try:
+    from bluepy.btle import BTLEInternalError
+except ImportError:  # bluepy is only available on posix systems with the bluez stack
+    class BTLEInternalError(Exception):
+        pass
+
+
+def notification_fd(peripheral) -> int:
+    """Returns the file descriptor on which the peripheral signals incoming notifications.
+
+    A bluepy ``Peripheral`` receives everything through the stdout pipe of its ``bluepy-helper`` process. Other
+    peripherals, e.g., simulated ones, can provide the descriptor themselves through a method ``fileno()``.
+
+    Parameters
+    ----------
+    peripheral :
+        The peripheral, e.g., a bluepy ``Peripheral``.
+
+    Returns
+    -------
+    int
+        The file descriptor that becomes readable when notifications are waiting.
+
+    Raises
+    ------
+    TypeError
+        If the peripheral offers no file descriptor to wait on.
+
+    """
+    if callable(getattr(peripheral, 'fileno', None)):
+        return peripheral.fileno()
+    try:
+        return peripheral._helper.stdout.fileno()
+    except AttributeError:
+        raise TypeError(f"[{peripheral!r}]-[ERR]: PERIPHERAL OFFERS NO FILE DESCRIPTOR TO WAIT FOR NOTIFICATIONS...")
+
+
+class HelperOutput:
+    """The stdout of a ``bluepy-helper`` process, buffered such that waiting lines can be seen.
+
+    bluepy reads the helper's responses and notifications line by line from a text stream, which may read ahead
+    several lines at once, while it polls the descriptor beneath before each line. A line that has been read ahead
+    is therefore only processed once the helper prints the next one. This class replaces both the stream and the
+    poller of a bluepy ``Peripheral``, its :meth:`poll` also reports the lines already read, see
+    :func:`install_helper_output`. Lines read ahead by another thread, e.g., by ``writeCharacteristic`` waiting for
+    its response, make :attr:`wakeup_fd` readable.
+
+    Parameters
+    ----------
+    stdout :
+        The stdout of the helper process, closed by :meth:`close`.
+
+    """
+
+    def __init__(self, stdout):
+        self._stdout = stdout
+        self._fd: int = stdout.fileno()
+        self._buffer: bytearray = bytearray()
+        self._poller = select.poll()
+        self._poller.register(self._fd, select.POLLIN)
+        self._wake_r, self._wake_w = os.pipe()
+        self._signalled: bool = False
+        return
+
+    def fileno(self) -> int:
+        return self._fd
+
+    @property
+    def wakeup_fd(self) -> int:
+        """The descriptor that becomes readable when lines have been read ahead, see :meth:`clear_wakeup`."""
+        return self._wake_r
+
+    def clear_wakeup(self) -> None:
+        """Makes :attr:`wakeup_fd` unreadable again, must be called by the thread holding the peripheral's lock."""
+        if self._signalled:
+            self._signalled = False
+            os.read(self._wake_r, 1)
+        return
+
+    def pending(self) -> bool:
+        """``True`` if a complete line has been read ahead."""
+        return b'\n' in self._buffer
+
+    def readline(self) -> str:
+        """The next line, blocks until the helper printed it, ``''`` if the helper closed its stdout."""
+        buffer = self._buffer
+        while True:
+            end = buffer.find(b'\n') + 1
+            if end:
+                line = buffer[:end].decode()
+                del buffer[:end]
+                if not self._signalled and b'\n' in buffer:
+                    self._signalled = True
+                    os.write(self._wake_w, b'\x00')
+                return line
+            chunk = os.read(self._fd, HELPER_READ_SIZE)
+            if not chunk:
+                line = buffer.decode()
+                buffer.clear()
+                return line
+            buffer += chunk
+
+    # the interface of the poller of bluepy
+
+    def register(self, fd, eventmask: int = select.POLLIN) -> None:
+        return
+
+    def unregister(self, fd) -> None:
+        return
+
+    def poll(self, timeout: float = None) -> list:
+        if self.pending():
+            return [(self._fd, select.POLLIN)]
+        return self._poller.poll(timeout)
+
+    def close(self) -> None:
+        self._stdout.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        return
+
+
+def install_helper_output(peripheral) -> Optional[HelperOutput]:
+    """Replaces the stdout stream and the poller of a bluepy ``Peripheral`` by a :class:`HelperOutput`.
+
+    Must be called before the Hub sends notifications, i.e., before they are enabled, as lines the original stream
+    has read ahead are lost.
+
+    Returns
+    -------
+    Optional[HelperOutput]
+        The output of the helper, ``None`` if `peripheral` has no helper process, e.g., a simulated Hub.
+
+    """
+    helper = getattr(peripheral, '_helper', None)
+    if helper is None:
+        return None
+    if not isinstance(helper.stdout, HelperOutput):
+        helper.stdout = peripheral._poller = HelperOutput(helper.stdout)
+    return helper.stdout
+
+
+class BTLEReader(threading.Thread):
+    """Dedicated thread receiving the notifications of one bluetooth peripheral.
+
+    The thread blocks without any timeout until the peripheral's notification descriptor becomes readable. It then
+    drains the waiting notifications with ``waitForNotifications(DRAIN_TIMEOUT)``, one call per notification as
+    long as one is waiting, which calls the peripheral's delegate for each of them. The lock is never held while
+    waiting for the Hub. The stdout of a bluepy helper is replaced, see :func:`install_helper_output`.
+
+    The peripheral itself is not thread-safe. Therefore, every other call into the peripheral, e.g.,
+    ``writeCharacteristic``, must be made while holding :attr:`lock`.
+
+    Consumers that cannot keep up can stop the thread from taking further notifications off the peripheral with
+    :meth:`pause_reading` until they call :meth:`resume_reading`. The notifications then pile up in the peripheral's
+    pipe instead of in the server.
+
+    Parameters
+    ----------
+    peripheral :
+        The connected peripheral with its delegate already set.
+    lock : threading.RLock, optional
+        The lock guarding the peripheral. A new lock is created if none is given.
+    name : str, default 'BTLEReader'
+        The name of the thread.
+
+    """
+
+    def __init__(self, peripheral, lock: threading.RLock = None, name: str = 'BTLEReader'):
+        super().__init__(name=name, daemon=True)
+        self._peripheral = peripheral
+        self._output: Optional[HelperOutput] = install_helper_output(peripheral)
+        self._lock: threading.RLock = threading.RLock() if lock is None else lock
+        self._stop_r, self._stop_w = os.pipe()
+        self._stopped: threading.Event = threading.Event()
+        self._resumed: threading.Event = threading.Event()
+        self._resumed.set()
+        self._pauses: int = 0
+        self._pause_lock: threading.Lock = threading.Lock()
+        return
+
+    @property
+    def lock(self) -> threading.RLock:
+        """The lock that must be held for any call into the peripheral.
+
+        Returns
+        -------
+        threading.RLock
+            The lock guarding the peripheral.
+
+        """
+        return self._lock
+
+    @property
+    def peripheral(self):
+        return self._peripheral
+
+    def pause_reading(self) -> None:
+        """Stops taking notifications off the peripheral until :meth:`resume_reading` is called.
+
+        Calls nest, reading resumes once every call has been matched by a call of :meth:`resume_reading`.
+        Notifications that are already being drained are still delivered.
+
+        Returns
+        -------
+        None
+
+        """
+        with self._pause_lock:
+            self._pauses += 1
+            self._resumed.clear()
+        return
+
+    def resume_reading(self) -> None:
+        """Undoes one call of :meth:`pause_reading`.
+
+        Returns
+        -------
+        None
+
+        """
+        with self._pause_lock:
+            if self._pauses > 0:
+                self._pauses -= 1
+            if self._pauses == 0:
+                self._resumed.set()
+        return
+
+    def _waiting(self, fd: int) -> bool:
+        """``True`` if a notification can be taken off the peripheral without blocking."""
+        if self._output is not None and self._output.pending():
+            return True
+        return bool(select.select((fd,), (), (), 0)[0])
+
+    def run(self) -> None:
+        fd = notification_fd(self._peripheral)
+        output = self._output
+        fds = (fd, self._stop_r) if output is None else (fd, output.wakeup_fd, self._stop_r)
+        try:
+            while not self._stopped.is_set():
+                self._resumed.wait()
+                if output is None or not output.pending():
+                    readable, _, _ = select.select(fds, (), ())
+                    if self._stop_r in readable:
+                        break
+                with self._lock:
+                    if output is not None:
+                        output.clear_wakeup()
+                    try:
+                        # the writer may have taken the notification off the peripheral meanwhile
+                        while self._waiting(fd) and self._peripheral.waitForNotifications(DRAIN_TIMEOUT):
+                            pass
+                    except BTLEInternalError:
+                        pass
+        except Exception as ex:
+            print(f"[{self.name}]-[MSG]: {C.BOLD}{C.FAIL}READING FROM PERIPHERAL FAILED: {ex!r}... "
+                  f"STOPPING...{C.ENDC}")
+            raise
+        finally:
+            self._stopped.set()
+            os.close(self._stop_r)
+        return
+
+    def stop(self, timeout: float = None) -> None:
+        """Stops the reader thread and waits for it to terminate.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for the thread to terminate, wait forever if ``None``.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._stop_w is None:
+            return
+        self._stopped.set()
+        self._resumed.set()
+        os.write(self._stop_w, b'\x00')
+        if self.is_alive():
+            self.join(timeout)
+        os.close(self._stop_w)
+        self._stop_w = None
+        return
+
+
+class BTLEWriter(threading.Thread):
+    """Dedicated thread writing commands to one bluetooth peripheral.
+
+    Commands are queued with :meth:`write` from the event loop. At most `window` commands are in flight, i.e.,
+    queued or being written, at any time. :meth:`write` waits asynchronously for a free slot, so a client sending
+    faster than the Hub can take the commands is slowed down without blocking the event loop. Callbacks that cannot
+    wait, e.g., :meth:`asyncio.BufferedProtocol.buffer_updated`, use :meth:`write_nowait` instead.
+
+    Each write holds :attr:`BTLEReader.lock`, the lock shared with the reader thread of the same peripheral.
+
+    Parameters
+    ----------
+    peripheral :
+        The connected peripheral.
+    loop : AbstractEventLoop
+        The event loop :meth:`write` is called from.
+    lock : threading.RLock, optional
+        The lock guarding the peripheral, usually :attr:`BTLEReader.lock`. A new lock is created if none is given.
+    window : int, default 8
+        The maximum number of commands in flight.
+    name : str, default 'BTLEWriter'
+        The name of the thread.
+    latency : Callable[[float], None], optional
+        Called in the writer thread with the seconds from queueing a command to having written it, e.g.,
+        :meth:`legoBTLE.networking.metrics.Histogram.observe`.
+
+    """
+
+    def __init__(self,
+                 peripheral,
+                 loop: AbstractEventLoop,
+                 lock: threading.RLock = None,
+                 window: int = 8,
+                 name: str = 'BTLEWriter',
+                 latency: Optional[Callable[[float], None]] = None):
+        super().__init__(name=name, daemon=True)
+        if window < 1:
+            raise ValueError(f"[{name}]-[ERR]: window MUST BE AT LEAST 1, GOT {window}...")
+        self._peripheral = peripheral
+        self._loop: AbstractEventLoop = loop
+        self._lock: threading.RLock = threading.RLock() if lock is None else lock
+        self._window: int = window
+        # the free slots of the window and the coroutines waiting for one
+        self._free: int = window
+        self._waiters: deque = deque()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._in_flight: int = 0
+        self._max_in_flight: int = 0
+        self._written: int = 0
+        self._failed: int = 0
+        self._without_response: int = 0
+        self._latency: Optional[Callable[[float], None]] = latency
+        return
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    @property
+    def in_flight(self) -> int:
+        """The number of commands queued or being written."""
+        return self._in_flight
+
+    def stats(self) -> dict:
+        """The counters of this writer.
+
+        Returns
+        -------
+        dict
+            ``in_flight``, ``max_in_flight``, ``window``, ``written``, ``without_response`` (the part of ``written``
+            sent as write without response) and ``failed``.
+
+        """
+        return {
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+                'window': self._window,
+                'written': self._written,
+                'without_response': self._without_response,
+                'failed': self._failed,
+                }
+
+    async def write(self, handle: int, data: bytes, withResponse: bool = True) -> None:
+        """Queues a ``writeCharacteristic`` call.
+
+        The coroutine returns as soon as the command has been queued, not when it has been written.
+
+        Parameters
+        ----------
+        handle : int
+            The characteristic handle.
+        data : bytes
+            The value to write. It must not be changed afterwards.
+        withResponse : bool, default True
+            If ``False``, the command is sent as write without response, i.e., the peripheral does not acknowledge
+            it on the link layer.
+
+        Returns
+        -------
+        None
+
+        """
+        while self._free == 0:
+            waiter = self._loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()  # pass the slot on
+                raise
+        self._put(handle, data, withResponse)
+        return
+
+    def write_nowait(self, handle: int, data: bytes, withResponse: bool = True) -> bool:
+        """Queues a ``writeCharacteristic`` call if a slot of the window is free.
+
+        Parameters
+        ----------
+        handle : int
+            The characteristic handle.
+        data : bytes
+            The value to write. It must not be changed afterwards.
+        withResponse : bool, default True
+            If ``False``, the command is sent as write without response.
+
+        Returns
+        -------
+        bool
+            ``True`` if the command has been queued, ``False`` if the window is full or coroutines are already
+            waiting in :meth:`write`.
+
+        """
+        if self._free == 0 or self._waiters:
+            return False
+        self._put(handle, data, withResponse)
+        return True
+
+    def _put(self, handle: int, data: bytes, withResponse: bool) -> None:
+        self._free -= 1
+        self._in_flight += 1
+        if self._in_flight > self._max_in_flight:
+            self._max_in_flight = self._in_flight
+        self._queue.put((handle, data, withResponse, time.perf_counter()))
+        return
+
+    def run(self) -> None:
+        release = self._release
+        latency = self._latency
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            handle, data, withResponse, queued = item
+            try:
+                with self._lock:
+                    self._peripheral.writeCharacteristic(handle, data, withResponse)
+                if latency is not None:
+                    latency(time.perf_counter() - queued)
+                self._written += 1
+                if not withResponse:
+                    self._without_response += 1
+            except Exception as ex:
+                self._failed += 1
+                print(f"[{self.name}]-[MSG]: {C.BOLD}{C.FAIL}WRITING {bytes(data).hex()} TO HANDLE {handle} FAILED: "
+                      f"{ex!r}...{C.ENDC}")
+            finally:
+                try:
+                    self._loop.call_soon_threadsafe(release)
+                except RuntimeError:  # the event loop has already been closed
+                    pass
+        return
+
+    def stop(self, timeout: float = None) -> None:
+        """Writes the commands already queued, then stops the writer thread.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for the thread to terminate, wait forever if ``None``.
+
+        Returns
+        -------
+        None
+
+        """
+        self._queue.put(None)
+        if self.is_alive():
+            self.join(timeout)
+        return
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._free += 1
+        self._wake()
+        return
+
+    def _wake(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        return
+
+
+class BTLELink:
+    """The :class:`BTLEReader` and :class:`BTLEWriter` of one connected peripheral.
+
+    Both threads share one lock, so that each peripheral is driven independently of all others: several Hubs are
+    read from and written to concurrently.
+
+    Parameters
+    ----------
+    peripheral :
+        The connected peripheral with its delegate already set.
+    loop : AbstractEventLoop
+        The event loop the writer is fed from.
+    window : int, default 8
+        The maximum number of commands in flight, see :class:`BTLEWriter`.
+    name : str, optional
+        Suffix of the thread names, e.g., the address of the peripheral.
+    write_latency : Callable[[float], None], optional
+        The `latency` callback of the :class:`BTLEWriter`.
+
+    """
+
+    def __init__(self, peripheral, loop: AbstractEventLoop, window: int = 8, name: str = None,
+                 write_latency: Optional[Callable[[float], None]] = None):
+        suffix = '' if name is None else f"[{name}]"
+        self._peripheral = peripheral
+        self._reader: BTLEReader = BTLEReader(peripheral, name=f"BTLEReader{suffix}")
+        self._writer: BTLEWriter = BTLEWriter(peripheral, loop=loop, lock=self._reader.lock, window=window,
+                                              name=f"BTLEWriter{suffix}", latency=write_latency)
+        return
+
+    @property
+    def peripheral(self):
+        return self._peripheral
+
+    @property
+    def reader(self) -> BTLEReader:
+        return self._reader
+
+    @property
+    def writer(self) -> BTLEWriter:
+        return self._writer
+
+    def start(self) -> 'BTLELink':
+        self._reader.start()
+        self._writer.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        """Writes the commands already queued, then stops both threads.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for each thread to terminate, wait forever if ``None``.
+
+        Returns
+        -------
+        None
+
+        """
+        self._writer.stop(timeout)
+        self._reader.stop(timeout)
+        return
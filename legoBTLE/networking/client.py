@@ -0,0 +1,355 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.client
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    The device side of the connection to the server: one connection per process and server, shared by all devices.
+
+    A :class:`ClientConnection` carries the messages of any number of devices. The devices register their ports over
+    it, the connect requests of all devices registering at the same time are sent in one write, see
+    :meth:`ClientConnection.register`. A single reader task receives everything the server sends and hands each
+    frame to the device owning the port, i.e., the Hub ``data[1]`` and port ``data[3]`` of the frame, the same
+    bytes the server routes by. The devices send their commands through the connection as well, so that the
+    commands of different devices are never interleaved on the wire.
+
+    Compared to a connection per device, this saves the sockets, reader tasks and server handlers of all but one
+    device. As the server refuses the OBSERVE of a port from the connection owning it, the devices that only
+    observe their ports share a connection of their own. Several devices of one port on the same connection, e.g.,
+    two dashboards, all receive the frames of the port. The transport, TCP, Unix domain socket or in-process loopback, is chosen by the host part of the server
+    address, see :mod:`legoBTLE.networking.transport`.
+
+    Example::
+
+        from legoBTLE.networking.client import connect
+
+        connection = await connect('127.0.0.1', 8888)
+        await connection.register(motor_a, motor_b, hub)  # one handshake for all three
+        # motor_a.connection == (connection.reader, connection)
+        observing = await connect('127.0.0.1', 8888, observe=True)
+        await observing.register(dashboard_motor_a, observe=True)  # sees what motor_a sees
+
+    Usually, this is done by :meth:`legoBTLE.device.ADevice.ADevice.EXT_SRV_CONNECT_REQ`.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import asyncio
+import traceback
+from asyncio import AbstractEventLoop
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from legoBTLE.legoWP.message.downstream import CMD_EXT_SRV_CONNECT_REQ
+from legoBTLE.legoWP.types import C
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.legoWP.types import PERIPHERAL_EVENT
+from legoBTLE.networking.framer import Framer
+from legoBTLE.networking.framer import READ_SIZE
+from legoBTLE.networking.transport import open_connection
+
+UPS_DNS_EXT_SERVER_CMD: int = MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0]
+UPS_HUB_ATTACHED_IO: int = MESSAGE_TYPE.UPS_HUB_ATTACHED_IO[0]
+VIRTUAL_IO_ATTACHED: int = PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED[0]
+EXT_SRV_DISCONNECTED: int = PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED[0]
+# seconds to wait for the server to answer the connect requests
+REGISTER_TIMEOUT: float = 10.0
+
+
+def _key(device) -> int:
+    return (device.hub_id << 8) | device.port[0]
+
+
+class ClientConnection:
+    """The connection of all devices of this process to one server.
+
+    To the devices, the connection is the writer of their ``connection`` tuple: :meth:`write`, :meth:`writelines`,
+    :meth:`drain` and :meth:`get_extra_info` behave like those of :class:`asyncio.StreamWriter`, except that
+    :meth:`drain` may be awaited by several devices at once.
+
+    All methods must be called from the event loop's thread.
+
+    Parameters
+    ----------
+    host : str
+        The address of the server.
+    port : int
+        The port of the server.
+    observe : bool, default False
+        ``True`` for the connection of the observing devices, see :func:`connect`.
+
+    """
+
+    def __init__(self, host: str, port: int, observe: bool = False):
+        self.server: Tuple[str, int] = (host, port)
+        self.observe: bool = observe
+        self.reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._opening: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._draining: Optional[asyncio.Future] = None
+        self._closed: bool = False
+
+        # the devices of each registered port by hub << 8 | port
+        self._devices: Dict[int, List[object]] = {}
+        # the ports registered as owner, they cannot be observed over this connection
+        self._owned: Set[int] = set()
+        # the connect requests of the next handshake
+        self._requests: List[bytes] = []
+        self.handshakes: int = 0
+        return
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._closed
+
+    @property
+    def devices(self) -> int:
+        """The number of registered devices."""
+        return len({id(device) for devices in self._devices.values() for device in devices})
+
+    async def open(self) -> 'ClientConnection':
+        """Connects to the server and starts receiving.
+
+        Raises
+        ------
+        ConnectionError
+            If the server cannot be reached.
+
+        """
+        self.reader, self._writer = await open_connection(*self.server)
+        self._task = asyncio.ensure_future(self._listen())
+        return self
+
+    # the writer interface of the devices
+
+    def write(self, data: bytes) -> None:
+        self._writer.write(data)
+        return
+
+    def writelines(self, data) -> None:
+        self._writer.writelines(data)
+        return
+
+    async def drain(self) -> None:
+        """Waits until the write buffer has drained, one :meth:`asyncio.StreamWriter.drain` for all callers."""
+        if self._draining is None:
+            self._draining = asyncio.ensure_future(self._writer.drain())
+            self._draining.add_done_callback(self._drained)
+        await asyncio.shield(self._draining)
+        return
+
+    def _drained(self, future: asyncio.Future) -> None:
+        self._draining = None
+        return
+
+    def get_extra_info(self, name: str, default=None):
+        return self._writer.get_extra_info(name, default)
+
+    # registering
+
+    async def register(self, *devices, timeout: Optional[float] = REGISTER_TIMEOUT, observe: bool = False) -> None:
+        """Registers the ports of `devices` with the server.
+
+        The connect requests of all devices registering during the same iteration of the event loop, e.g., with
+        ``asyncio.gather``, are sent in one write.
+
+        An observing device receives the notifications of its port like the owner of the port, e.g., another client
+        driving the motor, but the server ignores its commands to the port.
+
+        Parameters
+        ----------
+        devices : ADevice
+            The devices, their ``connection`` is set to this connection.
+        timeout : float, default REGISTER_TIMEOUT
+            Seconds to wait for the answers of the server, no limit if ``None``.
+        observe : bool, default False
+            If ``True``, the devices subscribe read-only instead of registering as owners of their ports.
+
+        Raises
+        ------
+        ConnectionError
+            If the connection is closed.
+        ConnectionRefusedError
+            If a device should observe a port owned over this connection or the server refused a port.
+        asyncio.TimeoutError
+            If the server did not answer for all ports in time.
+
+        """
+        if not self.is_open:
+            raise ConnectionError(f"[{self.server[0]}:{self.server[1]}]-[ERR]: CONNECTION CLOSED...")
+        if observe:
+            for device in devices:
+                if _key(device) in self._owned:
+                    raise ConnectionRefusedError(
+                            f"[{self.server[0]}:{self.server[1]}]-[ERR]: PORT [{device.hub_id}:{device.port[0]}] IS "
+                            f"OWNED OVER THIS CONNECTION, OBSERVE IT OVER connect(..., observe=True)...")
+        for device in devices:
+            self._attach(device)
+            if not observe:
+                self._owned.add(_key(device))
+            device.ext_srv_connected.clear()
+            device.ext_srv_disconnected.clear()
+            command = CMD_EXT_SRV_CONNECT_REQ(port=device.port, observe=observe).COMMAND
+            if device.hub_id:
+                command[2] = device.hub_id
+            if not self._requests:
+                asyncio.get_event_loop().call_soon(self._handshake)
+            self._requests.append(command[:2])
+            self._requests.append(command[1:])
+        try:
+            await asyncio.wait_for(asyncio.gather(*(self._answer(device) for device in devices)), timeout)
+        except asyncio.TimeoutError:
+            for device in devices:
+                if not device.ext_srv_connected.is_set():
+                    device.ext_srv_disconnected.set()
+            raise
+        return
+
+    async def _answer(self, device) -> None:
+        """Waits until the server acknowledged or refused the port of `device`."""
+        waiting = [asyncio.ensure_future(device.ext_srv_connected.wait()),
+                   asyncio.ensure_future(device.ext_srv_disconnected.wait())]
+        try:
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for future in waiting:
+                future.cancel()
+        if not device.ext_srv_connected.is_set():
+            raise ConnectionRefusedError(f"[{self.server[0]}:{self.server[1]}]-[ERR]: SERVER REFUSED PORT "
+                                         f"[{device.hub_id}:{device.port[0]}]...")
+        return
+
+    def _attach(self, device) -> None:
+        devices = self._devices.setdefault(_key(device), [])
+        if device not in devices:
+            devices.append(device)
+        device.connection_set((self.reader, self))
+        return
+
+    def _handshake(self) -> None:
+        if self._requests and self.is_open:
+            self._writer.writelines(self._requests)
+            self.handshakes += 1
+        self._requests = []
+        return
+
+    def unregister(self, device) -> None:
+        """Forgets `device`, the connection is closed with the last device.
+
+        The server has to be told before, see :meth:`legoBTLE.device.ADevice.ADevice.EXT_SRV_DISCONNECT_REQ`.
+        """
+        for key, devices in list(self._devices.items()):
+            if device in devices:
+                devices.remove(device)
+                if not devices:
+                    del self._devices[key]
+                    self._owned.discard(key)
+        if not self._devices:
+            self.close()
+        return
+
+    def close(self) -> None:
+        """Closes the connection, the registered devices are disconnected."""
+        if not self._closed:
+            self._closed = True
+            _connections.pop((asyncio.get_event_loop(), *self.server, self.observe), None)
+            if self._writer is not None:
+                self._writer.close()
+        return
+
+    async def wait_closed(self) -> None:
+        """Waits until the reader task has finished."""
+        if self._task is not None:
+            await self._task
+        return
+
+    # receiving
+
+    async def _listen(self) -> None:
+        framer = Framer()
+        while True:
+            try:
+                chunk = await self.reader.read(READ_SIZE)
+                if not chunk:
+                    raise ConnectionResetError("CONNECTION CLOSED BY SERVER")
+            except (ConnectionError, IOError) as e:
+                if not self._closed:
+                    print(f"[{self.server[0]}:{self.server[1]}]-[MSG]: {C.WARNING}CONNECTION LOST... "
+                          f"{e.args}{C.ENDC}")
+                break
+            for data in framer.feed(chunk):
+                await self._dispatch(data)
+        self.close()
+        for device in {device for devices in self._devices.values() for device in devices}:
+            device.ext_srv_connected.clear()
+            device.ext_srv_disconnected.set()
+        self._devices.clear()
+        self._owned.clear()
+        return
+
+    async def _dispatch(self, data: bytearray) -> None:
+        """Hands the frame to the devices of its port."""
+        if len(data) < 4:
+            return
+        key = (data[1] << 8) | data[3]
+        if data[2] == UPS_HUB_ATTACHED_IO and len(data) > 8 and data[4] == VIRTUAL_IO_ATTACHED:
+            # the combined device registered with the setup port, see server.BTLEDelegate._route_virtual_io_attached
+            setup_key = (data[1] << 8) | ((110 + data[7] + 2 * data[8]) & 0xff)
+            devices = self._devices.pop(setup_key, None)
+            if devices is not None:
+                self._devices.setdefault(key, []).extend(devices)
+                if setup_key in self._owned:
+                    self._owned.discard(setup_key)
+                    self._owned.add(key)
+        devices = self._devices.get(key)
+        if not devices:
+            print(f"[{self.server[0]}:{self.server[1]}]-[MSG]: {C.WARNING}NO DEVICE AT PORT [{data[1]}:{data[3]}]... "
+                  f"IGNORING [{data.hex()}]...{C.ENDC}")
+            return
+        for device in (devices[0],) if len(devices) == 1 else tuple(devices):
+            try:
+                await device._dispatch_return_data(data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # a failing device must neither keep the frame from the others nor disconnect them
+                print(f"[{self.server[0]}:{self.server[1]}]-[ERR]: {C.FAIL}DISPATCHING [{data.hex()}] TO PORT "
+                      f"[{data[1]}:{data[3]}] FAILED: {e!r}...{C.ENDC}")
+                traceback.print_exc()
+            if data[2] == UPS_DNS_EXT_SERVER_CMD and data[-1] == EXT_SRV_DISCONNECTED:
+                self.unregister(device)
+        return
+
+
+_connections: Dict[Tuple[AbstractEventLoop, str, int, bool], ClientConnection] = {}
+
+
+async def connect(host: str = '127.0.0.1', port: int = 8888, observe: bool = False) -> ClientConnection:
+    """The open connection to the server at `host`:`port`, opened if there is none.
+
+    Concurrent calls for the same server share one connection. With `observe`, the connection of the observing
+    devices is returned, which is a separate one, as the server refuses the OBSERVE of a port from the connection
+    owning it.
+
+    Raises
+    ------
+    ConnectionError
+        If the server cannot be reached.
+
+    """
+    key = (asyncio.get_event_loop(), host, port, observe)
+    connection = _connections.get(key)
+    if connection is None:
+        connection = _connections[key] = ClientConnection(host, port, observe)
+    if connection._opening is None:
+        connection._opening = asyncio.ensure_future(connection.open())
+    try:
+        await asyncio.shield(connection._opening)
+    except (ConnectionError, OSError):
+        _connections.pop(key, None)
+        raise
+    return connection
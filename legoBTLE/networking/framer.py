@@ -0,0 +1,83 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.framer
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Splits the byte stream from the server into frames.
+
+    The server sends each frame, i.e., each complete message starting with its own length byte, preceded by that
+    length byte once more, see :class:`legoBTLE.networking.sender.ClientSender`. Reading it with
+    ``readexactly(1)`` and ``readexactly(n)`` costs two awaits per frame. A :class:`Framer` instead is fed whatever
+    chunk the connection delivered and returns all complete frames in it at once, keeping an incomplete last frame
+    for the next chunk::
+
+        framer = Framer()
+        while True:
+            for frame in framer.feed(await reader.read(READ_SIZE)):
+                ...
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+from typing import List
+from typing import Union
+
+# the number of bytes requested per read, many frames at once under load
+READ_SIZE: int = 1 << 16
+
+
+class Framer:
+    """Incremental framer for length prefixed frames.
+
+    The framer is not thread-safe.
+    """
+
+    __slots__ = ('_pending',)
+
+    def __init__(self):
+        # the incomplete frame at the end of the last chunk
+        self._pending: bytearray = bytearray()
+        return
+
+    @property
+    def pending(self) -> int:
+        """The number of bytes waiting for the rest of their frame."""
+        return len(self._pending)
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> List[bytearray]:
+        """Adds `data` to the stream and takes the complete frames out.
+
+        Parameters
+        ----------
+        data : Union[bytes, bytearray, memoryview]
+            The next chunk of the stream.
+
+        Returns
+        -------
+        List[bytearray]
+            The complete frames in the order received, each one its own copy, without the length prefix. A length
+            prefix of 0 carries no frame and is skipped.
+
+        """
+        if self._pending:
+            self._pending += data
+            data = self._pending
+        frames = []
+        append = frames.append
+        offset, end = 0, len(data)
+        with memoryview(data) as view:
+            while offset < end:
+                stop = offset + 1 + data[offset]
+                if stop > end:
+                    break
+                if stop > offset + 1:
+                    append(bytearray(view[offset + 1:stop]))
+                offset = stop
+            self._pending = bytearray(view[offset:])
+        return frames
+
+    def clear(self) -> None:
+        """Discards the incomplete frame, e.g., after the connection was lost."""
+        self._pending = bytearray()
+        return
@@ -0,0 +1,226 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.metrics
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Counters, gauges and latency histograms of the server, and an endpoint serving them as plain text.
+
+    Updating a metric is an integer addition, observing a latency additionally a binary search over the bucket
+    bounds. There are no locks: each metric is meant to be updated by one thread only, e.g., the write latency of a
+    Hub by its :class:`legoBTLE.networking.btle_io.BTLEWriter`, everything else by the event loop. A snapshot taken
+    meanwhile may be off by the updates in progress.
+
+    Counters only ever increase, the messages or bytes per second are the difference of two snapshots divided by the
+    seconds in between. Gauges are computed when the snapshot is taken.
+
+    The snapshot uses the Prometheus text exposition format::
+
+        # HELP legobtle_messages_total Messages per direction and port.
+        # TYPE legobtle_messages_total counter
+        legobtle_messages_total{direction="upstream",hub="0",port="0"} 1234
+
+    :func:`serve_metrics` writes a snapshot to every connection and closes it, e.g., ``nc 127.0.0.1 8889``.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import asyncio
+import time
+from asyncio.streams import StreamReader
+from asyncio.streams import StreamWriter
+from bisect import bisect_left
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import Union
+
+# latency buckets in seconds: 50 µs to 5 s
+LATENCY_BUCKETS: Tuple[float, ...] = (
+        .00005, .0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    """A value that only increases."""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value: int = 0
+        return
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+        return
+
+
+class Histogram:
+    """Counts observations per bucket.
+
+    Parameters
+    ----------
+    bounds : Tuple[float, ...]
+        The ascending upper bounds of the buckets, an overflow bucket is added.
+
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds: Tuple[float, ...] = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+        return
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        return
+
+
+class Family:
+    """All metrics of one name, one per combination of label values.
+
+    Parameters
+    ----------
+    name : str
+        The metric name.
+    doc : str
+        The help text.
+    kind : str
+        ``'counter'``, ``'histogram'`` or ``'gauge'``.
+    labelnames : Tuple[str, ...]
+        The label names.
+    factory : Callable, optional
+        Creates the metric for new label values, :class:`Counter` or :class:`Histogram`.
+    collect : Callable[[], Iterable[Tuple[tuple, float]]], optional
+        Returns ``(label values, value)`` pairs when a snapshot is taken, for gauges and for counters kept
+        elsewhere, e.g., in :meth:`legoBTLE.networking.sender.ClientSender.stats`.
+
+    """
+
+    def __init__(self, name: str, doc: str, kind: str, labelnames: Tuple[str, ...] = (), factory: Callable = None,
+                 collect: Callable[[], Iterable[Tuple[tuple, float]]] = None):
+        self.name: str = name
+        self.doc: str = doc
+        self.kind: str = kind
+        self.labelnames: Tuple[str, ...] = labelnames
+        self._factory: Callable = factory
+        self._collect: Callable[[], Iterable[Tuple[tuple, float]]] = collect
+        self._children: Dict[tuple, Union[Counter, Histogram]] = {}
+        return
+
+    def labels(self, *values) -> Union[Counter, Histogram]:
+        """The metric for the label `values`, created on first use.
+
+        Callers on a hot path should keep the returned metric instead of looking it up for every update.
+        """
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._factory()
+        return child
+
+    def remove(self, *values) -> None:
+        """Forgets the metric for the label `values`, e.g., of a client that disconnected."""
+        self._children.pop(values, None)
+        return
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.doc}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        if self._collect is not None:
+            for values, value in self._collect():
+                lines.append(f"{self.name}{self._labelstr(values)} {value}")
+        elif self.kind == 'counter':
+            for values, child in list(self._children.items()):
+                lines.append(f"{self.name}{self._labelstr(values)} {child.value}")
+        else:
+            for values, child in list(self._children.items()):
+                cumulated = 0
+                counts = list(child.counts)
+                for bound, count in zip(child.bounds, counts):
+                    cumulated += count
+                    lines.append(f"{self.name}_bucket{self._labelstr(values, ('le', repr(bound)))} {cumulated}")
+                cumulated += counts[-1]
+                lines.append(f"{self.name}_bucket{self._labelstr(values, ('le', '+Inf'))} {cumulated}")
+                lines.append(f"{self.name}_sum{self._labelstr(values)} {child.sum!r}")
+                lines.append(f"{self.name}_count{self._labelstr(values)} {child.count}")
+        return
+
+    def _labelstr(self, values: tuple, extra: Tuple[str, str] = None) -> str:
+        pairs = [f'{k}="{v}"' for k, v in zip(self.labelnames, values)]
+        if extra is not None:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return f"{{{','.join(pairs)}}}" if pairs else ''
+
+
+class Registry:
+    """The metrics of one server."""
+
+    def __init__(self):
+        self._families: Dict[str, Family] = {}
+        self._started: float = time.monotonic()
+        self.gauge('legobtle_uptime_seconds', 'Seconds since the metrics have been set up.',
+                   collect=lambda: (((), time.monotonic() - self._started),))
+        return
+
+    def counter(self, name: str, doc: str, labelnames: Tuple[str, ...] = (),
+                collect: Callable[[], Iterable[Tuple[tuple, float]]] = None) -> Family:
+        return self._add(Family(name, doc, 'counter', labelnames, factory=Counter, collect=collect))
+
+    def histogram(self, name: str, doc: str, labelnames: Tuple[str, ...] = (),
+                  bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> Family:
+        return self._add(Family(name, doc, 'histogram', labelnames, factory=lambda: Histogram(bounds)))
+
+    def gauge(self, name: str, doc: str, labelnames: Tuple[str, ...] = (),
+              collect: Callable[[], Iterable[Tuple[tuple, float]]] = None) -> Family:
+        return self._add(Family(name, doc, 'gauge', labelnames, collect=collect))
+
+    def render(self) -> str:
+        """The snapshot of all metrics in the text exposition format."""
+        lines: List[str] = []
+        for family in self._families.values():
+            family.render(lines)
+        lines.append('')
+        return '\n'.join(lines)
+
+    def _add(self, family: Family) -> Family:
+        if family.name in self._families:
+            raise ValueError(f"[Registry]-[ERR]: METRIC {family.name} ALREADY REGISTERED...")
+        self._families[family.name] = family
+        return family
+
+
+async def serve_metrics(registry: Registry, address: str) -> asyncio.AbstractServer:
+    """Serves snapshots of `registry`.
+
+    Parameters
+    ----------
+    registry : Registry
+        The metrics.
+    address : str
+        ``'host:port'`` for a TCP socket or ``'unix:/path'`` for a Unix domain socket.
+
+    Returns
+    -------
+    asyncio.AbstractServer
+        The running server.
+
+    """
+    async def _snapshot(reader: StreamReader, writer: StreamWriter) -> None:
+        writer.write(registry.render().encode('utf-8'))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        return
+
+    if address.startswith('unix:'):
+        return await asyncio.start_unix_server(_snapshot, path=address[5:])
+    host, _, port = address.rpartition(':')
+    return await asyncio.start_server(_snapshot, host or '127.0.0.1', int(port))
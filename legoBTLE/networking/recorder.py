@@ -0,0 +1,293 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.recorder
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Binary recording and replay of the traffic between clients, server and Hubs.
+
+    :class:`TrafficRecorder` appends every frame to a log file as is, preceded by a fixed size record header::
+
+        offset  size  field
+        0       8     monotonic timestamp in ns, unsigned
+        8       1     direction, see :class:`DIRECTION`
+        9       1     hub index
+        10      2     connection id, 0xffff if no client connection is involved
+        12      2     frame length
+        14      n     frame
+
+    All integers are little endian. The file starts with the 8 byte header ``b'LBTR'``, version, 3 reserved bytes.
+
+    The file is preallocated and memory-mapped, so that recording a frame is one ``struct.pack_into`` plus a slice
+    assignment, nothing is formatted and no system call is made unless the file has to grow.
+
+    :class:`TrafficReplay` memory-maps a log and hands the frames to a callback, either at the original pace or as
+    fast as possible. From the command line, the upstream frames of a log are decoded as a client does::
+
+        python -m legoBTLE.networking.recorder traffic.lbtr --speed 0
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+from enum import IntEnum
+from typing import Callable
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+
+MAGIC: bytes = b'LBTR'
+VERSION: int = 1
+FILE_HEADER: struct.Struct = struct.Struct('<4sB3x')
+RECORD_HEADER: struct.Struct = struct.Struct('<QBBHH')
+
+# connection id of frames that do not belong to a client connection
+NO_CONNECTION: int = 0xffff
+
+
+class DIRECTION(IntEnum):
+    """The direction of a recorded frame.
+
+    UPSTREAM
+        From a Hub to the server.
+    DOWNSTREAM
+        From a client to the server, i.e., commands for the Hub and requests to the server.
+    """
+    UPSTREAM = 0x00
+    DOWNSTREAM = 0x01
+
+
+class Record(NamedTuple):
+    """One recorded frame, `frame` is a ``memoryview`` into the log."""
+    timestamp: int
+    direction: int
+    hub: int
+    connection: int
+    frame: memoryview
+
+
+class TrafficRecorder:
+    """Append-only binary log of frames.
+
+    :meth:`record` is thread-safe, so that the reader and writer threads of the Hubs as well as the event loop may
+    record.
+
+    Parameters
+    ----------
+    path : str
+        The log file, it is overwritten.
+    capacity : int, default 16 MiB
+        The initial size of the file in bytes. The file is doubled in size whenever it is full, and truncated to
+        its used size by :meth:`close`.
+
+    """
+
+    def __init__(self, path: str, capacity: int = 1 << 24):
+        self._path: str = path
+        self._capacity: int = max(capacity, 1 << 12)
+        self._lock: threading.Lock = threading.Lock()
+        self._fd: int = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, self._capacity)
+        self._map: mmap.mmap = mmap.mmap(self._fd, self._capacity)
+        FILE_HEADER.pack_into(self._map, 0, MAGIC, VERSION)
+        self._offset: int = FILE_HEADER.size
+        self._records: int = 0
+        return
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def records(self) -> int:
+        """The number of frames recorded so far."""
+        return self._records
+
+    @property
+    def size(self) -> int:
+        """The used size of the log in bytes."""
+        return self._offset
+
+    def record(self, direction: int, hub: int, connection: int, frame: bytes) -> None:
+        """Appends `frame` to the log.
+
+        Parameters
+        ----------
+        direction : int
+            A :class:`DIRECTION`.
+        hub : int
+            The index of the Hub the frame came from or is meant for.
+        connection : int
+            The id of the client connection, :data:`NO_CONNECTION` if there is none.
+        frame : bytes
+            The frame, i.e., the message starting with its length byte.
+
+        Returns
+        -------
+        None
+
+        """
+        timestamp = time.monotonic_ns()
+        size = len(frame)
+        with self._lock:
+            offset = self._offset
+            end = offset + RECORD_HEADER.size + size
+            if end > self._capacity:
+                if self._map is None:
+                    return
+                self._grow(end)
+            RECORD_HEADER.pack_into(self._map, offset, timestamp, direction, hub, connection, size)
+            self._map[offset + RECORD_HEADER.size:end] = frame
+            self._offset = end
+            self._records += 1
+        return
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+        return
+
+    def close(self) -> None:
+        """Writes the log to disk and truncates the file to its used size."""
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            os.ftruncate(self._fd, self._offset)
+            os.close(self._fd)
+            # further records are discarded
+            self._capacity = -1
+        return
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while capacity < needed:
+            capacity <<= 1
+        self._map.flush()
+        self._map.close()
+        os.ftruncate(self._fd, capacity)
+        self._map = mmap.mmap(self._fd, capacity)
+        self._capacity = capacity
+        return
+
+
+class TrafficReplay:
+    """Read access to a log written by :class:`TrafficRecorder`.
+
+    Parameters
+    ----------
+    path : str
+        The log file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a traffic log.
+
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < FILE_HEADER.size or FILE_HEADER.unpack_from(self._map, 0) != (MAGIC, VERSION):
+            self._map.close()
+            raise ValueError(f"[TrafficReplay]-[ERR]: {path} IS NO TRAFFIC LOG OF VERSION {VERSION}...")
+        return
+
+    @property
+    def data(self) -> memoryview:
+        """The whole log, including the file header."""
+        return memoryview(self._map)
+
+    def __iter__(self) -> Iterator[Record]:
+        """Iterates over the records in the order they have been recorded.
+
+        The iteration ends at the end of the file or at the unused preallocated space of a log that has not been
+        closed.
+        """
+        data = memoryview(self._map)
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        offset, end = FILE_HEADER.size, len(data)
+        while offset + header_size <= end:
+            timestamp, direction, hub, connection, size = unpack_from(data, offset)
+            if timestamp == 0:
+                break
+            offset += header_size
+            yield Record(timestamp, direction, hub, connection, data[offset:offset + size])
+            offset += size
+        return
+
+    def replay(self,
+               callback: Callable[[Record], None],
+               speed: Optional[float] = 1.0,
+               direction: Optional[int] = None) -> int:
+        """Hands the records to `callback`.
+
+        Parameters
+        ----------
+        callback : Callable[[Record], None]
+            Called with each record, e.g., a function passing ``record.frame`` to
+            ``BTLEDelegate.handleNotification`` or to the :class:`legoBTLE.legoWP.message.upstream.UpStreamMessageBuilder`.
+        speed : float, optional
+            ``1.0`` keeps the original pace, ``2.0`` replays twice as fast, ``None`` or ``0`` as fast as possible.
+        direction : int, optional
+            Replay only the records of this :class:`DIRECTION`.
+
+        Returns
+        -------
+        int
+            The number of records handed to `callback`.
+
+        """
+        count = 0
+        start, first = time.monotonic_ns(), None
+        for record in self:
+            if direction is not None and record.direction != direction:
+                continue
+            if speed:
+                if first is None:
+                    first = record.timestamp
+                delay = (start + (record.timestamp - first) / speed - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+            callback(record)
+            count += 1
+        return count
+
+    def close(self) -> None:
+        self._map.close()
+        return
+
+
+def main():
+    from legoBTLE.legoWP.message.upstream import UpStreamMessageBuilder
+
+    parser = argparse.ArgumentParser(description='Replays the upstream frames of a traffic log through the decoder '
+                                                 'of the clients.')
+    parser.add_argument('log', help='the traffic log')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='1 keeps the original pace, 0 replays as fast as possible (default)')
+    args = parser.parse_args()
+
+    replay = TrafficReplay(args.log)
+    t0 = time.perf_counter()
+    count = replay.replay(lambda record: UpStreamMessageBuilder(data=bytearray(record.frame)).build(),
+                          speed=args.speed,
+                          direction=DIRECTION.UPSTREAM)
+    elapsed = time.perf_counter() - t0
+    replay.close()
+    print(f"{count} FRAMES DECODED IN {elapsed:.3f}s: {count / elapsed if elapsed else 0.0:.1f} FRAMES/S")
+    return
+
+
+if __name__ == '__main__':
+    main()
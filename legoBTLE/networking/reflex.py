@@ -0,0 +1,389 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.reflex
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Reflex rules: commands the server sends to a Hub by itself when the notifications of a port meet a condition.
+
+    A client that reacts to the values of a motor, e.g., the stall detection of
+    :class:`legoBTLE.device.AMotor.AMotor`, needs the notification to travel to the client and the command back
+    through the server before the Hub acts. A :class:`ReflexEngine` in the server evaluates the rules right in the
+    notification path instead and writes the command to the Hub at once:
+
+    :class:`StallRule`
+        While a command runs on the port, i.e., between the ``PORT_CMD_FEEDBACK`` reporting it in progress and the one
+        reporting the port idle, the value changes less than `min_delta` within `window` seconds. As a stalled motor
+        sends no values at all, the rule is also checked by a timer at the end of each window.
+    :class:`ThresholdRule`
+        The value crosses `threshold`, upwards, downwards or either way.
+
+    Each rule belongs to the client connection that owns the port and added it; it is removed with the connection.
+    A rule counts how often it fired and the reaction latency, i.e., the seconds from the notification, or the end
+    of the stall window, to having queued the command for the Hub.
+
+    Example::
+
+        engine = ReflexEngine(write=lambda hub, command: ...)
+        engine.add(StallRule(hub=0, port=0x00, action=stop_command, owner=connection, min_delta=2, window=.2))
+        ...
+        engine.notify(0, notification, time.perf_counter())  # for each PORT_VALUE and PORT_CMD_FEEDBACK
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.legoWP.types import REFLEX_RULE
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+DNS_PORT_CMD: int = MESSAGE_TYPE.DNS_PORT_CMD[0]
+UPS_PORT_CMD_FEEDBACK: int = MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0]
+# command feedback bits, see https://lego.github.io/lego-ble-wireless-protocol-docs/index.html#port-output-command-feedback
+FB_IN_PROGRESS: int = 0x01
+FB_IDLE: int = 0x08
+
+
+class ReflexRule:
+    """Base class of the rules of one port.
+
+    Parameters
+    ----------
+    hub : int
+        The Hub index.
+    port : int
+        The Hub port whose notifications are evaluated.
+    action : bytes
+        The message written to the Hub when the rule fires, starting with its length byte. It must be a port output
+        command to `port`, a rule may not command other ports or the Hub itself.
+    owner : Any
+        The client connection that added the rule.
+
+    Raises
+    ------
+    ValueError
+        If `action` is no port output command to `port`.
+
+    """
+
+    KIND: int = 0
+
+    def __init__(self, hub: int, port: int, action: bytes, owner: Any = None):
+        if len(action) < 4 or action[0] != len(action):
+            raise ValueError(f"[{type(self).__name__}]-[ERR]: ACTION [{bytes(action).hex()}] IS NO MESSAGE...")
+        if action[2] != DNS_PORT_CMD or action[3] != port:
+            raise ValueError(f"[{type(self).__name__}]-[ERR]: ACTION [{bytes(action).hex()}] IS NO PORT OUTPUT "
+                             f"COMMAND TO PORT {port}...")
+        self.hub: int = hub
+        self.port: int = port
+        self.action: bytes = bytes(action)
+        self.owner: Any = owner
+        self.value: Optional[int] = None
+
+        self.fired: int = 0
+        self.latency_sum: float = 0.0
+        self.latency_max: float = 0.0
+        return
+
+    def stats(self) -> dict:
+        return {
+                'hub': self.hub,
+                'port': self.port,
+                'rule': REFLEX_RULE.NAMES_BY_INT[self.KIND],
+                'fired': self.fired,
+                'latency_mean': self.latency_sum / self.fired if self.fired else 0.0,
+                'latency_max': self.latency_max,
+                }
+
+    def on_value(self, value: int, now: float) -> bool:
+        """Takes the new `value` of the port, ``True`` if the rule fires."""
+        self.value = value
+        return False
+
+    def on_feedback(self, status: int, now: float) -> None:
+        return
+
+    def close(self) -> None:
+        return
+
+
+class ThresholdRule(ReflexRule):
+    """Fires when the value of the port crosses `threshold`.
+
+    Parameters
+    ----------
+    threshold : int
+        The value, e.g., the position in degrees.
+    kind : int, default REFLEX_RULE.RISING
+        :attr:`REFLEX_RULE.RISING` fires when the value reaches the threshold from below,
+        :attr:`REFLEX_RULE.FALLING` from above, :attr:`REFLEX_RULE.CROSSING` either way.
+
+    See :class:`ReflexRule` for the other parameters.
+    """
+
+    def __init__(self, hub: int, port: int, action: bytes, owner: Any = None, threshold: int = 0,
+                 kind: int = REFLEX_RULE.RISING[0]):
+        super().__init__(hub, port, action, owner)
+        if kind not in (REFLEX_RULE.RISING[0], REFLEX_RULE.FALLING[0], REFLEX_RULE.CROSSING[0]):
+            raise ValueError(f"[ThresholdRule]-[ERR]: NO THRESHOLD RULE {kind}...")
+        self.KIND = kind
+        self.threshold: int = threshold
+        return
+
+    def on_value(self, value: int, now: float) -> bool:
+        previous, self.value = self.value, value
+        if previous is None:
+            return False
+        threshold = self.threshold
+        if previous < threshold <= value:
+            return self.KIND != REFLEX_RULE.FALLING[0]
+        if previous > threshold >= value:
+            return self.KIND != REFLEX_RULE.RISING[0]
+        return False
+
+
+class StallRule(ReflexRule):
+    """Fires when the value changes less than `min_delta` within `window` seconds while a command runs.
+
+    The rule fires once per command.
+
+    Parameters
+    ----------
+    min_delta : int
+        The change of the value, e.g., in degrees, that counts as moving.
+    window : float
+        Seconds.
+
+    See :class:`ReflexRule` for the other parameters.
+    """
+
+    KIND: int = REFLEX_RULE.STALL[0]
+
+    def __init__(self, hub: int, port: int, action: bytes, owner: Any = None, min_delta: int = 1,
+                 window: float = .2):
+        super().__init__(hub, port, action, owner)
+        if window <= 0:
+            raise ValueError(f"[StallRule]-[ERR]: window MUST BE POSITIVE, GOT {window}...")
+        self.min_delta: int = min_delta
+        self.window: float = window
+        self.running: bool = False
+        # the value the motor last moved from and when
+        self.ref_value: Optional[int] = None
+        self.ref_time: float = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # set by the engine, called when the window may have ended without movement
+        self.check: Optional[Callable[['StallRule'], None]] = None
+        return
+
+    def on_value(self, value: int, now: float) -> bool:
+        self.value = value
+        if self.running and (self.ref_value is None or abs(value - self.ref_value) >= self.min_delta):
+            self.ref_value, self.ref_time = value, now
+        return False
+
+    def on_feedback(self, status: int, now: float) -> None:
+        if status & FB_IN_PROGRESS:
+            # a new command, the window starts now
+            self.running = True
+            self.ref_value, self.ref_time = self.value, now
+            if self.timer is None:
+                self._schedule(self.window)
+        elif status & FB_IDLE:
+            self.running = False
+            self.close()
+        return
+
+    @property
+    def deadline(self) -> float:
+        return self.ref_time + self.window
+
+    def _schedule(self, delay: float) -> None:
+        self.timer = asyncio.get_event_loop().call_later(delay, self.check, self)
+        return
+
+    def due(self, now: float) -> bool:
+        """``True`` if the window has ended without movement, the timer is set again otherwise."""
+        self.timer = None
+        if not self.running:
+            return False
+        remaining = self.deadline - now
+        if remaining > 0:
+            self._schedule(remaining)
+            return False
+        self.running = False
+        return True
+
+    def close(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return
+
+
+class ReflexEngine:
+    """The reflex rules of all ports, evaluated in the notification path of the server.
+
+    The rules are kept in a preallocated array indexed by ``hub << 8 | port`` like the
+    :class:`legoBTLE.networking.routing.RoutingTable`, so that a notification of a port without rules costs one
+    array access. All methods must be called from the event loop's thread.
+
+    Parameters
+    ----------
+    write : Callable[[int, bytes], None]
+        Writes a message, starting with its length byte, to the Hub with the given index.
+    fired : Callable[[ReflexRule, float], None], optional
+        Called after a rule fired with the reaction latency in seconds, e.g., to update metrics.
+    hubs : int, default 1
+        The number of Hubs.
+    clock : Callable[[], float], default time.perf_counter
+        The clock the notifications are timestamped with.
+
+    """
+
+    PORTS: int = 256
+
+    def __init__(self, write: Callable[[int, bytes], None], fired: Callable[[ReflexRule, float], None] = None,
+                 hubs: int = 1, clock: Callable[[], float] = time.perf_counter):
+        self._write: Callable[[int, bytes], None] = write
+        self._fired: Optional[Callable[[ReflexRule, float], None]] = fired
+        self._clock: Callable[[], float] = clock
+        self._rules: List[Tuple[ReflexRule, ...]] = [()] * (ReflexEngine.PORTS * hubs)
+        self._owned: defaultdict = defaultdict(list)
+        return
+
+    @property
+    def armed(self) -> bool:
+        """``True`` if there is any rule at all."""
+        return bool(self._owned)
+
+    def rules(self, hub: int, port: int) -> Tuple[ReflexRule, ...]:
+        return self._rules[(hub << 8) | port]
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self._owned.values())
+
+    def add(self, rule: ReflexRule) -> ReflexRule:
+        """Adds `rule` for its port.
+
+        Raises
+        ------
+        IndexError
+            If the Hub of the rule is not a valid Hub index.
+
+        """
+        key = (rule.hub << 8) | rule.port
+        if not 0 <= key < len(self._rules):
+            raise IndexError(f"[ReflexEngine]-[ERR]: NO HUB {rule.hub}...")
+        if isinstance(rule, StallRule):
+            rule.check = self._check_stall
+        self._rules[key] += (rule,)
+        self._owned[rule.owner].append(rule)
+        return rule
+
+    def remove(self, owner: Any, hub: int = None, port: int = None) -> int:
+        """Removes the rules of `owner`, only those of `port` of `hub` if given.
+
+        Returns
+        -------
+        int
+            The number of rules removed.
+
+        """
+        rules = self._owned.get(owner, [])
+        removed = [rule for rule in rules if hub is None or (rule.hub, rule.port) == (hub, port)]
+        for rule in removed:
+            rule.close()
+            key = (rule.hub << 8) | rule.port
+            self._rules[key] = tuple(r for r in self._rules[key] if r is not rule)
+            rules.remove(rule)
+        if not rules:
+            self._owned.pop(owner, None)
+        return len(removed)
+
+    def remap(self, hub: int, from_port: int, to_port: int) -> int:
+        """Moves the rules of `from_port` to `to_port` of the same Hub, their actions then command `to_port`.
+
+        The server calls it together with :meth:`legoBTLE.networking.routing.RoutingTable.remap`, when the Hub
+        announces the virtual port of a combined device that added its rules with the setup port.
+
+        Returns
+        -------
+        int
+            The number of rules moved.
+
+        """
+        from_key, to_key = (hub << 8) | from_port, (hub << 8) | to_port
+        moved, self._rules[from_key] = self._rules[from_key], ()
+        for rule in moved:
+            rule.port = to_port
+            action = bytearray(rule.action)
+            action[3] = to_port
+            rule.action = bytes(action)
+        self._rules[to_key] += moved
+        return len(moved)
+
+    def drop(self, owner: Any) -> int:
+        """Removes all rules of `owner`, e.g., a client connection that went away."""
+        return self.remove(owner)
+
+    def stats(self) -> List[dict]:
+        """The counters of all rules, see :meth:`ReflexRule.stats`."""
+        return [rule.stats() for rules in self._owned.values() for rule in rules]
+
+    def notify(self, hub: int, data: bytes, received: float = None) -> None:
+        """Evaluates the rules concerned by the notification `data` of Hub `hub`.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        data : bytes
+            A ``PORT_VALUE`` or ``PORT_CMD_FEEDBACK`` notification, other messages are ignored.
+        received : float, optional
+            When the notification was received, by the `clock` of the engine; now if not given.
+
+        Returns
+        -------
+        None
+
+        """
+        if received is None:
+            received = self._clock()
+        m_type = data[2]
+        if m_type == UPS_PORT_VALUE:
+            rules = self._rules[(hub << 8) | data[3]]
+            if rules:
+                value = int.from_bytes(data[4:], 'little', signed=True)
+                for rule in rules:
+                    if rule.on_value(value, received):
+                        self._fire(rule, received)
+        elif m_type == UPS_PORT_CMD_FEEDBACK:
+            # the feedback may report several ports as port, status pairs
+            for i in range(3, len(data) - 1, 2):
+                for rule in self._rules[(hub << 8) | data[i]]:
+                    rule.on_feedback(data[i + 1], received)
+        return
+
+    def _check_stall(self, rule: StallRule) -> None:
+        if rule.due(self._clock()):
+            self._fire(rule, rule.deadline)
+        return
+
+    def _fire(self, rule: ReflexRule, since: float) -> None:
+        self._write(rule.hub, rule.action)
+        latency = self._clock() - since
+        rule.fired += 1
+        rule.latency_sum += latency
+        if latency > rule.latency_max:
+            rule.latency_max = latency
+        if self._fired is not None:
+            self._fired(rule, latency)
+        return
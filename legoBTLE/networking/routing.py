@@ -0,0 +1,303 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.routing
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    The routing table of the server: which client connections receive the notifications of which port of which Hub.
+
+    The Hub addresses its ports with a single byte. The table therefore is a preallocated array of 256 slots per Hub
+    indexed by ``hub << 8 | port``, so that routing a notification costs exactly one array access.
+
+    Each port has at most one owner, the connection that registered the port and may send commands to it, and any
+    number of read-only observers, e.g., dashboards or loggers watching a motor another client drives. Next to the
+    owner, each slot holds the tuple of all subscribers, owner first, which the server hands each notification to,
+    see :meth:`RoutingTable.subscribers`. A connection that goes away only frees its own slots and subscriptions,
+    all other devices stay registered.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+from collections import defaultdict
+from typing import Any
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+class RoutingTable:
+    """Maps the 256 possible port bytes of each Hub to client connections.
+
+    The connection stored for a port can be any object, e.g., the ``(StreamReader, StreamWriter)`` tuple of the
+    client. It is used as is when routing and identifies the owner or observer of the port when the connection is
+    dropped.
+
+    The table is not thread-safe. All methods must be called from the event loop's thread.
+
+    Parameters
+    ----------
+    hubs : int, default 1
+        The number of Hubs, i.e., the valid Hub indices are ``0`` to ``hubs - 1``.
+
+    """
+
+    PORTS: int = 256
+
+    def __init__(self, hubs: int = 1):
+        if not 0 < hubs <= 256:
+            raise ValueError(f"[RoutingTable]-[ERR]: hubs MUST BE IN 1..256, GOT {hubs}...")
+        self._hubs: int = hubs
+        self._routes: List[Optional[Any]] = [None] * (RoutingTable.PORTS * hubs)
+        self._observers: List[Tuple[Any, ...]] = [()] * (RoutingTable.PORTS * hubs)
+        # owner and observers of each port, rebuilt whenever one of them changes
+        self._subscribers: List[Tuple[Any, ...]] = [()] * (RoutingTable.PORTS * hubs)
+        self._owned: defaultdict = defaultdict(set)
+        self._observed: defaultdict = defaultdict(set)
+        return
+
+    @property
+    def hubs(self) -> int:
+        """The number of Hubs the table has slots for."""
+        return self._hubs
+
+    def route(self, hub: int, port: int) -> Optional[Any]:
+        """The connection registered for `port` of `hub`, ``None`` if the port is not registered."""
+        return self._routes[(hub << 8) | port]
+
+    def subscribers(self, hub: int, port: int) -> Tuple[Any, ...]:
+        """The connections receiving the notifications of `port` of `hub`, the owner first, if any."""
+        return self._subscribers[(hub << 8) | port]
+
+    def observers(self, hub: int, port: int) -> Tuple[Any, ...]:
+        """The read-only observers of `port` of `hub`, in the order they subscribed."""
+        return self._observers[self._key(hub, port)]
+
+    def __len__(self) -> int:
+        return len(self._routes) - self._routes.count(None)
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], Any]]:
+        """Iterates over all registered ``((hub, port), connection)`` pairs."""
+        return (((key >> 8, key & 0xff), route) for key, route in enumerate(self._routes) if route is not None)
+
+    def ports(self, connection: Any) -> Tuple[Tuple[int, int], ...]:
+        """The ports owned by `connection`.
+
+        Parameters
+        ----------
+        connection : Any
+            The connection in question.
+
+        Returns
+        -------
+        tuple[tuple[int, int], ...]
+            The ``(hub, port)`` pairs owned by the connection, sorted ascending.
+
+        """
+        return tuple((key >> 8, key & 0xff) for key in sorted(self._owned.get(connection, ())))
+
+    def observed(self, connection: Any) -> Tuple[Tuple[int, int], ...]:
+        """The ``(hub, port)`` pairs `connection` observes, sorted ascending."""
+        return tuple((key >> 8, key & 0xff) for key in sorted(self._observed.get(connection, ())))
+
+    def register(self, hub: int, port: int, connection: Any) -> bool:
+        """Registers `connection` as receiver of the notifications for `port` of `hub`.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        port : int
+            The Hub port.
+        connection : Any
+            The connection that should receive the notifications.
+
+        Returns
+        -------
+        bool
+            ``True`` if the port has been registered, ``False`` if it is already owned by another connection.
+
+        Raises
+        ------
+        IndexError
+            If `hub` is not a valid Hub index.
+
+        """
+        key = self._key(hub, port)
+        current = self._routes[key]
+        if current is not None and current is not connection:
+            return False
+        if connection in self._observers[key]:
+            # an observer taking over the port is its owner from now on
+            self._remove_observer(connection, key)
+        self._routes[key] = connection
+        self._owned[connection].add(key)
+        self._update(key)
+        return True
+
+    def observe(self, hub: int, port: int, connection: Any) -> bool:
+        """Subscribes `connection` read-only to the notifications for `port` of `hub`.
+
+        The port need not have an owner, the observer receives the notifications of the port either way.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        port : int
+            The Hub port.
+        connection : Any
+            The connection that should receive the notifications.
+
+        Returns
+        -------
+        bool
+            ``True`` if `connection` observes the port, ``False`` if it owns the port.
+
+        Raises
+        ------
+        IndexError
+            If `hub` is not a valid Hub index.
+
+        """
+        key = self._key(hub, port)
+        if self._routes[key] is connection:
+            return False
+        if connection not in self._observers[key]:
+            self._observers[key] += (connection,)
+            self._observed[connection].add(key)
+            self._update(key)
+        return True
+
+    def unobserve(self, hub: int, port: int, connection: Any) -> bool:
+        """Ends the subscription of `connection` to `port` of `hub`.
+
+        Returns
+        -------
+        bool
+            ``True`` if `connection` had been observing the port, ``False`` otherwise.
+
+        """
+        key = self._key(hub, port)
+        if connection not in self._observers[key]:
+            return False
+        self._remove_observer(connection, key)
+        self._update(key)
+        return True
+
+    def unregister(self, hub: int, port: int) -> Optional[Any]:
+        """Frees `port` of `hub`, its observers keep receiving the notifications.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        port : int
+            The Hub port.
+
+        Returns
+        -------
+        Any
+            The connection that had been registered, ``None`` if there was none.
+
+        """
+        key = self._key(hub, port)
+        connection = self._routes[key]
+        if connection is not None:
+            self._routes[key] = None
+            self._discard(self._owned, connection, key)
+            self._update(key)
+        return connection
+
+    def remap(self, hub: int, from_port: int, to_port: int) -> Optional[Any]:
+        """Moves the registration of `from_port` to `to_port` of the same Hub in one step.
+
+        This is used when the Hub announces the virtual port of a combined device that registered with its setup
+        port. No notification can be routed while only one of both ports is set. The observers of `from_port` move
+        along and join those of `to_port`.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        from_port : int
+            The port the connection registered with.
+        to_port : int
+            The port the connection is moved to.
+
+        Returns
+        -------
+        Any
+            The re-routed connection, ``None`` if `from_port` was not registered (nothing is changed then).
+
+        """
+        from_key, to_key = self._key(hub, from_port), self._key(hub, to_port)
+        connection = self._routes[from_key]
+        if connection is None:
+            return None
+        displaced = self._routes[to_key]
+        self._routes[to_key], self._routes[from_key] = connection, None
+        if displaced is not None and displaced is not connection:
+            self._discard(self._owned, displaced, to_key)
+        owned = self._owned[connection]
+        owned.discard(from_key)
+        owned.add(to_key)
+        moved, self._observers[from_key] = self._observers[from_key], ()
+        for observer in moved:
+            self._discard(self._observed, observer, from_key)
+        if connection in self._observers[to_key]:
+            self._remove_observer(connection, to_key)
+        for observer in moved:
+            if observer is not connection and observer not in self._observers[to_key]:
+                self._observers[to_key] += (observer,)
+                self._observed[observer].add(to_key)
+        self._update(from_key)
+        self._update(to_key)
+        return connection
+
+    def drop(self, connection: Any) -> Tuple[Tuple[int, int], ...]:
+        """Frees all ports owned by `connection` and ends all its subscriptions.
+
+        Parameters
+        ----------
+        connection : Any
+            The connection that went away.
+
+        Returns
+        -------
+        tuple[tuple[int, int], ...]
+            The freed ``(hub, port)`` pairs.
+
+        """
+        keys = sorted(self._owned.pop(connection, ()))
+        for key in keys:
+            self._routes[key] = None
+            self._update(key)
+        for key in self._observed.pop(connection, ()):
+            self._observers[key] = tuple(observer for observer in self._observers[key] if observer is not connection)
+            self._update(key)
+        return tuple((key >> 8, key & 0xff) for key in keys)
+
+    def _key(self, hub: int, port: int) -> int:
+        if not 0 <= hub < self._hubs:
+            raise IndexError(f"[RoutingTable]-[ERR]: NO HUB {hub}, THE TABLE HOLDS {self._hubs} HUBS...")
+        return (hub << 8) | port
+
+    def _update(self, key: int) -> None:
+        owner = self._routes[key]
+        self._subscribers[key] = self._observers[key] if owner is None else (owner,) + self._observers[key]
+        return
+
+    def _remove_observer(self, connection: Any, key: int) -> None:
+        self._observers[key] = tuple(observer for observer in self._observers[key] if observer is not connection)
+        self._discard(self._observed, connection, key)
+        return
+
+    @staticmethod
+    def _discard(index: defaultdict, connection: Any, key: int) -> None:
+        keys = index.get(connection)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[connection]
+        return
@@ -0,0 +1,414 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.sender
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    The outbound side of a client connection of the server.
+
+    Every client gets one :class:`ClientSender`. Notifications are queued by :meth:`ClientSender.send` and written
+    by a single coroutine per client that collects everything queued in the meantime into one
+    :meth:`asyncio.StreamWriter.writelines` call followed by one ``drain()``. A slow client therefore neither causes
+    a drain task per notification nor an unbounded transport buffer: the queue is bounded and what happens when it is
+    full is decided by the :class:`OVERFLOW` policy.
+
+    Long before the queue is full, a client that lags behind is protected by two measures concerning the
+    ``PORT_VALUE`` frames only:
+
+    coalescing
+        A value of a port still waiting in the queue is replaced by the newer value of the same port, so that a
+        client reading slower than the Hub sends only gets the latest values, see the `coalesce` parameter.
+    maximum rate
+        The client declares how many values per second it wants of a port at most, see
+        :meth:`ClientSender.set_max_rate`. Values arriving faster are held back, only the latest one is sent when
+        the port is due again.
+
+    All other frames, e.g., ``PORT_CMD_FEEDBACK``, errors, attach events and the acknowledgements of the server,
+    are never coalesced, held back or dropped. They are delivered in the order the Hub sent them, and no value
+    overtakes them: values held back are queued before such a frame, and a queued value is only replaced if no such
+    frame has been queued after it. Only values are dropped when the queue is full; if it holds nothing but such
+    frames, another one is queued beyond `maxsize` all the same.
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import asyncio
+from asyncio.streams import StreamWriter
+from collections import deque
+from enum import Enum
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+from legoBTLE.legoWP.types import C
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+
+
+class OVERFLOW(Enum):
+    """What a :class:`ClientSender` does when its queue is full.
+
+    BLOCK
+        Keep every frame and pause the producer until the queue has drained to half its size.
+    DROP_OLDEST
+        Discard the oldest queued PORT_VALUE frame, the new one if none is queued.
+    LATEST_PER_PORT
+        Overwrite the queued PORT_VALUE frame of the same port with the new one, i.e., keep only the latest value
+        per port. If there is none, discard the oldest queued PORT_VALUE frame like DROP_OLDEST.
+
+    Other frames, e.g., feedback messages, are never discarded, see the module description.
+    """
+    BLOCK: str = 'block'
+    DROP_OLDEST: str = 'drop_oldest'
+    LATEST_PER_PORT: str = 'latest_per_port'
+
+
+class ClientSender:
+    """Bounded outbound queue plus sender coroutine of one client connection.
+
+    Frames are complete messages as sent by the Hub, i.e., starting with their length byte. On the wire, each frame
+    is preceded by that length byte once more, as the clients expect it.
+
+    All methods must be called from the event loop's thread.
+
+    Parameters
+    ----------
+    writer : StreamWriter
+        The writer of the client connection, or anything else with ``writelines()`` and ``drain()``, e.g., the
+        :class:`legoBTLE.networking.server.ClientProtocol` of the connection.
+    maxsize : int, default 256
+        The maximum number of queued frames.
+    policy : OVERFLOW, default OVERFLOW.DROP_OLDEST
+        What to do when the queue is full.
+    pause : Callable[[], None], optional
+        Called with policy :attr:`OVERFLOW.BLOCK` when the queue becomes full, e.g.,
+        :meth:`legoBTLE.networking.btle_io.BTLEReader.pause_reading`.
+    resume : Callable[[], None], optional
+        Called when the queue has drained after `pause` had been called.
+    name : str, default 'ClientSender'
+        Name used in messages.
+    coalesce : bool, default False
+        If ``True``, a queued ``PORT_VALUE`` frame is replaced by a newer value of the same port, see the module
+        description.
+
+    """
+
+    def __init__(self,
+                 writer: StreamWriter,
+                 maxsize: int = 256,
+                 policy: OVERFLOW = OVERFLOW.DROP_OLDEST,
+                 pause: Optional[Callable[[], None]] = None,
+                 resume: Optional[Callable[[], None]] = None,
+                 name: str = 'ClientSender',
+                 coalesce: bool = False):
+        if maxsize < 1:
+            raise ValueError(f"[{name}]-[ERR]: maxsize MUST BE AT LEAST 1, GOT {maxsize}...")
+        self._writer: StreamWriter = writer
+        self._maxsize: int = maxsize
+        self._policy: OVERFLOW = OVERFLOW(policy)
+        self._pause: Optional[Callable[[], None]] = pause
+        self._resume: Optional[Callable[[], None]] = resume
+        self._name: str = name
+        self._coalesce: bool = coalesce
+
+        # entries are [key, frame] with key = hub << 8 | port so that a queued value can be overwritten in place,
+        # key is -1 for all frames that must not be overwritten or dropped
+        self._queue: deque = deque()
+        # the queued value of each port that no other frame has been queued after
+        self._latest: Dict[int, list] = {}
+        # maximum rates: the seconds between two values, the time the next value is due and the value held back
+        self._intervals: Dict[int, float] = {}
+        self._due: Dict[int, float] = {}
+        self._held: Dict[int, Union[bytes, bytearray]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._paused: bool = False
+        self._closed: bool = False
+
+        self._sent: int = 0
+        self._bytes: int = 0
+        self._dropped: int = 0
+        self._overwritten: int = 0
+        self._coalesced: int = 0
+        self._batches: int = 0
+        self._max_depth: int = 0
+        return
+
+    @property
+    def depth(self) -> int:
+        """The number of frames currently queued."""
+        return len(self._queue)
+
+    @property
+    def dropped(self) -> int:
+        """The number of frames discarded because the queue was full, including overwritten ones."""
+        return self._dropped
+
+    @property
+    def policy(self) -> OVERFLOW:
+        return self._policy
+
+    def stats(self) -> dict:
+        """The counters of this sender.
+
+        Returns
+        -------
+        dict
+            ``depth``, ``max_depth``, ``sent``, ``bytes`` (sent, including the length prefixes), ``dropped``,
+            ``overwritten`` (the part of ``dropped`` replaced by a newer value of the same port), ``coalesced``
+            (values replaced by a newer one before the queue was full or while held back by a maximum rate),
+            ``held`` (values currently held back) and ``batches`` (the number of ``writelines`` calls).
+
+        """
+        return {
+                'depth': len(self._queue),
+                'max_depth': self._max_depth,
+                'sent': self._sent,
+                'bytes': self._bytes,
+                'dropped': self._dropped,
+                'overwritten': self._overwritten,
+                'coalesced': self._coalesced,
+                'held': len(self._held),
+                'batches': self._batches,
+                }
+
+    def start(self) -> asyncio.Task:
+        """Starts the sender coroutine.
+
+        Returns
+        -------
+        asyncio.Task
+            The task running the sender coroutine.
+
+        """
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    def send(self, frame: bytes) -> bool:
+        """Queues `frame` for the client.
+
+        Parameters
+        ----------
+        frame : bytes
+            The message, starting with its length byte.
+
+        Returns
+        -------
+        bool
+            ``True`` if the frame has been queued, held back or has replaced an older value of its port, ``False``
+            if a value, this one or another one, has been discarded because the queue was full.
+
+        """
+        if self._closed:
+            return False
+
+        if frame[2] != UPS_PORT_VALUE:
+            # nothing queued before may be overtaken by a value queued after this frame
+            if self._held:
+                self._flush_held()
+            if self._latest:
+                self._latest.clear()
+            return self._queue_frame(-1, frame)
+
+        key = (frame[1] << 8) | frame[3]
+        if self._intervals:
+            interval = self._intervals.get(key)
+            if interval is not None:
+                now = self._loop.time()
+                due = self._due.get(key, 0.0)
+                if now < due:
+                    if key in self._held:
+                        self._coalesced += 1
+                    else:
+                        self._timers[key] = self._loop.call_at(due, self._release_held, key)
+                    self._held[key] = frame
+                    return True
+                if key in self._held:
+                    # the timer is late, the held value must not follow the newer one
+                    self._held[key] = frame
+                    self._coalesced += 1
+                    self._release_held(key)
+                    return True
+                self._due[key] = now + interval
+        if self._coalesce:
+            entry = self._latest.get(key)
+            if entry is not None:
+                entry[1] = frame
+                self._coalesced += 1
+                return True
+        return self._queue_frame(key, frame)
+
+    def set_max_rate(self, hub: int, port: int, rate: Optional[float]) -> None:
+        """Limits the ``PORT_VALUE`` frames of `port` of `hub` to `rate` per second.
+
+        Values arriving faster are held back, only the latest one is sent when the port is due again. As a held
+        value is sent before any other frame is queued, frequent feedback frames may raise the rate a little.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        port : int
+            The Hub port.
+        rate : float, optional
+            Values per second, ``None`` or ``0`` to send all values.
+
+        Returns
+        -------
+        None
+
+        """
+        key = (hub << 8) | port
+        if not rate:
+            self._intervals.pop(key, None)
+            self._due.pop(key, None)
+            if key in self._held:
+                self._release_held(key)
+            return
+        if rate < 0:
+            raise ValueError(f"[{self._name}]-[ERR]: rate MUST NOT BE NEGATIVE, GOT {rate}...")
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        self._intervals[key] = 1.0 / rate
+        return
+
+    def _queue_frame(self, key: int, frame: bytes) -> bool:
+        queue = self._queue
+        result = True
+        if len(queue) >= self._maxsize:
+            if self._policy is OVERFLOW.BLOCK:
+                if not self._paused:
+                    self._paused = True
+                    if self._pause is not None:
+                        self._pause()
+            elif key >= 0:
+                if self._policy is OVERFLOW.LATEST_PER_PORT:
+                    entry = self._latest.get(key)
+                    if entry is not None:
+                        entry[1] = frame
+                        self._dropped += 1
+                        self._overwritten += 1
+                        return False
+                if not self._drop_oldest_value():
+                    # nothing but frames that must be delivered is queued
+                    self._dropped += 1
+                    return False
+                result = False
+            # other frames are queued beyond maxsize
+
+        entry = [key, frame]
+        queue.append(entry)
+        if key >= 0:
+            self._latest[key] = entry
+        if len(queue) > self._max_depth:
+            self._max_depth = len(queue)
+        self._wakeup.set()
+        return result
+
+    async def close(self) -> None:
+        """Stops the sender coroutine, discarding queued frames, and resumes a paused producer.
+
+        Returns
+        -------
+        None
+
+        """
+        self._closed = True
+        self._queue.clear()
+        self._latest.clear()
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._held.clear()
+        self._release()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+            self._task = None
+        return
+
+    async def _run(self) -> None:
+        queue = self._queue
+        writer = self._writer
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if not queue:
+                    continue
+
+                chunks: List[bytes] = []
+                latest = self._latest
+                size = 0
+                while queue:
+                    entry = queue.popleft()
+                    if latest.get(entry[0]) is entry:
+                        del latest[entry[0]]
+                    frame = entry[1]
+                    chunks.append(frame[0:1])
+                    chunks.append(frame)
+                    size += len(frame)
+                self._sent += len(chunks) >> 1
+                self._bytes += size + (len(chunks) >> 1)
+                self._batches += 1
+
+                writer.writelines(chunks)
+                await writer.drain()
+                if self._paused and len(queue) <= self._maxsize >> 1:
+                    self._release()
+        except ConnectionError as ce:
+            print(f"[{self._name}]-[MSG]: {C.WARNING}CLIENT CONNECTION LOST: {ce!r}... "
+                  f"DISCARDING {len(queue)} QUEUED FRAMES...{C.ENDC}")
+            self._closed = True
+            queue.clear()
+            self._latest.clear()
+            self._release()
+        return
+
+    def _release_held(self, key: int) -> None:
+        """Queues the value of `key` held back by the maximum rate, the port is due again one interval later."""
+        self._timers.pop(key).cancel()
+        frame = self._held.pop(key)
+        interval = self._intervals.get(key)
+        if interval is not None:
+            self._due[key] = self._loop.time() + interval
+        entry = self._latest.get(key) if self._coalesce else None
+        if entry is not None:
+            entry[1] = frame
+            self._coalesced += 1
+        else:
+            self._queue_frame(key, frame)
+        return
+
+    def _flush_held(self) -> None:
+        for key in sorted(self._held, key=lambda k: self._due.get(k, 0.0)):
+            self._release_held(key)
+        return
+
+    def _drop_oldest_value(self) -> bool:
+        """Discards the oldest queued ``PORT_VALUE`` frame, ``False`` if there is none."""
+        queue = self._queue
+        for i, entry in enumerate(queue):
+            if entry[0] >= 0:
+                del queue[i]
+                if self._latest.get(entry[0]) is entry:
+                    del self._latest[entry[0]]
+                self._dropped += 1
+                return True
+        return False
+
+    def _release(self) -> None:
+        if self._paused:
+            self._paused = False
+            if self._resume is not None:
+                self._resume()
+        return
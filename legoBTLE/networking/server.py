@@ -10,49 +10,174 @@
     :license: MIT, see :ref:`LICENSE` for details
 """
 
+import argparse
 import asyncio
 import os
+import time
 from asyncio import AbstractEventLoop
-from asyncio.streams import IncompleteReadError
-from asyncio.streams import StreamReader
-from asyncio.streams import StreamWriter
+import itertools
 from collections import defaultdict
-from datetime import datetime
+from typing import List
+from typing import Optional
 
 from legoBTLE.exceptions.Exceptions import ServerClientRegisterError, LegoBTLENoHubToConnectError, ExperimentException
 from legoBTLE.legoWP.message.downstream import CMD_COMMON_MESSAGE_HEADER
 from legoBTLE.legoWP.message.upstream import EXT_SERVER_NOTIFICATION
+from legoBTLE.legoWP.message.upstream import HUB_ATTACHED_IO_NOTIFICATION
 from legoBTLE.legoWP.message.upstream import UpStreamMessageBuilder
 from legoBTLE.legoWP.types import MESSAGE_TYPE
 from legoBTLE.legoWP.types import PERIPHERAL_EVENT
+from legoBTLE.legoWP.types import REFLEX_RULE
 from legoBTLE.legoWP.types import SERVER_SUB_COMMAND
 from legoBTLE.legoWP.types import C
+from legoBTLE.networking.btle_io import BTLELink
+from legoBTLE.networking.metrics import Registry
+from legoBTLE.networking.metrics import serve_metrics
+from legoBTLE.networking.recorder import DIRECTION
+from legoBTLE.networking.recorder import NO_CONNECTION
+from legoBTLE.networking.recorder import TrafficRecorder
+from legoBTLE.networking.reflex import ReflexEngine
+from legoBTLE.networking.reflex import ReflexRule
+from legoBTLE.networking.reflex import StallRule
+from legoBTLE.networking.reflex import ThresholdRule
+from legoBTLE.networking.routing import RoutingTable
+from legoBTLE.networking.sender import ClientSender
+from legoBTLE.networking.sender import OVERFLOW
+from legoBTLE.networking.simulator import SimulatedHub
+from legoBTLE.networking.telemetry import TelemetryWriter
+from legoBTLE.networking.transport import UNIX
+from legoBTLE.networking.transport import create_server
 
-if os.name == 'posix':
+try:
     from bluepy import btle
-    from bluepy.btle import BTLEInternalError, Peripheral
+    from bluepy.btle import Peripheral
+except ImportError:
+    # without bluepy, the server runs against simulated Hubs, see legoBTLE.networking.simulator
+    btle = None
+    Peripheral = None
 
-global host
-global port
-if os.name == 'posix':
-    global Future_BTLEDevice
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# the connected Hubs, the index is the hub_id byte clients address a Hub with
+HUB_ADDRESSES: List[str] = ['90:84:2B:5E:CF:1F']
+btleHubs: List[BTLELink] = []
 
-connectedDevices: defaultdict = defaultdict()
+connectedDevices: RoutingTable = RoutingTable()
 internalDevices: defaultdict = defaultdict()
+clientSenders: dict = {}
+# ids of the client connections as recorded by the RECORDER
+_client_ids = itertools.count()
+
+# records all frames if set, see legoBTLE.networking.recorder
+RECORDER: Optional[TrafficRecorder] = None
+# publishes the port values to shared memory if set, see legoBTLE.networking.telemetry
+TELEMETRY: Optional[TelemetryWriter] = None
+
+# outbound queue of each client, see legoBTLE.networking.sender
+SENDER_QUEUE_SIZE: int = 256
+SENDER_OVERFLOW: OVERFLOW = OVERFLOW.DROP_OLDEST
+# a PORT_VALUE still queued for a client is replaced by the newer value of the port
+SENDER_COALESCE: bool = True
+
+# downstream writes, see legoBTLE.networking.btle_io.BTLEWriter
+WRITE_WINDOW: int = 8
+# Port output commands are acknowledged by the Hub with PORT_CMD_FEEDBACK anyway, so that the link layer
+# acknowledgement of a write with response can be saved for them.
+WRITE_WITHOUT_RESPONSE: bool = False
+DNS_PORT_CMD: int = MESSAGE_TYPE.DNS_PORT_CMD[0]
+
+# the receive buffer of each client connection and the longest message, handle and size included
+CLIENT_BUFFER_SIZE: int = 1 << 16
+MAX_CLIENT_MESSAGE: int = 2 + 255
+
+
+def _port_metrics(direction: str, hub: int, port: int) -> tuple:
+    """The message and byte counters of a port, to be kept by the caller, see :meth:`Family.labels`."""
+    return M_MESSAGES.labels(direction, hub, port), M_BYTES.labels(direction, hub, port)
+
+
+def _per_client(stat: str):
+    """Collects `stat` of :meth:`legoBTLE.networking.sender.ClientSender.stats` for all clients."""
+    return lambda: [((f"{c[0]}:{c[1]}",), sender.stats()[stat]) for c, sender in list(clientSenders.items())]
+
+
+# see legoBTLE.networking.metrics, the snapshot is served if the server is started with --metrics
+METRICS: Registry = Registry()
+M_MESSAGES = METRICS.counter('legobtle_messages_total', 'Messages per direction, Hub and port.',
+                             ('direction', 'hub', 'port'))
+M_BYTES = METRICS.counter('legobtle_bytes_total', 'Bytes per direction, Hub and port.', ('direction', 'hub', 'port'))
+M_CLIENT_MESSAGES_IN = METRICS.counter('legobtle_client_messages_received_total', 'Messages received per client.',
+                                       ('client',))
+M_CLIENT_BYTES_IN = METRICS.counter('legobtle_client_bytes_received_total', 'Bytes received per client.', ('client',))
+M_CLIENT_MESSAGES_OUT = METRICS.counter('legobtle_client_messages_sent_total', 'Messages sent per client.',
+                                        ('client',), collect=_per_client('sent'))
+M_CLIENT_BYTES_OUT = METRICS.counter('legobtle_client_bytes_sent_total', 'Bytes sent per client.', ('client',),
+                                     collect=_per_client('bytes'))
+M_CLIENT_DROPPED = METRICS.counter('legobtle_client_dropped_total',
+                                   'Messages discarded per client because its queue was full.', ('client',),
+                                   collect=_per_client('dropped'))
+M_CLIENT_COALESCED = METRICS.counter('legobtle_client_coalesced_total',
+                                     'Port values per client replaced by a newer one before being sent.', ('client',),
+                                     collect=_per_client('coalesced'))
+M_CLIENT_QUEUE = METRICS.gauge('legobtle_client_queue_depth', 'Messages queued per client.', ('client',),
+                               collect=_per_client('depth'))
+M_BLE_WRITE = METRICS.histogram('legobtle_ble_write_seconds',
+                                'Seconds from queueing a command to having written it to the Hub.', ('hub',))
+M_BLE_IN_FLIGHT = METRICS.gauge(
+        'legobtle_ble_writes_in_flight', 'Commands queued or being written per Hub.', ('hub',),
+        collect=lambda: [((hub,), link.writer.in_flight) for hub, link in enumerate(btleHubs)])
+M_FORWARD = METRICS.histogram('legobtle_forward_seconds',
+                              'Seconds from receiving a notification to queueing it for the client.', ('hub',))
+M_REGISTRATIONS = METRICS.counter('legobtle_registrations_total', 'Port registrations per Hub.', ('hub',))
+M_REGISTERED = METRICS.gauge('legobtle_registered_ports', 'Ports currently registered.',
+                             collect=lambda: (((), len(connectedDevices)),))
+M_CLIENTS = METRICS.gauge('legobtle_clients', 'Client connections.', collect=lambda: (((), len(clientSenders)),))
+M_REFLEX_FIRED = METRICS.counter('legobtle_reflex_fired_total', 'Commands sent by reflex rules per Hub, port and rule.',
+                                 ('hub', 'port', 'rule'))
+M_REFLEX_LATENCY = METRICS.histogram('legobtle_reflex_reaction_seconds',
+                                     'Seconds from the notification, or the end of the stall window, to having queued '
+                                     'the command of a reflex rule.', ('hub',))
+M_REFLEX_RULES = METRICS.gauge('legobtle_reflex_rules', 'Reflex rules currently added.',
+                               collect=lambda: (((), len(REFLEXES)),))
+
+# raw byte values for routing notifications without decoding them
+UPS_HUB_ATTACHED_IO: int = MESSAGE_TYPE.UPS_HUB_ATTACHED_IO[0]
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+UPS_PORT_CMD_FEEDBACK: int = MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0]
+UPS_HUB_GENERIC_ERROR: int = MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR[0]
+DNS_VIRTUAL_PORT_SETUP: int = MESSAGE_TYPE.DNS_VIRTUAL_PORT_SETUP[0]
+VIRTUAL_IO_ATTACHED: int = PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED[0]
+
+# connect legoBTLE.networking.simulator.SimulatedHub instances instead of the real Hubs
+SIMULATE: bool = btle is None
 
 if os.name == 'posix':
-    class BTLEDelegate(btle.DefaultDelegate):
+    class BTLEDelegate(btle.DefaultDelegate if btle is not None else object):
         """Delegate class that initially handles the raw data coming from the Lego(c) Model.
+        
+        There is one delegate per connected Hub, `hub` is the index of that Hub.
         """
-        def __init__(self, loop: AbstractEventLoop, remoteHost=('127.0.0.1', 8888)):
+        def __init__(self, loop: AbstractEventLoop, hub: int = 0, remoteHost=('127.0.0.1', 8888), debug: bool = False):
             
             super().__init__()
             self._loop = loop
+            self._hub: int = hub
             self._remoteHost = remoteHost
+            self._debug: bool = debug
+            self._forward = M_FORWARD.labels(hub)
+            # the counters of each port, looked up on the first notification of the port
+            self._port_metrics: List[Optional[tuple]] = [None] * RoutingTable.PORTS
             return
         
         def handleNotification(self, cHandle, data):  # actual Callback function
-            """Distribute received notifications to the respective device.
+            """Hand received notifications over to the event loop.
+            
+            The method is called in the thread of the :class:`legoBTLE.networking.btle_io.BTLEReader`. As the
+            client connections belong to the event loop, the notification is only scheduled here and distributed by
+            :meth:`_route_notification` in the event loop's thread.
 
             Parameters
             ----------
@@ -66,76 +191,144 @@ if os.name == 'posix':
             None
                 Nothing
             """
-            print(f"[BTLEDelegate]-[MSG]: Returned NOTIFICATION = {data.hex()}")
-            M_RET = UpStreamMessageBuilder(data, debug=True).build()
+            self._loop.call_soon_threadsafe(self._route_notification, data, time.perf_counter())
+            return
+        
+        def _route_notification(self, data: bytearray, received: float = None):
+            """Distribute received notifications to the respective device.
             
-            try:
-                if (M_RET is not None) and (M_RET.m_header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO) and (M_RET.m_io_event == PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED):
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tCOMMAND         -->  {M_RET.COMMAND}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tHEADER          -->  {M_RET.m_header}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_TYPE          -->  {M_RET.m_header.m_type}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_TYPE ==       -->  {M_RET.m_header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_IO_EVENT      -->  {M_RET.m_io_event}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_IO_EVENT ==   -->  {M_RET.m_io_event == PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_PORT          -->  {M_RET.m_port}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_PORT_A        -->  {M_RET.m_port_a}{C.ENDC}", end="\r\n")
-                    print(f"{C.BOLD}{C.FAIL}RAW:\tM_PORT_B        -->  {M_RET.m_port_b}{C.ENDC}", end="\r\n")
-                if (M_RET is not None) and (M_RET.m_header.m_type == MESSAGE_TYPE.UPS_HUB_ATTACHED_IO) and (
-                        M_RET.m_io_event == PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED):
-                    # we search for the setup port with which the combined device first registered
-                    setup_port: int = (110 +
-                                       1 * int.from_bytes(M_RET.m_port_a, 'little', signed=False) +
-                                       2 * int.from_bytes(M_RET.m_port_b, 'little', signed=False)
-                                       )
-                    print(f"*****************************************************SETUPPORT: {setup_port}")
-                    connectedDevices[setup_port][1].write(data[0:1])
-                    asyncio.create_task(connectedDevices[setup_port][1].drain())
-                    connectedDevices[setup_port][1].write(data)
-                    asyncio.create_task(connectedDevices[setup_port][1].drain())
-                    
-                    # change initial port value of motor_a.port + motor_b.port to virtual port
-                    connectedDevices[data[3]] = connectedDevices[setup_port][0], connectedDevices[setup_port][1]
-                    del connectedDevices[setup_port]
-                elif (M_RET.m_header.m_type == MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR) and (M_RET.m_error_cmd == MESSAGE_TYPE.DNS_VIRTUAL_PORT_SETUP):
-                    print("*" * 10, f"[BTLEDelegate.handleNotification()]-[MSG]:  {C.BOLD}{C.OKBLUE}VIRTUAL PORT SETUP: ACK -- BEGIN\r\n")
-                    print("*" * 10,
-                          f"[BTLEDelegate.handleNotification()]-[MSG]:  {C.BOLD}{C.OKBLUE}RECEIVED GENERIC_ERROR_NOTIFICATION: OK, see\r\n")
-                    print("*" * 10,
-                          f"[BTLEDelegate.handleNotification()]-[MSG]:  {C.BOLD}{C.OKBLUE}https://lego.github.io/lego-ble-wireless-protocol-docs/index.html#hub-attached-i-o\r\n")
-                    print("*" * 10,
-                          f"[BTLEDelegate.handleNotification()]-[MSG]:  {C.BOLD}{C.OKBLUE}VIRTUAL PORT SETUP: ACK -- END \r\n")
-                else:
-                    print(f"To PORT: {data[3]}")
-                    connectedDevices[data[3]][1].write(data[0:1])
-                    connectedDevices[data[3]][1].write(data)
-                    asyncio.create_task(connectedDevices[data[3]][1].drain())
-            except TypeError as te:
-                print(
-                        f"[BTLEDelegate]-[MSG]: WRONG ANSWER\r\n\t\t{data.hex()}\r\nFROM BTLE... {C.FAIL}IGNORING...{C.ENDC}\r\n\t{te.args}")
+            Only the message type byte ``data[2]`` and the port byte ``data[3]`` are looked at, the notification
+            itself is forwarded unchanged. Messages are fully decoded only if the server has to act upon them, i.e.,
+            a virtual port that has been set up (:meth:`_route_virtual_io_attached`).
+            
+            The owner of the port and all its observers receive the very same frame, each through its own
+            :class:`legoBTLE.networking.sender.ClientSender` queue, see :meth:`RoutingTable.subscribers`.
+            
+            The Hub always sends the hub_id ``0x00``. For all but the first Hub, the hub_id byte is replaced by the
+            index of the Hub, so that clients can tell the Hubs apart.
+
+            Parameters
+            ----------
+            data : bytearray
+                Notifications from the bluetooth device as bytearray.
+            received : float, optional
+                The :func:`time.perf_counter` when the notification was received, for the forwarding latency.
+                
+            Returns
+            -------
+            None
+                Nothing
+            """
+            metrics = self._port_metrics[data[3]]
+            if metrics is None:
+                metrics = self._port_metrics[data[3]] = _port_metrics('upstream', self._hub, data[3])
+            metrics[0].inc()
+            metrics[1].inc(len(data))
+            if RECORDER is not None:
+                route = connectedDevices.route(self._hub, data[3])
+                RECORDER.record(DIRECTION.UPSTREAM, self._hub, NO_CONNECTION if route is None else route[3], data)
+            m_type = data[2]
+            if TELEMETRY is not None and m_type == UPS_PORT_VALUE:
+                TELEMETRY.publish(self._hub, data[3], int.from_bytes(data[4:], 'little', signed=True))
+            if REFLEXES.armed and (m_type == UPS_PORT_VALUE or m_type == UPS_PORT_CMD_FEEDBACK):
+                REFLEXES.notify(self._hub, data, received)
+            if m_type == UPS_HUB_ATTACHED_IO and data[4] == VIRTUAL_IO_ATTACHED:
+                self._route_virtual_io_attached(data)
                 return
-            except KeyError as ke:
-                print(f"[BTLEDelegate]-[MSG]: DEVICE CLIENT AT PORT [{data[3]}] {C.BOLD}{C.WARNING}NOT CONNECTED{C.ENDC} "
-                      f"TO SERVER [{self._remoteHost[0]}:{self._remoteHost[1]}]... {C.WARNING}Ignoring Notification from BTLE...{C.ENDC}")
-            else:
-                print(f"[BTLEDelegate]-[MSG]: {C.BOLD}{C.OKBLUE}FOUND PORT {data[3]} / {C.UNDERLINE}MESSAGE SENT...{C.ENDC}\n-----------------------")
+            elif m_type == UPS_HUB_GENERIC_ERROR:
+                if data[3] == DNS_VIRTUAL_PORT_SETUP:
+                    if self._debug:
+                        print("*" * 10, f"[BTLEDelegate.handleNotification()]-[MSG]:  {C.BOLD}{C.OKBLUE}"
+                                        f"VIRTUAL PORT SETUP: ACK, see\r\n")
+                        print("*" * 10, f"[BTLEDelegate.handleNotification()]-[MSG]:  {C.BOLD}{C.OKBLUE}"
+                                        f"https://lego.github.io/lego-ble-wireless-protocol-docs/index.html#hub-attached-i-o\r\n")
+                    return
+            
+            hub = self._hub
+            routes = connectedDevices.subscribers(hub, data[3])
+            if not routes:
+                if self._debug:
+                    print(f"[BTLEDelegate]-[MSG]: DEVICE CLIENT AT PORT [{hub}:{data[3]}] {C.BOLD}{C.WARNING}NOT CONNECTED{C.ENDC} "
+                          f"TO SERVER [{self._remoteHost[0]}:{self._remoteHost[1]}]... {C.WARNING}Ignoring Notification "
+                          f"from BTLE...{C.ENDC}")
+                return
+            # built once, the senders only read the frame
+            data = bytes((data[0], hub)) + data[2:] if hub else bytes(data)
+            for route in routes:
+                route[2].send(data)
+            if received is not None:
+                self._forward.observe(time.perf_counter() - received)
+            if self._debug:
+                print(f"[BTLEDelegate]-[MSG]: {C.BOLD}{C.OKBLUE}FOUND PORT {data[3]} / {C.UNDERLINE}MESSAGE SENT: "
+                      f"{data.hex()}...{C.ENDC}")
+            return
+        
+        def _route_virtual_io_attached(self, data: bytearray):
+            """Re-route a combined device to the virtual port the Hub assigned to it.
+            
+            The combined device, i.e., the :class:`legoBTLE.device.SynchronizedMotor.SynchronizedMotor`, registered
+            with the setup port ``110 + port_a + 2 * port_b``. From now on, it receives the notifications of the
+            virtual port instead.
+
+            Parameters
+            ----------
+            data : bytearray
+                The ``HUB_ATTACHED_IO`` notification announcing the virtual port.
+
+            Returns
+            -------
+            None
+                Nothing
+            """
+            M_RET = HUB_ATTACHED_IO_NOTIFICATION(data)
+            # we search for the setup port with which the combined device first registered
+            setup_port: int = (110 +
+                               1 * int.from_bytes(M_RET.m_port_a, 'little', signed=False) +
+                               2 * int.from_bytes(M_RET.m_port_b, 'little', signed=False)
+                               )
+            if self._debug:
+                print(f"{C.BOLD}{C.FAIL}RAW:\tCOMMAND         -->  {M_RET.COMMAND}{C.ENDC}", end="\r\n")
+                print(f"{C.BOLD}{C.FAIL}RAW:\tM_PORT          -->  {M_RET.m_port}{C.ENDC}", end="\r\n")
+                print(f"{C.BOLD}{C.FAIL}RAW:\tM_PORT_A        -->  {M_RET.m_port_a}{C.ENDC}", end="\r\n")
+                print(f"{C.BOLD}{C.FAIL}RAW:\tM_PORT_B        -->  {M_RET.m_port_b}{C.ENDC}", end="\r\n")
+                print(f"{C.BOLD}{C.FAIL}RAW:\tSETUP PORT      -->  {setup_port}{C.ENDC}", end="\r\n")
+            route = connectedDevices.remap(self._hub, setup_port, data[3])
+            if route is None:
+                print(f"[BTLEDelegate]-[MSG]: NO DEVICE CLIENT REGISTERED AT SETUP PORT [{self._hub}:{setup_port}] FOR "
+                      f"VIRTUAL PORT [{data[3]}]... {C.WARNING}Ignoring Notification from BTLE...{C.ENDC}")
+                return
+            # the notifications arrive with the virtual port from now on
+            REFLEXES.remap(self._hub, setup_port, data[3])
+            # the initial port value of motor_a.port + motor_b.port has been changed to the virtual port, the
+            # observers of the setup port and the reflex rules have been moved along
+            data = bytes((data[0], self._hub)) + data[2:] if self._hub else bytes(data)
+            for route in connectedDevices.subscribers(self._hub, data[3]):
+                route[2].send(data)
             return
     
     
-    async def connectBTLE(loop: AbstractEventLoop, deviceaddr: str = '90:84:2B:5E:CF:1F', host: str = '127.0.0.1',
-                          btleport: int = 9999) -> Peripheral:
+    async def connectBTLE(loop: AbstractEventLoop, deviceaddr: str = '90:84:2B:5E:CF:1F', hub: int = 0,
+                          host: str = '127.0.0.1', btleport: int = 9999, simulate: bool = None) -> Peripheral:
         """.. import:: <isonum.txt>
         Establish the LEGO\ |copy| Hub <-> Computer bluetooth connection.
+        
+        The blocking connect runs in the default executor, so that several Hubs can be connected concurrently.
 
         Parameters
         ----------
         loop : `AbstractEventLoop`
             A reference to the event lopp.
+        hub : int, default 0
+            The index of the Hub, i.e., the hub_id clients address it with.
         btleport : int
             The server port.
         host : str
             The hostname.
         deviceaddr : str
             The MAC Address of the LEGO\ |copy| Hub.
+        simulate : bool, optional
+            If ``True``, connect a :class:`legoBTLE.networking.simulator.SimulatedHub` instead of the Hub. Defaults
+            to :data:`SIMULATE`, i.e., ``True`` if bluepy is not installed.
         
         Raises
         ------
@@ -145,8 +338,11 @@ if os.name == 'posix':
         
         print(f"[BTLE]-[MSG]: {C.HEADER}{C.BLINK}COMMENCE CONNECT TO [{deviceaddr}]{C.ENDC}...")
         try:
-            BTLE_DEVICE: Peripheral = Peripheral(deviceaddr)
-            BTLE_DEVICE.withDelegate(BTLEDelegate(loop=loop, remoteHost=(host, 8888)))
+            if SIMULATE if simulate is None else simulate:
+                BTLE_DEVICE = SimulatedHub(addr=deviceaddr)
+            else:
+                BTLE_DEVICE: Peripheral = await loop.run_in_executor(None, Peripheral, deviceaddr)
+            BTLE_DEVICE.withDelegate(BTLEDelegate(loop=loop, hub=hub, remoteHost=(host, 8888)))
         except Exception as btle_ex:
             raise
         else:
@@ -154,204 +350,591 @@ if os.name == 'posix':
             return BTLE_DEVICE
     
     
-    def _listenBTLE(btledevice: Peripheral, loop, debug: bool = False):
-        try:
-            if btledevice.waitForNotifications(.001):
-                if debug:
-                    print(f"[SERVER]-[MSG]: NOTIFICATION RECEIVED... [T: {datetime.timestamp(datetime.now())}]")
-        except BTLEInternalError:
-            pass
-        finally:
-            loop.call_later(.0015, _listenBTLE, btledevice, loop, debug)
+    def linkBTLE(btledevice: Peripheral, loop: AbstractEventLoop) -> BTLELink:
+        """Start receiving the notifications of and writing the commands to a LEGO(c) Hub.
+        
+        The notifications are received by a dedicated :class:`legoBTLE.networking.btle_io.BTLEReader` thread that
+        sleeps until the Hub actually sends something, so that neither the CPU nor the event loop is kept busy
+        while the Hub is idle. The commands are written by a :class:`legoBTLE.networking.btle_io.BTLEWriter` thread.
+        Each Hub gets its own pair of threads.
+        
+        Parameters
+        ----------
+        btledevice : Peripheral
+            The connected Hub with the :class:`BTLEDelegate` set.
+        loop : AbstractEventLoop
+            The event loop of the server.
+
+        Returns
+        -------
+        BTLELink
+            The running reader and writer threads.
+            
+        """
+        return BTLELink(btledevice, loop=loop, window=WRITE_WINDOW, name=btledevice.addr,
+                        write_latency=M_BLE_WRITE.labels(len(btleHubs)).observe).start()
+
+
+def _pause_btle_reading():
+    for link in btleHubs:
+        link.reader.pause_reading()
+    return
+
+
+def _resume_btle_reading():
+    for link in btleHubs:
+        link.reader.resume_reading()
+    return
+
+
+def _reflex_write(hub: int, command: bytes) -> None:
+    """Writes the command of a reflex rule to the Hub, if the write window is full as soon as a slot is free."""
+    if hub >= len(btleHubs):
         return
+    data = bytearray(command)
+    data[1] = 0x00
+    if RECORDER is not None:
+        RECORDER.record(DIRECTION.DOWNSTREAM, hub, NO_CONNECTION, data)
+    with_response = not (WRITE_WITHOUT_RESPONSE and data[2] == DNS_PORT_CMD)
+    writer = btleHubs[hub].writer
+    if not writer.write_nowait(0x0e, data, with_response):
+        asyncio.ensure_future(writer.write(0x0e, data, with_response))
+    return
+
+
+def _reflex_fired(rule: ReflexRule, latency: float) -> None:
+    M_REFLEX_FIRED.labels(rule.hub, rule.port, REFLEX_RULE.NAMES_BY_INT[rule.KIND]).inc()
+    M_REFLEX_LATENCY.labels(rule.hub).observe(latency)
+    return
+
+
+# the reflex rules of the clients, evaluated in BTLEDelegate._route_notification, see legoBTLE.networking.reflex
+REFLEXES: ReflexEngine = ReflexEngine(write=_reflex_write, fired=_reflex_fired, hubs=connectedDevices.hubs)
+
+
+def reflex_stats() -> list:
+    """The counters of all reflex rules, see :meth:`legoBTLE.networking.reflex.ReflexEngine.stats`."""
+    return REFLEXES.stats()
+
 
+def client_stats() -> dict:
+    """The outbound queue counters of all connected clients.
 
-async def _listen_clients(reader: StreamReader, writer: StreamWriter, debug: bool = True) -> bool:
-    """This is the central message receiving function.
+    Returns
+    -------
+    dict
+        For each client address, the counters of its :class:`legoBTLE.networking.sender.ClientSender`, e.g., the
+        queue ``depth`` and the number of ``dropped`` frames.
+
+    """
+    return {conn_info: sender.stats() for conn_info, sender in clientSenders.items()}
+
+
+class ClientProtocol(asyncio.BufferedProtocol):
+    """This is the central message receiving class, one instance per client connection.
     
-    The function listens for incoming message (the commands) from the devices.
-    Once a message has been received it is - if not the initial connection request - sent to the BTLE device.
+    The protocol receives the messages (the commands) from the devices. Once a message has been received it is - if
+    not the initial connection request - sent to the BTLE device.
+    
+    Each message arrives as ``[handle, size]`` followed by ``size`` bytes. The event loop reads straight into the
+    receive buffer of the protocol, see :meth:`get_buffer`, and :meth:`buffer_updated` processes all complete
+    messages received at once; only the message itself is copied, as it is changed and handed over to the
+    :class:`legoBTLE.networking.btle_io.BTLEWriter` thread. Unlike a :class:`asyncio.StreamReader` loop, there
+    is neither an intermediate buffer nor a wakeup of a coroutine per message.
+    
+    If the write window of a Hub is full, reading from the client is paused and the remaining messages are
+    processed as soon as the command has been queued.
+    
+    The protocol is also the writer of the :class:`legoBTLE.networking.sender.ClientSender` of the connection.
     
     Parameters
     ----------
-    reader : StreamReader
-        The reader instance
-    writer : StreamWriter
-        The write instance.
     debug : bool
         If ``True``:
             Verbose Messages to stdout
         else:
             don't show.
-
-    Returns
-    -------
-    bool
-        ``True`` if everything is good, ``False`` otherwise.
-        
+    host : str, default '127.0.0.1'
+        The address the server listens on, only used in the messages.
+    port : int, default 8888
+        The port the server listens on, replaced by the actual port of a TCP connection.
+            
     """
     
-    global host
-    global port
-    global Future_BTLEDevice
-    conn_info = writer.get_extra_info('peername')
+    def __init__(self, debug: bool = True, host: str = '127.0.0.1', port: int = 8888):
+        self._debug: bool = debug
+        self._host: str = host
+        self._port: int = port
+        self._buffer: bytearray = bytearray(CLIENT_BUFFER_SIZE)
+        # the received but not yet processed bytes are self._buffer[self._start:self._end]
+        self._start: int = 0
+        self._end: int = 0
+        self._transport: Optional[asyncio.Transport] = None
+        # the command waiting for a free slot of the Hub's write window
+        self._blocked: Optional[asyncio.Future] = None
+        self._can_write: asyncio.Event = asyncio.Event()
+        self._can_write.set()
+        self._closed: bool = False
+        
+        self.conn_info: tuple = ('', 0)
+        self.sender: Optional[ClientSender] = None
+        self.connection: Optional[tuple] = None
+        return
+    
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self._transport = transport
+        sockname = transport.get_extra_info('sockname')
+        if isinstance(sockname, tuple):
+            self._host, self._port = sockname[:2]
+        client_id: int = next(_client_ids) % NO_CONNECTION
+        # clients of a Unix domain socket have no name of their own
+        self.conn_info = conn_info = transport.get_extra_info('peername') or ('unix', client_id)
+        self._client_label = f"{conn_info[0]}:{conn_info[1]}"
+        self.sender = ClientSender(self,
+                                   maxsize=SENDER_QUEUE_SIZE,
+                                   policy=SENDER_OVERFLOW,
+                                   pause=_pause_btle_reading,
+                                   resume=_resume_btle_reading,
+                                   name=self._client_label,
+                                   coalesce=SENDER_COALESCE)
+        self.sender.start()
+        clientSenders[conn_info] = self.sender
+        # owner of the ports this client registers, route[2] is the sender, route[3] the client id
+        self.connection = (self, transport, self.sender, client_id)
+        self._received_messages = M_CLIENT_MESSAGES_IN.labels(self._client_label)
+        self._received_bytes = M_CLIENT_BYTES_IN.labels(self._client_label)
+        # the counters of each hub << 8 | port the client sent to, looked up on the first message
+        self._port_metrics: dict = {}
+        return
+    
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if isinstance(exc, ConnectionAbortedError):
+            print(f"[{self._host}:{self._port}]-[MSG]: CLIENT [{self._client_label}] ABORTED CONNECTION... DISCONNECTED...")
+        else:
+            print(f"[{self._host}:{self._port}]-[MSG]: CLIENT [{self._client_label}] RESET CONNECTION... DISCONNECTED...")
+        self._closed = True
+        self._can_write.set()
+        if self._blocked is not None:
+            self._blocked.cancel()
+        connectedDevices.drop(self.connection)
+        REFLEXES.drop(self.connection)
+        clientSenders.pop(self.conn_info, None)
+        M_CLIENT_MESSAGES_IN.remove(self._client_label)
+        M_CLIENT_BYTES_IN.remove(self._client_label)
+        asyncio.ensure_future(self.sender.close())
+        return
+    
+    # the writer interface the ClientSender uses
+    
+    def writelines(self, data) -> None:
+        self._transport.writelines(data)
+        return
+    
+    async def drain(self) -> None:
+        await self._can_write.wait()
+        if self._closed:
+            raise ConnectionResetError(f"[{self._client_label}]-[ERR]: CONNECTION LOST...")
+        return
+    
+    def get_extra_info(self, name: str, default=None):
+        return self._transport.get_extra_info(name, default)
+    
+    def pause_writing(self) -> None:
+        self._can_write.clear()
+        return
+    
+    def resume_writing(self) -> None:
+        self._can_write.set()
+        return
+    
+    # receiving
+    
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if len(self._buffer) - self._end < MAX_CLIENT_MESSAGE:
+            # move the incomplete message to the front, a message always fits after that
+            pending = self._end - self._start
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, pending
+        return memoryview(self._buffer)[self._end:]
     
-    size: int = 0
-    handle: int = -1
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        if self._blocked is None:
+            self._process()
+        return
+    
+    def eof_received(self) -> bool:
+        return False
+    
+    def _process(self) -> None:
+        """Processes the complete messages in the buffer until the write window of a Hub is full."""
+        buffer = self._buffer
+        start, end = self._start, self._end
+        while end - start >= 2:
+            stop = start + 2 + buffer[start + 1]
+            if stop > end:
+                break
+            handle: int = buffer[start]
+            data: bytearray = buffer[start + 2:stop]
+            self._start = start = stop
+            pending = self._message(handle, data)
+            if pending is not None and not btleHubs[pending[0]].writer.write_nowait(*pending[1:]):
+                self._transport.pause_reading()
+                self._blocked = asyncio.ensure_future(self._write_blocked(pending))
+                return
+        if start == end:
+            self._start = self._end = 0
+        return
     
-    while True:
+    async def _write_blocked(self, pending: tuple) -> None:
+        hub, *command = pending
         try:
-            carrier_info: bytearray = bytearray(await reader.readexactly(n=2))
-            size: int = carrier_info[1]
-            handle: int = carrier_info[0]
-            print(f"[{host}:{port}]-[MSG]: {C.OKGREEN}CARRIER SIGNAL DETECTED: handle={handle}, size={size}...{C.ENDC}")
-            CLIENT_MSG_DATA: bytearray = bytearray(await reader.readexactly(n=size))
+            await btleHubs[hub].writer.write(*command)
+        except asyncio.CancelledError:
+            return
+        finally:
+            self._blocked = None
+        if not self._closed:
+            self._process()
+            if self._blocked is None:
+                self._transport.resume_reading()
+        return
+    
+    def _message(self, handle: int, CLIENT_MSG_DATA: bytearray) -> Optional[tuple]:
+        """Processes one message from the client.
+
+        Parameters
+        ----------
+        handle : int
+            The handle the message was sent with.
+        CLIENT_MSG_DATA : bytearray
+            The message, starting with its length byte.
+
+        Returns
+        -------
+        Optional[tuple]
+            ``(hub, handle, data, withResponse)`` if the message is to be written to a Hub, ``None`` otherwise.
+
+        """
+        debug = self._debug
+        conn_info = self.conn_info
+        connection = self.connection
+        sender = self.sender
+        size: int = len(CLIENT_MSG_DATA)
+        if debug:
+            print(f"[{self._host}:{self._port}]-[MSG]: {C.OKGREEN}CARRIER SIGNAL DETECTED: handle={handle}, size={size}...{C.ENDC}")
+        if size < 4:
+            print(f"[{self._host}:{self._port}]-[MSG]: {C.WARNING}MESSAGE TOO SHORT... IGNORING [{CLIENT_MSG_DATA.hex()}] FROM "
+                  f"[{conn_info[0]}:{conn_info[1]}]...{C.ENDC}")
+            return None
+        if RECORDER is not None:
+            RECORDER.record(DIRECTION.DOWNSTREAM, CLIENT_MSG_DATA[1], connection[3], CLIENT_MSG_DATA)
+        self._received_messages.inc()
+        self._received_bytes.inc(size + 2)
+        key: int = (CLIENT_MSG_DATA[1] << 8) | CLIENT_MSG_DATA[3]
+        metrics = self._port_metrics.get(key)
+        if metrics is None:
+            metrics = self._port_metrics[key] = _port_metrics('downstream', CLIENT_MSG_DATA[1], CLIENT_MSG_DATA[3])
+        metrics[0].inc()
+        metrics[1].inc(size)
+        
+        # the hub_id selects the Hub, the Hub itself expects 0x00
+        hub: int = CLIENT_MSG_DATA[1]
+        if hub >= connectedDevices.hubs:
+            print(f"[{self._host}:{self._port}]-[MSG]: {C.WARNING}NO HUB {hub} CONNECTED... IGNORING "
+                  f"[{CLIENT_MSG_DATA.hex()}] FROM [{conn_info[0]}:{conn_info[1]}]...{C.ENDC}")
+            return None
+        
+        if CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_GENERAL_HUB_NOTIFICATIONS[0]:
+            print(f"{C.BOLD}{C.FAIL}{CLIENT_MSG_DATA.hex()}{C.ENDC}")
+            if debug:
+                print(
+                        f"[{self._host}:{self._port}]-[MSG]: {C.BOLD}{C.UNDERLINE}{C.OKBLUE}SENDING{C.ENDC}: "
+                        f"{C.OKGREEN}{C.BOLD}{handle}, {CLIENT_MSG_DATA[2:].hex()}{C.ENDC} {C.BOLD}{C.UNDERLINE}{C.OKBLUE} "
+                        f"FROM{C.ENDC}{C.BOLD}{C.OKBLUE} DEVICE [{conn_info[0]}:{conn_info[1]}]{C.UNDERLINE} "
+                        f"TO{C.ENDC}{C.BOLD}{C.OKBLUE} BTLE device{C.ENDC}")
+            if hub < len(btleHubs):
+                print(f"HANDLE: {handle} / DATA: {CLIENT_MSG_DATA[2:]}")
+                return hub, 0x0f, CLIENT_MSG_DATA[2:], True
+            return None
+        if debug:
+            print(
+                    f"[{self._host}:{self._port}]-[MSG]: {C.BOLD}{C.OKBLUE}{C.UNDERLINE}RECEIVED "
+                    f"CLIENTMESSAGE{C.ENDC}{C.BOLD}{C.OKBLUE}: {CLIENT_MSG_DATA.hex()} FROM DEVICE "
+                    f"[{conn_info[0]}:{conn_info[1]}]{C.ENDC}")
             
-            if CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_GENERAL_HUB_NOTIFICATIONS[0]:
-                print(f"{C.BOLD}{C.FAIL}{CLIENT_MSG_DATA.hex()}{C.ENDC}")
+        con_key_index = CLIENT_MSG_DATA[3]
+        reg_request: bool = ((CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0])
+                             and (CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.REG_W_SERVER[0]))
+        disconnect_request: bool = ((CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0])
+                                    and (CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.DISCONNECT_F_SERVER[0]))
+        
+        if (CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0]
+                and CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.OBSERVE_W_SERVER[0]):
+            if not connectedDevices.observe(hub, con_key_index, connection):
                 if debug:
-                    print(
-                            f"[{host}:{port}]-[MSG]: {C.BOLD}{C.UNDERLINE}{C.OKBLUE}SENDING{C.ENDC}: "
-                            f"{C.OKGREEN}{C.BOLD}{handle}, {CLIENT_MSG_DATA[2:].hex()}{C.ENDC} {C.BOLD}{C.UNDERLINE}{C.OKBLUE} "
-                            f"FROM{C.ENDC}{C.BOLD}{C.OKBLUE} DEVICE [{conn_info[0]}:{conn_info[1]}]{C.UNDERLINE} "
-                            f"TO{C.ENDC}{C.BOLD}{C.OKBLUE} BTLE device{C.ENDC}")
-                if os.name == 'posix':
-                    print(f"HANDLE: {handle} / DATA: {CLIENT_MSG_DATA[2:]}")
-                    Future_BTLEDevice.writeCharacteristic(0x0f, val=CLIENT_MSG_DATA[2:], withResponse=True)
-                continue
+                    print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] OWNS PORT [{hub}:{con_key_index}], "
+                          f"REFUSING OBSERVE REQUEST...")
+                # the client waits for an answer, the port stays owned by the connection
+                REFUSED_MSG_DATA: bytearray = CLIENT_MSG_DATA
+                REFUSED_MSG_DATA[-1:] = PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED
+                sender.send(UpStreamMessageBuilder(data=REFUSED_MSG_DATA, debug=True).build().COMMAND)
+                return None
             if debug:
-                print(
-                        f"[{host}:{port}]-[MSG]: {C.BOLD}{C.OKBLUE}{C.UNDERLINE}RECEIVED "
-                        f"CLIENTMESSAGE{C.ENDC}{C.BOLD}{C.OKBLUE}: {CLIENT_MSG_DATA.hex()} FROM DEVICE "
-                        f"[{conn_info[0]}:{conn_info[1]}]{C.ENDC}")
-                
-            con_key_index = CLIENT_MSG_DATA[3]
+                print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] OBSERVING PORT [{hub}:{con_key_index}], "
+                      f"{len(connectedDevices.observers(hub, con_key_index))} OBSERVERS...")
+            ACK_MSG_DATA: bytearray = CLIENT_MSG_DATA
+            ACK_MSG_DATA[-1:] = PERIPHERAL_EVENT.EXT_SRV_CONNECTED
+            sender.send(UpStreamMessageBuilder(data=ACK_MSG_DATA, debug=True).build().COMMAND)
+            return None
+        
+        if (CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0]
+                and CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.SET_MAX_RATE[0] and size >= 7):
+            # only concerns what this client receives, no matter whether it owns or observes the port
+            max_rate: int = int.from_bytes(CLIENT_MSG_DATA[4:6], 'little', signed=False)
+            sender.set_max_rate(hub, con_key_index, max_rate)
+            if debug:
+                print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] MAX RATE OF PORT "
+                      f"[{hub}:{con_key_index}]: {max_rate or 'UNLIMITED'}...")
+            return None
+        
+        if CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0] and (
+                CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.ADD_REFLEX[0]
+                or CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.CLEAR_REFLEX[0]):
+            self._reflex(hub, con_key_index, CLIENT_MSG_DATA)
+            return None
+        
+        route = connectedDevices.route(hub, con_key_index)
+        # an observer of a port without owner is disconnected below
+        if (route is None and not disconnect_request) or (reg_request and route is not connection):
+            # wait until Connection Request from client
+            if not reg_request:
+                return None
+            if debug:
+                print("*"*10, f" {C.BOLD}{C.OKBLUE}NEW DEVICE: {con_key_index} DETECTED", end="*" * 10+f"{C.ENDC}\r\n")
+            if connectedDevices.unregister(hub, con_key_index) is not None:
+                # the device reconnected, only its own port is taken over
+                print(f"[{self._host}:{self._port}]-[MSG]: DEVICE AT PORT {con_key_index} RECONNECTED FROM "
+                      f"[{conn_info[0]}:{conn_info[1]}]...")
+            connectedDevices.register(hub, con_key_index, connection)
+            M_REGISTRATIONS.labels(hub).inc()
+            if debug:
+                print("**", " " * 8, f"\t\t{C.BOLD}{C.OKBLUE}DEVICE: {con_key_index} REGISTERED",
+                      end="*" * 10 + f"{C.ENDC}\r\n")
+                print(f"{C.BOLD}{C.OKBLUE}*"*20, end=f"{C.ENDC}\r\n")
+
+                print("*" * 10, f" {C.BOLD}{C.OKBLUE}[{self._host}:{self._port}]-[MSG]: SUMMARY CONNECTED DEVICES:{C.ENDC}")
+                for con_dev_k, con_dev_v in connectedDevices.items():
+                    print(f"{C.BOLD}{C.OKBLUE}**[{self._host}:{self._port}]-[MSG]: \t"
+                          f"PORT: {con_dev_k} / DEVICE: {con_dev_v[1]}{C.ENDC}")
+                print(f"{C.BOLD}{C.OKBLUE}*" * 20, end=f"{C.ENDC}\r\n")
+            
+            ACK_MSG_DATA: bytearray = CLIENT_MSG_DATA
+            ACK_MSG_DATA[-1:] = PERIPHERAL_EVENT.EXT_SRV_CONNECTED
+            ACK_MSG = UpStreamMessageBuilder(data=ACK_MSG_DATA, debug=True).build()
             
-            if con_key_index not in connectedDevices.keys():
-                # wait until Connection Request from client
-                if ((CLIENT_MSG_DATA[2] != MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0])
-                        or (CLIENT_MSG_DATA[-1] != SERVER_SUB_COMMAND.REG_W_SERVER[0])):
-                    continue
-                else:
-                    if ((CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0])
-                            or (CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.REG_W_SERVER[0])):
-                        if debug:
-                            print("*"*10, f" {C.BOLD}{C.OKBLUE}NEW DEVICE: {con_key_index} DETECTED", end="*" * 10+f"{C.ENDC}\r\n")
-                        connectedDevices[con_key_index] = (reader, writer)
-                        if debug:
-                            print("**", " " * 8, f"\t\t{C.BOLD}{C.OKBLUE}DEVICE: {con_key_index} REGISTERED",
-                                  end="*" * 10 + f"{C.ENDC}\r\n")
-                            print(f"{C.BOLD}{C.OKBLUE}*"*20, end=f"{C.ENDC}\r\n")
+            sender.send(ACK_MSG.COMMAND)
+            if debug:
+                print(f"[{self._host}:{self._port}]-[MSG]: SENT ACKNOWLEDGEMENT TO DEVICE AT [{conn_info[0]}:{conn_info[1]}]...")
+            return None
+        
+        if debug:
+            print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}]: CONNECTION FOUND IN DICTIONARY...")
+            print(
+                    f"[{self._host}:{self._port}]-[MSG]: RECEIVED [{CLIENT_MSG_DATA.hex()!r}] FROM "
+                    f"[{conn_info[0]}:{conn_info[1]}]")
+        
+        if disconnect_request:
+            print(
+                    f"[{self._host}:{self._port}]-[MSG]: RECEIVED REQ FOR DISCONNECTING DEVICE: "
+                    f"[{conn_info[0]}:{conn_info[1]}]...")
+            disconnect: bytearray = bytearray(
+                    CLIENT_MSG_DATA[1:2] +
+                    MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD +
+                    CLIENT_MSG_DATA[3:4] +
+                    SERVER_SUB_COMMAND.DISCONNECT_F_SERVER +
+                    PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED
+                    )
+            disconnect = bytearray(
+                    bytearray((len(disconnect) + 1).to_bytes(1, byteorder='little', signed=False)) +
+                    disconnect
+                    )
+            ACK: EXT_SERVER_NOTIFICATION = EXT_SERVER_NOTIFICATION(disconnect)
+            sender.send(ACK.COMMAND)
+            if route is connection:
+                connectedDevices.unregister(hub, con_key_index)
+                REFLEXES.remove(connection, hub, con_key_index)
+            else:
+                connectedDevices.unobserve(hub, con_key_index, connection)
+            if debug:
+                print(f"[{self._host}:{self._port}]-[MSG]: DEVICE [{conn_info[0]}:{conn_info[1]}] DISCONNECTED FROM SERVER...")
+                print(f"connected Devices: {dict(connectedDevices.items())}")
+            return None
+        elif CLIENT_MSG_DATA[2] == DNS_VIRTUAL_PORT_SETUP:
+            if debug:
+                print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] RECEIVED VIRTUAL PORT SETUP REQUEST...")
+        elif reg_request:
+            if debug:
+                print(
+                    f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] ALREADY CONNECTED, IGNORING REQUEST...")
+            return None
+        elif route is not connection and connection in connectedDevices.observers(hub, con_key_index):
+            print(f"[{self._host}:{self._port}]-[MSG]: {C.WARNING}[{conn_info[0]}:{conn_info[1]}] ONLY OBSERVES PORT "
+                  f"[{hub}:{con_key_index}]... IGNORING COMMAND [{CLIENT_MSG_DATA.hex()}]...{C.ENDC}")
+            return None
+        elif debug:
+            print(f"[{self._host}:{self._port}]-[MSG]: SENDING [{CLIENT_MSG_DATA.hex()}]:[{con_key_index!r}] "
+                  f"FROM {conn_info!r}")
+        if hub < len(btleHubs):
+            CLIENT_MSG_DATA[1] = 0x00
+            return (hub, 0x0e, CLIENT_MSG_DATA,
+                    not (WRITE_WITHOUT_RESPONSE and CLIENT_MSG_DATA[2] == DNS_PORT_CMD))
+        return None
     
-                            print("*" * 10, f" {C.BOLD}{C.OKBLUE}[{host}:{port}]-[MSG]: SUMMARY CONNECTED DEVICES:{C.ENDC}")
-                            for con_dev_k, con_dev_v in connectedDevices.items():
-                                print(f"{C.BOLD}{C.OKBLUE}**[{host}:{port}]-[MSG]: \t"
-                                      f"PORT: {con_dev_k} / DEVICE: {con_dev_v[1]}{C.ENDC}")
-                            print(f"{C.BOLD}{C.OKBLUE}*" * 20, end=f"{C.ENDC}\r\n")
-                        
-                        ACK_MSG_DATA: bytearray = CLIENT_MSG_DATA
-                        ACK_MSG_DATA[-1:] = PERIPHERAL_EVENT.EXT_SRV_CONNECTED
-                        ACK_MSG = UpStreamMessageBuilder(data=ACK_MSG_DATA, debug=True).build()
-                        
-                        connectedDevices[con_key_index][1].write(ACK_MSG.COMMAND[0:1])
-                        await connectedDevices[con_key_index][1].drain()
-                        connectedDevices[con_key_index][1].write(ACK_MSG.COMMAND)
-                        await connectedDevices[con_key_index][1].drain()
-                        if debug:
-                            print(f"[{host}:{port}]-[MSG]: SENT ACKNOWLEDGEMENT TO DEVICE AT [{conn_info[0]}:{conn_info[1]}]...")
-                    else:
-                        print("*" * 10, f" {C.BOLD}{C.FAIL}WRONG COMMAND / THIS SHOULD NOT BE POSSIBLE",
-                                  end="*" * 10 + f"{C.ENDC}\r\n")
-                        raise ServerClientRegisterError(message=CLIENT_MSG_DATA.hex())
+    def _reflex(self, hub: int, con_key_index: int, CLIENT_MSG_DATA: bytearray) -> None:
+        """Adds or clears the reflex rules of the client for a port.
+        
+        An ``ADD_REFLEX`` request reads ``[size, hub, type, port, rule, a (int32), b (int32), action..., subCMD]``,
+        the action being a port output command to the same port, starting with its length byte, see
+        :class:`legoBTLE.legoWP.message.downstream.CMD_EXT_SRV_REFLEX_REQ`. Only the owner of the port may add rules;
+        any other action is refused, :func:`_reflex_write` sets nothing but the Hub byte.
+
+        Parameters
+        ----------
+        hub : int
+            The Hub index.
+        con_key_index : int
+            The port of the Hub.
+        CLIENT_MSG_DATA : bytearray
+            The request, starting with its length byte.
+
+        Returns
+        -------
+        None
+
+        """
+        conn_info = self.conn_info
+        connection = self.connection
+        if CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.CLEAR_REFLEX[0]:
+            removed = REFLEXES.remove(connection, hub, con_key_index)
+            if self._debug:
+                print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] CLEARED {removed} REFLEX RULES OF PORT "
+                      f"[{hub}:{con_key_index}]...")
+            return
+        if connectedDevices.route(hub, con_key_index) is not connection:
+            print(f"[{self._host}:{self._port}]-[MSG]: {C.WARNING}[{conn_info[0]}:{conn_info[1]}] DOES NOT OWN PORT "
+                  f"[{hub}:{con_key_index}]... IGNORING REFLEX RULE [{CLIENT_MSG_DATA.hex()}]...{C.ENDC}")
+            return
+        kind: int = CLIENT_MSG_DATA[4]
+        a: int = int.from_bytes(CLIENT_MSG_DATA[5:9], 'little', signed=True)
+        b: int = int.from_bytes(CLIENT_MSG_DATA[9:13], 'little', signed=True)
+        action: bytes = bytes(CLIENT_MSG_DATA[13:-1])
+        try:
+            if kind == REFLEX_RULE.STALL[0]:
+                rule = StallRule(hub, con_key_index, action, owner=connection, min_delta=a, window=b / 1000)
             else:
-                if debug:
-                    print(f"[{host}:{port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}]: CONNECTION FOUND IN DICTIONARY...")
-                    print(
-                            f"[{host}:{port}]-[MSG]: RECEIVED [{CLIENT_MSG_DATA.hex()!r}] FROM "
-                            f"[{conn_info[0]}:{conn_info[1]}]")
-                
-                if ((CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD[0])
-                        and (CLIENT_MSG_DATA[-1] == SERVER_SUB_COMMAND.DISCONNECT_F_SERVER[0])):
-                    print(
-                            f"[{host}:{port}]-[MSG]: RECEIVED REQ FOR DISCONNECTING DEVICE: "
-                            f"[{conn_info[0]}:{conn_info[1]}]...")
-                    disconnect: bytearray = bytearray(
-                            b'\x00' +
-                            MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD +
-                            CLIENT_MSG_DATA[3:4] +
-                            SERVER_SUB_COMMAND.DISCONNECT_F_SERVER +
-                            PERIPHERAL_EVENT.EXT_SRV_DISCONNECTED
-                            )
-                    disconnect = bytearray(
-                            bytearray((len(disconnect) + 1).to_bytes(1, byteorder='little', signed=False)) +
-                            disconnect
-                            )
-                    ACK: EXT_SERVER_NOTIFICATION = EXT_SERVER_NOTIFICATION(disconnect)
-                    connectedDevices[con_key_index][1].write(ACK.m_header.m_length)
-                    await connectedDevices[con_key_index][1].drain()
-                    connectedDevices[con_key_index][1].write(ACK.COMMAND)
-                    await connectedDevices[con_key_index][1].drain()
-                    connectedDevices.pop(con_key_index)
-                    if debug:
-                        print(f"[{host}:{port}]-[MSG]: DEVICE [{conn_info[0]}:{conn_info[1]}] DISCONNECTED FROM SERVER...")
-                        print(f"connected Devices: {connectedDevices}")
-                    continue
-                elif CLIENT_MSG_DATA[2] == MESSAGE_TYPE.DNS_VIRTUAL_PORT_SETUP[0]:
-                    if debug:
-                        print(f"[{host}:{port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] RECEIVED VIRTUAL PORT SETUP REQUEST...")
-                elif ((CLIENT_MSG_DATA[2] == MESSAGE_TYPE.UPS_DNS_EXT_SERVER_CMD)
-                      and (CLIENT_MSG_DATA[4] == SERVER_SUB_COMMAND.REG_W_SERVER)):
-                    if debug:
-                        print(
-                            f"[{host}:{port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] ALREADY CONNECTED, IGNORING REQUEST...")
-                    continue
-                else:
-                    if debug:
-                        print(f"[{host}:{port}]-[MSG]: SENDING [{CLIENT_MSG_DATA.hex()}]:[{con_key_index!r}] "
-                              f"FROM {conn_info!r}")
-                if os.name == 'posix':
-                    Future_BTLEDevice.writeCharacteristic(0x0e, CLIENT_MSG_DATA, True)
-        except (IncompleteReadError, ConnectionError, ConnectionResetError):
-            print(f"[{host}:{port}]-[MSG]: CLIENT [{conn_info[0]}:{conn_info[1]}] RESET CONNECTION... "
-                  f"DISCONNECTED...")
-            await asyncio.sleep(.05)
-            connectedDevices.clear()
-            return False
-        except ConnectionAbortedError:
-            print(
-                    f"[{host}:{port}]-[MSG]: CLIENT [{conn_info[0]}:{conn_info[1]}] ABORTED CONNECTION... "
-                    f"DISCONNECTED...")
-            await asyncio.sleep(.05)
-            connectedDevices.clear()
-            return False
-        continue
-    return True
+                rule = ThresholdRule(hub, con_key_index, action, owner=connection, threshold=a, kind=kind)
+            REFLEXES.add(rule)
+        except (ValueError, IndexError) as ex:
+            print(f"[{self._host}:{self._port}]-[MSG]: {C.WARNING}[{conn_info[0]}:{conn_info[1]}] INVALID REFLEX RULE "
+                  f"[{CLIENT_MSG_DATA.hex()}]: {ex}...{C.ENDC}")
+            return
+        if self._debug:
+            print(f"[{self._host}:{self._port}]-[MSG]: [{conn_info[0]}:{conn_info[1]}] ADDED REFLEX RULE "
+                  f"{REFLEX_RULE.NAMES_BY_INT[kind]} TO PORT [{hub}:{con_key_index}]...")
+        return
+
+
+async def start_server(host: str = '127.0.0.1', port: int = 8888, debug: bool = True) -> asyncio.AbstractServer:
+    """Starts accepting client connections, each one handled by a :class:`ClientProtocol`.
+
+    Parameters
+    ----------
+    host : str, default '127.0.0.1'
+        The address to listen on, ``'unix:/path'`` for a Unix domain socket or ``'loop:'`` for the in-process
+        loopback, see :mod:`legoBTLE.networking.transport`.
+    port : int, default 8888
+        The port to listen on, ``0`` for any free port.
+    debug : bool, default True
+        Passed on to :class:`ClientProtocol`, as are `host` and `port`.
+
+    Returns
+    -------
+    asyncio.AbstractServer
+        The listening server, a :class:`legoBTLE.networking.transport.LoopbackServer` for the loopback.
+
+    """
+    return await create_server(lambda: ClientProtocol(debug=debug, host=host, port=port), host, port)
 
 
 if __name__ == '__main__':
     
-    global Future_BTLEDevice
+    parser = argparse.ArgumentParser(description='Routes the messages between the devices and the LEGO(c) Hubs.')
+    parser.add_argument('--hub', dest='hubs', action='append', metavar='ADDRESS',
+                        help='MAC address of a Hub, repeat for several Hubs; the n-th Hub is addressed with hub_id n')
+    parser.add_argument('--simulate', action='store_true',
+                        help='connect simulated Hubs instead, implied if bluepy is not installed')
+    parser.add_argument('--record', metavar='PATH',
+                        help='record all frames to PATH, see legoBTLE.networking.recorder')
+    parser.add_argument('--metrics', metavar='ADDRESS',
+                        help='serve the metrics at HOST:PORT or unix:PATH, see legoBTLE.networking.metrics')
+    parser.add_argument('--telemetry', metavar='NAME',
+                        help='publish the port values to shared memory NAME, see legoBTLE.networking.telemetry')
+    parser.add_argument('--listen', metavar='ADDRESS', default='127.0.0.1:8888',
+                        help='listen for devices at HOST:PORT or unix:PATH, default 127.0.0.1:8888')
+    parser.add_argument('--no-uvloop', action='store_true',
+                        help='use the asyncio event loop even if uvloop is installed')
+    args = parser.parse_args()
+    if args.hubs:
+        HUB_ADDRESSES = args.hubs
+    SIMULATE = SIMULATE or args.simulate
+    if args.record:
+        RECORDER = TrafficRecorder(args.record)
+    if args.telemetry:
+        TELEMETRY = TelemetryWriter(args.telemetry, hubs=len(HUB_ADDRESSES))
+    connectedDevices = RoutingTable(hubs=len(HUB_ADDRESSES))
+    REFLEXES = ReflexEngine(write=_reflex_write, fired=_reflex_fired, hubs=len(HUB_ADDRESSES))
     
+    if uvloop is not None and not args.no_uvloop:
+        uvloop.install()
     loop = asyncio.get_event_loop()
-    server = loop.run_until_complete(asyncio.start_server(
-            _listen_clients, '127.0.0.1', 8888))
+    if args.listen.startswith(UNIX):
+        host, port = args.listen, 0
+    else:
+        host, _, port = args.listen.rpartition(':')
+        host, port = host or '127.0.0.1', int(port)
+    server = loop.run_until_complete(start_server(host, port))
     try:
         
         loop.run_until_complete(asyncio.wait((asyncio.ensure_future(server.serve_forever()),), timeout=.1))
-        host, port = server.sockets[0].getsockname()
+        if not host.startswith(UNIX):
+            host, port = server.sockets[0].getsockname()[:2]
         print(f"[{host}:{port}]-[MSG]: SERVER RUNNING...")
-        if (os.name == 'posix') and callable(connectBTLE) and callable(_listenBTLE):
+        if args.metrics:
+            loop.run_until_complete(serve_metrics(METRICS, args.metrics))
+            print(f"[{host}:{port}]-[MSG]: METRICS SERVED AT [{args.metrics}]...")
+        if (os.name == 'posix') and callable(connectBTLE) and callable(linkBTLE):
             try:
-                Future_BTLEDevice = loop.run_until_complete(asyncio.ensure_future(connectBTLE(loop=loop)))
+                btle_devices = loop.run_until_complete(asyncio.gather(
+                        *(connectBTLE(loop=loop, deviceaddr=address, hub=hub)
+                          for hub, address in enumerate(HUB_ADDRESSES))))
             except Exception as btle_ex:
                 raise
             else:
-                loop.call_soon(_listenBTLE, Future_BTLEDevice, loop)
-                print(f"[{host}:{port}]: BTLE CONNECTION TO [{Future_BTLEDevice.services} SET UP...")
+                for hub, btle_device in enumerate(btle_devices):
+                    btleHubs.append(linkBTLE(btle_device, loop))
+                    print(f"[{host}:{port}]: BTLE CONNECTION TO HUB {hub} [{btle_device.addr}] SET UP...")
         
         loop.run_forever()
     except KeyboardInterrupt:
         print(f"SHUTTING DOWN...")
+        for link in btleHubs:
+            link.stop(timeout=1.0)
+        if RECORDER is not None:
+            RECORDER.close()
+            print(f"{RECORDER.records} FRAMES RECORDED TO {RECORDER.path}...")
+        if TELEMETRY is not None:
+            TELEMETRY.close()
         loop.run_until_complete(loop.shutdown_asyncgens())
         loop.stop()
         
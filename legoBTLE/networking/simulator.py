@@ -0,0 +1,543 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.simulator
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    An in-process stand-in for the LEGO(c) Hub behind a bluepy ``Peripheral``.
+
+    :class:`SimulatedHub` offers the part of the ``Peripheral`` interface the server uses, i.e., ``withDelegate``,
+    ``waitForNotifications``, ``writeCharacteristic`` and ``disconnect``, plus ``fileno`` for the
+    :class:`legoBTLE.networking.btle_io.BTLEReader`. It understands the downstream messages built by
+    :mod:`legoBTLE.legoWP.message.downstream` and answers them like the Hub does:
+
+    *  enabling the notifications (handle ``0x0f``) announces all attached motors with ``HUB_ATTACHED_IO``,
+    *  a port input format setup is confirmed with a port input format message and followed by ``PORT_VALUE``
+       updates whenever the position changed by at least the requested delta,
+    *  a virtual port setup is acknowledged and announced with ``HUB_ATTACHED_IO`` (virtual IO attached),
+    *  port output commands are reported with ``PORT_CMD_FEEDBACK`` when they start, get discarded and complete.
+
+    The motors follow a simple kinematic model: the speed ramps up and down with the acceleration and deceleration
+    profile times, the position is the integrated speed, and a motor stops exactly at its target.
+
+    Example::
+
+        from legoBTLE.networking.simulator import SimulatedHub
+        hub = SimulatedHub(ports=(0x00, 0x01, 0x02, 0x03))
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import os
+import select
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from legoBTLE.legoWP.types import CMD_RETURN_CODE
+from legoBTLE.legoWP.types import DEVICE_TYPE
+from legoBTLE.legoWP.types import MESSAGE_TYPE
+from legoBTLE.legoWP.types import PERIPHERAL_EVENT
+from legoBTLE.legoWP.types import SUB_COMMAND
+
+# message types
+DNS_PORT_NOTIFICATION: int = MESSAGE_TYPE.DNS_PORT_NOTIFICATION[0]
+DNS_VIRTUAL_PORT_SETUP: int = MESSAGE_TYPE.DNS_VIRTUAL_PORT_SETUP[0]
+DNS_PORT_CMD: int = MESSAGE_TYPE.DNS_PORT_CMD[0]
+UPS_HUB_ATTACHED_IO: int = MESSAGE_TYPE.UPS_HUB_ATTACHED_IO[0]
+UPS_HUB_GENERIC_ERROR: int = MESSAGE_TYPE.UPS_HUB_GENERIC_ERROR[0]
+UPS_PORT_VALUE: int = MESSAGE_TYPE.UPS_PORT_VALUE[0]
+UPS_PORT_NOTIFICATION: int = MESSAGE_TYPE.UPS_PORT_NOTIFICATION[0]
+UPS_PORT_CMD_FEEDBACK: int = MESSAGE_TYPE.UPS_PORT_CMD_FEEDBACK[0]
+
+# command feedback bits
+FB_IN_PROGRESS: int = 0x01
+FB_COMPLETED: int = 0x02
+FB_DISCARDED: int = 0x04
+FB_IDLE: int = 0x08
+FB_BUSY: int = 0x10
+
+# bits of the startup and completion byte
+EXEC_IMMEDIATELY: int = 0x10
+COMMAND_FEEDBACK: int = 0x01
+
+# the first port number the Hub assigns to virtual ports
+FIRST_VIRTUAL_PORT: int = 0x10
+
+
+class SimulatedMotor:
+    """Kinematic model of a tacho motor.
+
+    Parameters
+    ----------
+    max_speed : float, default 900.0
+        Speed in degrees per second at 100%.
+    acc_time : float, default .1
+        Seconds to accelerate from 0% to 100%.
+    dec_time : float, default .1
+        Seconds to decelerate from 100% to 0%.
+
+    """
+
+    def __init__(self, max_speed: float = 900.0, acc_time: float = .1, dec_time: float = .1):
+        self.max_speed: float = max_speed
+        self.acc_time: float = acc_time
+        self.dec_time: float = dec_time
+        self.position: float = 0.0
+        self.velocity: float = 0.0
+        self._set_velocity: float = 0.0
+        self._target: Optional[float] = None
+        self._deadline: Optional[float] = None
+        # a blocked motor does not move, but keeps executing its command, i.e., it stalls
+        self.blocked: bool = False
+        return
+
+    @property
+    def busy(self) -> bool:
+        """``True`` while the motor is moving towards a target position or for a given time."""
+        return self._target is not None or self._deadline is not None
+
+    @property
+    def moving(self) -> bool:
+        return self.velocity != 0.0 or self._set_velocity != 0.0
+
+    def run(self, speed: int) -> None:
+        """Runs the motor at `speed` percent until told otherwise."""
+        self._target, self._deadline = None, None
+        self._set_velocity = self._speed(speed)
+        return
+
+    def run_for(self, seconds: float, speed: int, now: float) -> None:
+        """Runs the motor at `speed` percent for `seconds`."""
+        self._target, self._deadline = None, now + seconds
+        self._set_velocity = self._speed(speed)
+        return
+
+    def move_to(self, position: float, speed: int) -> None:
+        """Moves the motor to `position` at `abs(speed)` percent."""
+        self._deadline = None
+        if position == self.position:
+            self._target = None
+            self._set_velocity = 0.0
+            return
+        self._target = float(position)
+        self._set_velocity = abs(self._speed(speed)) * (1.0 if position > self.position else -1.0)
+        return
+
+    def stop(self) -> None:
+        self._target, self._deadline = None, None
+        self._set_velocity = 0.0
+        return
+
+    def preset(self, position: float) -> None:
+        """Sets the current position, the motor stops."""
+        self.stop()
+        self.velocity = 0.0
+        self.position = float(position)
+        return
+
+    def step(self, dt: float, now: float) -> None:
+        """Advances the model by `dt` seconds."""
+        if self._deadline is not None and now >= self._deadline:
+            self._deadline = None
+            self._set_velocity = 0.0
+        if self.blocked:
+            self.velocity = 0.0
+            return
+
+        dv = self._set_velocity - self.velocity
+        if dv:
+            speeding_up = abs(self._set_velocity) > abs(self.velocity)
+            ramp = self.acc_time if speeding_up else self.dec_time
+            max_dv = self.max_speed * dt / ramp if ramp > 0 else abs(dv)
+            self.velocity += max(-max_dv, min(max_dv, dv))
+
+        if self._target is not None:
+            remaining = self._target - self.position
+            if abs(remaining) <= abs(self.velocity * dt) or remaining * self._set_velocity <= 0:
+                self.position = self._target
+                self.velocity = self._set_velocity = 0.0
+                self._target = None
+                return
+        self.position += self.velocity * dt
+        return
+
+    def _speed(self, speed: int) -> float:
+        return max(-100, min(100, speed)) * self.max_speed / 100.0
+
+
+class _PortCommand:
+    """A port output command while it is being executed."""
+
+    __slots__ = ('motors', 'feedback', 'instant')
+
+    def __init__(self, motors: List[SimulatedMotor], feedback: bool, instant: bool):
+        self.motors: List[SimulatedMotor] = motors
+        self.feedback: bool = feedback
+        self.instant: bool = instant
+        return
+
+    def done(self) -> bool:
+        return self.instant or not any(motor.busy for motor in self.motors)
+
+
+class SimulatedHub:
+    """Simulated LEGO(c) Hub with tacho motors attached.
+
+    All methods are thread-safe. The motor model is advanced by an own thread every `interval` seconds while
+    anything moves; it sleeps otherwise.
+
+    Parameters
+    ----------
+    addr : str, default '00:00:00:00:00:00'
+        The address reported as :attr:`addr`.
+    ports : Iterable[int], default (0x00, 0x01, 0x02, 0x03)
+        The ports with a motor attached.
+    max_speed : float, default 900.0
+        Speed of the motors in degrees per second at 100%.
+    interval : float, default .01
+        Seconds between two updates of the motor model.
+    rtt : float, default 0.0
+        Seconds a write with response takes, e.g., one BLE connection interval.
+
+    """
+
+    def __init__(self,
+                 addr: str = '00:00:00:00:00:00',
+                 ports: Iterable[int] = (0x00, 0x01, 0x02, 0x03),
+                 max_speed: float = 900.0,
+                 interval: float = .01,
+                 rtt: float = 0.0):
+        self.addr: str = addr
+        self._interval: float = interval
+        self.rtt: float = rtt
+        self._delegate = None
+
+        self._lock: threading.RLock = threading.RLock()
+        self._motors: Dict[int, SimulatedMotor] = {port: SimulatedMotor(max_speed=max_speed) for port in ports}
+        self._virtual: Dict[int, Tuple[int, int]] = {}
+        self._running: Dict[int, _PortCommand] = {}
+        self._buffered: Dict[int, Tuple[int, bytes]] = {}
+        # port -> [delta, last reported value]
+        self._subscribed: Dict[int, list] = {}
+        self._enabled: bool = False
+
+        self._pending: deque = deque()
+        self._r, self._w = os.pipe()
+        self._wakeup: threading.Event = threading.Event()
+        self._stopped: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(target=self._run, name=f"SimulatedHub[{addr}]",
+                                                          daemon=True)
+        self._thread.start()
+        return
+
+    # --- Peripheral interface ---
+
+    def withDelegate(self, delegate) -> 'SimulatedHub':
+        self._delegate = delegate
+        return self
+
+    def fileno(self) -> int:
+        """The descriptor that becomes readable while notifications are waiting."""
+        return self._r
+
+    def waitForNotifications(self, timeout: Optional[float]) -> bool:
+        """Delivers one waiting notification to the delegate.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for a notification, wait forever if ``None`` or ``0`` like bluepy, which only polls
+            for a positive timeout.
+
+        Returns
+        -------
+        bool
+            ``True`` if a notification has been delivered, ``False`` if the timeout expired.
+
+        """
+        if timeout and not select.select((self._r,), (), (), timeout)[0]:
+            return False
+        os.read(self._r, 1)
+        data = self._pending.popleft()
+        if self._delegate is not None:
+            self._delegate.handleNotification(0x0e, data)
+        return True
+
+    def writeCharacteristic(self, handle: int, val: bytes, withResponse: bool = False):
+        """Processes a message written to the Hub.
+
+        Parameters
+        ----------
+        handle : int
+            ``0x0f`` enables (``b'\\x01\\x00'``) or disables the notifications, ``0x0e`` takes the LEGO(c) messages.
+        val : bytes
+            The value written.
+        withResponse : bool, default False
+            If ``True``, the call takes :attr:`rtt` seconds.
+
+        Returns
+        -------
+        None
+
+        """
+        if withResponse and self.rtt:
+            time.sleep(self.rtt)
+        val = bytes(val)
+        with self._lock:
+            if handle == 0x0f:
+                self._enabled = val[:1] == b'\x01'
+                if self._enabled:
+                    for port in sorted(self._motors):
+                        self._notify(struct.pack('<BBBBBHII', 15, 0x00, UPS_HUB_ATTACHED_IO, port,
+                                                 PERIPHERAL_EVENT.IO_ATTACHED[0], DEVICE_TYPE.EXTERNAL_MOTOR[0],
+                                                 0x10000000, 0x10000000))
+            elif handle == 0x0e and len(val) > 2:
+                handler = self._HANDLERS.get(val[2])
+                if handler is None:
+                    self._generic_error(val[2], CMD_RETURN_CODE.COMMAND_NOT_RECOGNIZED)
+                else:
+                    handler(self, val)
+        return None
+
+    def disconnect(self) -> None:
+        """Stops the simulation."""
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        return
+
+    # --- inspection ---
+
+    def position(self, port: int) -> float:
+        """The current position of the motor at `port` in degrees."""
+        with self._lock:
+            return self._motors[port].position
+
+    def motor(self, port: int) -> SimulatedMotor:
+        return self._motors[port]
+
+    # --- message handlers, called with the lock held ---
+
+    def _port_input_format_setup(self, msg: bytes) -> None:
+        port, mode = msg[3], msg[4]
+        delta, enabled = struct.unpack_from('<IB', msg, 5)
+        if port not in self._motors and port not in self._virtual:
+            self._generic_error(msg[2], CMD_RETURN_CODE.INVALID_USE)
+            return
+        self._notify(struct.pack('<BBBBBIB', 10, 0x00, UPS_PORT_NOTIFICATION, port, mode, delta, enabled))
+        if enabled:
+            value = self._value(port)
+            self._subscribed[port] = [max(delta, 1), value]
+            self._notify(struct.pack('<BBBBi', 8, 0x00, UPS_PORT_VALUE, port, value))
+        else:
+            self._subscribed.pop(port, None)
+        return
+
+    def _virtual_port_setup(self, msg: bytes) -> None:
+        if msg[3] == 0x01:
+            port_a, port_b = msg[4], msg[5]
+            if port_a not in self._motors or port_b not in self._motors or port_a == port_b:
+                self._generic_error(msg[2], CMD_RETURN_CODE.INVALID_USE)
+                return
+            port = next((p for p, ab in self._virtual.items() if ab == (port_a, port_b)), None)
+            if port is None:
+                port = FIRST_VIRTUAL_PORT
+                while port in self._virtual or port in self._motors:
+                    port += 1
+                self._virtual[port] = (port_a, port_b)
+            # the Hub acknowledges the setup with a generic error message carrying ACK
+            self._generic_error(msg[2], CMD_RETURN_CODE.ACK)
+            self._notify(struct.pack('<BBBBBHBB', 9, 0x00, UPS_HUB_ATTACHED_IO, port,
+                                     PERIPHERAL_EVENT.VIRTUAL_IO_ATTACHED[0], DEVICE_TYPE.EXTERNAL_MOTOR[0],
+                                     port_a, port_b))
+        else:
+            port = msg[4]
+            if self._virtual.pop(port, None) is None:
+                self._generic_error(msg[2], CMD_RETURN_CODE.INVALID_USE)
+                return
+            self._running.pop(port, None)
+            self._subscribed.pop(port, None)
+            self._notify(struct.pack('<BBBBB', 5, 0x00, UPS_HUB_ATTACHED_IO, port, PERIPHERAL_EVENT.IO_DETACHED[0]))
+        return
+
+    def _port_output_command(self, msg: bytes) -> None:
+        port, startup = msg[3], msg[4]
+        motors = self._port_motors(port)
+        if motors is None:
+            self._generic_error(msg[2], CMD_RETURN_CODE.INVALID_USE)
+            return
+        running = self._running.get(port)
+        if running is not None and not running.done() and not startup & EXEC_IMMEDIATELY:
+            if port in self._buffered:
+                self._feedback(port, FB_BUSY)
+            else:
+                self._buffered[port] = (startup, msg)
+            return
+        self._buffered.pop(port, None)
+        self._execute(port, motors, startup, msg, discarded=running is not None and not running.done())
+        return
+
+    _HANDLERS = {
+            DNS_PORT_NOTIFICATION: _port_input_format_setup,
+            DNS_VIRTUAL_PORT_SETUP: _virtual_port_setup,
+            DNS_PORT_CMD: _port_output_command,
+            }
+
+    def _execute(self, port: int, motors: List[SimulatedMotor], startup: int, msg: bytes, discarded: bool) -> None:
+        sub, payload, now = msg[5], msg[6:], time.monotonic()
+        instant = False
+        try:
+            if sub in (SUB_COMMAND.SET_ACC_PROFILE[0], SUB_COMMAND.SET_DEACC_PROFILE[0]):
+                ramp = struct.unpack_from('<H', payload)[0] / 1000.0
+                for motor in motors:
+                    if sub == SUB_COMMAND.SET_ACC_PROFILE[0]:
+                        motor.acc_time = ramp
+                    else:
+                        motor.dec_time = ramp
+                instant = True
+            elif sub == SUB_COMMAND.TURN_SPD_UNLIMITED[0]:
+                for motor in motors:
+                    motor.run(struct.unpack_from('<b', payload)[0])
+                instant = True
+            elif sub == SUB_COMMAND.TURN_SPD_UNLIMITED_SYNC[0]:
+                for motor, speed in zip(motors, struct.unpack_from('<bb', payload)):
+                    motor.run(speed)
+                instant = True
+            elif sub == SUB_COMMAND.TURN_FOR_TIME[0]:
+                millis, speed = struct.unpack_from('<Hb', payload)
+                for motor in motors:
+                    motor.run_for(millis / 1000.0, speed, now)
+            elif sub == SUB_COMMAND.TURN_FOR_TIME_SYNC[0]:
+                millis, speed_a, speed_b = struct.unpack_from('<Hbb', payload)
+                for motor, speed in zip(motors, (speed_a, speed_b)):
+                    motor.run_for(millis / 1000.0, speed, now)
+            elif sub == SUB_COMMAND.TURN_FOR_DEGREES[0]:
+                degrees, speed = struct.unpack_from('<ib', payload)
+                for motor in motors:
+                    motor.move_to(motor.position + abs(degrees) * _sign(speed) * _sign(degrees), speed)
+            elif sub == SUB_COMMAND.TURN_FOR_DEGREES_SYNC[0]:
+                degrees, speed_a, speed_b = struct.unpack_from('<ibb', payload)
+                fastest = max(abs(speed_a), abs(speed_b), 1)
+                for motor, speed in zip(motors, (speed_a, speed_b)):
+                    motor.move_to(motor.position + degrees * speed / fastest, speed)
+            elif sub == SUB_COMMAND.GOTO_ABSOLUTE_POS[0]:
+                position, speed = struct.unpack_from('<ib', payload)
+                for motor in motors:
+                    motor.move_to(position, speed)
+            elif sub == SUB_COMMAND.GOTO_ABSOLUTE_POS_SYNC[0]:
+                position_a, position_b, speed = struct.unpack_from('<iib', payload)
+                for motor, position in zip(motors, (position_a, position_b)):
+                    motor.move_to(position, speed)
+            elif sub == SUB_COMMAND.SET_VALUE_L_R[0]:
+                for motor, position in zip(motors, struct.unpack_from('<ii', payload)):
+                    motor.preset(position)
+                instant = True
+            elif sub == SUB_COMMAND.WRITE_DIRECT_MODE_DATA[0]:
+                mode, data = payload[0], payload[1:]
+                if mode == 0x00:
+                    # start power, an unloaded motor runs at the speed of the power percentage
+                    for motor in motors:
+                        motor.run(struct.unpack_from('<b', data)[0])
+                elif len(data) == 2:
+                    for motor, power in zip(motors, struct.unpack_from('<bb', data)):
+                        motor.run(power)
+                elif len(data) >= 12:
+                    for motor, position in zip(motors, struct.unpack_from('<ii', data, 4)):
+                        motor.preset(position)
+                else:
+                    for motor in motors:
+                        motor.preset(struct.unpack_from('<i', data)[0])
+                instant = True
+            elif sub == SUB_COMMAND.WRITE_DIRECT[0]:
+                instant = True
+            else:
+                self._generic_error(msg[2], CMD_RETURN_CODE.COMMAND_NOT_RECOGNIZED)
+                return
+        except (struct.error, IndexError):
+            self._generic_error(msg[2], CMD_RETURN_CODE.INVALID_USE)
+            return
+
+        command = _PortCommand(motors, feedback=bool(startup & COMMAND_FEEDBACK), instant=instant)
+        self._running[port] = command
+        if command.feedback:
+            self._feedback(port, FB_IN_PROGRESS | (FB_DISCARDED if discarded else 0))
+        self._wakeup.set()
+        return
+
+    # --- simulation ---
+
+    def _run(self) -> None:
+        last = time.monotonic()
+        while not self._stopped.is_set():
+            with self._lock:
+                active = bool(self._running) or any(motor.moving or motor.busy for motor in self._motors.values())
+            if not active:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                last = time.monotonic()
+                continue
+            self._stopped.wait(self._interval)
+            now = time.monotonic()
+            with self._lock:
+                self._tick(now - last, now)
+            last = now
+        return
+
+    def _tick(self, dt: float, now: float) -> None:
+        for motor in self._motors.values():
+            motor.step(dt, now)
+
+        for port in [p for p, command in self._running.items() if command.done()]:
+            command = self._running.pop(port)
+            buffered = self._buffered.pop(port, None)
+            if buffered is not None:
+                self._execute(port, command.motors, buffered[0], buffered[1], discarded=False)
+            elif command.feedback:
+                self._feedback(port, FB_COMPLETED | FB_IDLE)
+
+        for port, subscription in self._subscribed.items():
+            value = self._value(port)
+            if abs(value - subscription[1]) >= subscription[0]:
+                subscription[1] = value
+                self._notify(struct.pack('<BBBBi', 8, 0x00, UPS_PORT_VALUE, port, value))
+        return
+
+    # --- helpers, called with the lock held ---
+
+    def _port_motors(self, port: int) -> Optional[List[SimulatedMotor]]:
+        if port in self._motors:
+            return [self._motors[port]]
+        ports = self._virtual.get(port)
+        if ports is None:
+            return None
+        return [self._motors[ports[0]], self._motors[ports[1]]]
+
+    def _value(self, port: int) -> int:
+        # a virtual port reports the position of its first motor
+        motor = self._motors[port] if port in self._motors else self._motors[self._virtual[port][0]]
+        return int(round(motor.position))
+
+    def _feedback(self, port: int, status: int) -> None:
+        self._notify(struct.pack('<BBBBB', 5, 0x00, UPS_PORT_CMD_FEEDBACK, port, status))
+        return
+
+    def _generic_error(self, m_type: int, code: bytes) -> None:
+        self._notify(struct.pack('<BBBBB', 5, 0x00, UPS_HUB_GENERIC_ERROR, m_type, code[0]))
+        return
+
+    def _notify(self, data: bytes) -> None:
+        if self._enabled:
+            self._pending.append(data)
+            os.write(self._w, b'\x00')
+        return
+
+
+def _sign(value: int) -> int:
+    return -1 if value < 0 else 1
@@ -0,0 +1,400 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.telemetry
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    The latest ``PORT_VALUE`` and a bounded history per port in shared memory, for processes next to the server.
+
+    The server publishes every port value it receives from a Hub with a :class:`TelemetryWriter`. Any number of
+    processes on the same machine open the same file with a :class:`TelemetryReader` and poll or wait for the
+    values, without registering with the server, without a socket and without the server doing anything per
+    reader. The file lives in ``/dev/shm`` if it exists, i.e., in memory::
+
+        offset          size  field
+        0               4     b'LBTM'
+        4               1     version
+        6               2     number of Hubs
+        8               4     history length H per port
+        16              8     number of values published, all ports
+        64 + k * S      S     slot of port k = hub << 8 | port, S = 40 + 24 * H:
+            0           8         sequence, odd while the slot is written
+            8           8         number of values published to the port
+            16          8         monotonic timestamp in ns of the latest value
+            24          8         latest value, float
+            32          8         CRC-32 of the bytes 8 to 32
+            40 + 24 * i 24        history entry i, timestamp, value and CRC-32 of both, the latest at (count - 1) % H
+
+    All integers are little endian. The slots are indexed like the routing table of the server,
+    :class:`legoBTLE.networking.routing.RoutingTable`. Each slot is a seqlock: the single writer makes the sequence
+    odd, writes and makes it even again; a reader retries until it read the same even sequence before and after
+    copying. Readers therefore never block the writer.
+
+    Python has no memory barriers, the writer's stores to the map are plain stores. On x86, they become visible to
+    other processes in program order, which is all the seqlock needs. Other CPUs, e.g., the ARM of a Raspberry Pi,
+    may make the sequence visible before the data, so that a reader could take a torn value for a consistent one.
+    Hence the checksums of the latest value and of each history entry, i.e., of what a publish changes: a reader
+    also retries until they match what it copied. The number of values published, all ports, has no checksum and
+    is a statistic only.
+
+    A reader retries for :data:`READ_TIMEOUT` seconds at most and then raises :class:`TimeoutError`, e.g., if the
+    server died while writing a slot, leaving its sequence odd.
+
+    From the command line, the values of a port are printed as they arrive::
+
+        python -m legoBTLE.networking.telemetry legobtle --hub 0 --port 1
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+MAGIC: bytes = b'LBTM'
+VERSION: int = 3
+FILE_HEADER: struct.Struct = struct.Struct('<4sBxHI4x')
+WRITES: struct.Struct = struct.Struct('<Q')
+WRITES_OFFSET: int = 16
+SLOTS_OFFSET: int = 64
+PORTS: int = 256
+# sequence, count, timestamp and value, and the checksum of a slot
+SEQ: struct.Struct = struct.Struct('<Q')
+LATEST: struct.Struct = struct.Struct('<QQd')
+CHECK: struct.Struct = struct.Struct('<Q')
+SLOT_HEADER: struct.Struct = struct.Struct('<QQdQ')
+SLOT_HEADER_SIZE: int = 40
+# timestamp and value, followed by their checksum, of a history entry
+ENTRY: struct.Struct = struct.Struct('<Qd')
+ENTRY_SIZE: int = ENTRY.size + CHECK.size
+# seconds a reader retries to read a consistent slot
+READ_TIMEOUT: float = 1.0
+
+# where the files are created, in memory if possible
+SHM_DIR: str = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def telemetry_path(name: str) -> str:
+    """The file of the telemetry `name`, `name` itself if it is a path."""
+    return name if os.sep in name else os.path.join(SHM_DIR, name)
+
+
+class Sample(NamedTuple):
+    """The latest value of a port, `count` is the number of values published to the port so far."""
+    count: int
+    timestamp: int
+    value: float
+
+
+class TelemetryWriter:
+    """Publishes port values, there must be only one writer per file.
+
+    :meth:`publish` is not thread-safe, the server calls it from the event loop's thread.
+
+    Parameters
+    ----------
+    name : str
+        The name of the telemetry, i.e., the file in :data:`SHM_DIR`, or a path. The file is overwritten.
+    hubs : int, default 1
+        The number of Hubs.
+    history : int, default 64
+        The number of values kept per port.
+
+    """
+
+    def __init__(self, name: str, hubs: int = 1, history: int = 64):
+        if not 0 < hubs <= 256 or not 0 < history <= 1 << 16:
+            raise ValueError(f"[TelemetryWriter]-[ERR]: hubs MUST BE IN 1..256 AND history IN 1..65536, GOT "
+                             f"{hubs} AND {history}...")
+        self._path: str = telemetry_path(name)
+        self._history: int = history
+        self._slot_size: int = SLOT_HEADER_SIZE + ENTRY_SIZE * history
+        size = SLOTS_OFFSET + self._slot_size * PORTS * hubs
+        self._fd: int = os.open(self._path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self._fd, size)
+        self._map: mmap.mmap = mmap.mmap(self._fd, size)
+        # the writer's own copy of the sequences and counts, nothing is read back from the map
+        self._seq: List[int] = [0] * (PORTS * hubs)
+        self._count: List[int] = [0] * (PORTS * hubs)
+        self._writes: int = 0
+        # the magic comes last, readers do not accept the file before
+        FILE_HEADER.pack_into(self._map, 0, MAGIC, VERSION, hubs, history)
+        return
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def writes(self) -> int:
+        """The number of values published so far."""
+        return self._writes
+
+    def publish(self, hub: int, port: int, value: float, timestamp: int = None) -> None:
+        """Publishes `value` as the latest value of `port` of `hub`.
+
+        Parameters
+        ----------
+        hub : int
+            The index of the Hub.
+        port : int
+            The port byte.
+        value : float
+            The value, e.g., :attr:`legoBTLE.legoWP.message.upstream.PORT_VALUE.m_port_value`.
+        timestamp : int, optional
+            The :func:`time.monotonic_ns` of the value, now if not given.
+
+        Returns
+        -------
+        None
+
+        """
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        key = (hub << 8) | port
+        offset = SLOTS_OFFSET + key * self._slot_size
+        count = self._count[key]
+        seq = self._seq[key] + 1
+        buffer = self._map
+        SEQ.pack_into(buffer, offset, seq)
+        entry = ENTRY.pack(timestamp, value)
+        start = offset + SLOT_HEADER_SIZE + (count % self._history) * ENTRY_SIZE
+        buffer[start:start + ENTRY.size] = entry
+        CHECK.pack_into(buffer, start + ENTRY.size, zlib.crc32(entry))
+        count += 1
+        latest = LATEST.pack(count, timestamp, value)
+        buffer[offset + SEQ.size:offset + SEQ.size + LATEST.size] = latest
+        CHECK.pack_into(buffer, offset + SEQ.size + LATEST.size, zlib.crc32(latest))
+        self._seq[key] = seq = seq + 1
+        SEQ.pack_into(buffer, offset, seq)
+        self._count[key] = count
+        self._writes += 1
+        WRITES.pack_into(buffer, WRITES_OFFSET, self._writes)
+        return
+
+    def close(self, unlink: bool = True) -> None:
+        """Unmaps the file and, if `unlink`, removes it; readers that have it open keep their view."""
+        if self._map is None:
+            return
+        self._map.close()
+        self._map = None
+        os.close(self._fd)
+        if unlink:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+        return
+
+
+class TelemetryReader:
+    """Read access to the values published by a :class:`TelemetryWriter`, in this or any other process.
+
+    Parameters
+    ----------
+    name : str
+        The name of the telemetry or a path.
+
+    Attributes
+    ----------
+    hubs : int
+        The number of Hubs of the file.
+    depth : int
+        The number of values kept per port.
+    retries : int
+        The number of reads repeated because the writer was writing the slot or a checksum did not match.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a telemetry file or not yet initialised.
+
+    """
+
+    def __init__(self, name: str):
+        with open(telemetry_path(name), 'rb') as f:
+            self._map: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < SLOTS_OFFSET:
+            raise ValueError(f"[TelemetryReader]-[ERR]: {name} IS NOT A TELEMETRY FILE...")
+        magic, version, self.hubs, self.depth = FILE_HEADER.unpack_from(self._map, 0)
+        if (magic, version) != (MAGIC, VERSION):
+            raise ValueError(f"[TelemetryReader]-[ERR]: {name} IS NOT A TELEMETRY FILE OF VERSION {VERSION}...")
+        self._slot_size: int = SLOT_HEADER_SIZE + ENTRY_SIZE * self.depth
+        self.retries: int = 0
+        return
+
+    @property
+    def writes(self) -> int:
+        """The number of values published so far, to any port."""
+        return WRITES.unpack_from(self._map, WRITES_OFFSET)[0]
+
+    def _offset(self, hub: int, port: int) -> int:
+        if not 0 <= hub < self.hubs or not 0 <= port < PORTS:
+            raise IndexError(f"[TelemetryReader]-[ERR]: NO SLOT FOR PORT [{hub}:{port}]...")
+        return SLOTS_OFFSET + ((hub << 8) | port) * self._slot_size
+
+    def latest(self, hub: int, port: int, timeout: float = READ_TIMEOUT) -> Optional[Sample]:
+        """The latest value of `port` of `hub`, ``None`` if none has been published yet.
+
+        Raises
+        ------
+        TimeoutError
+            If no consistent value could be read within `timeout` seconds.
+
+        """
+        buffer = self._map
+        offset = self._offset(hub, port)
+        deadline = None
+        while True:
+            seq = SEQ.unpack_from(buffer, offset)[0]
+            if not seq & 1:
+                header = self._header(buffer, offset)
+                if SEQ.unpack_from(buffer, offset)[0] == seq and header is not None:
+                    return Sample(*header[:3]) if header[0] else None
+            deadline = self._retry(hub, port, deadline, timeout)
+
+    def _retry(self, hub: int, port: int, deadline: Optional[float], timeout: float) -> float:
+        """Counts a repeated read and yields the CPU, returns the deadline of the read, set by the first retry."""
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + timeout
+        elif now >= deadline:
+            raise TimeoutError(f"[TelemetryReader]-[ERR]: NO CONSISTENT SLOT FOR PORT [{hub}:{port}] WITHIN "
+                               f"{timeout} s, THE WRITER MAY HAVE DIED...")
+        self.retries += 1
+        os.sched_yield()
+        return deadline
+
+    @staticmethod
+    def _header(buffer: mmap.mmap, offset: int) -> Optional[tuple]:
+        """The count, timestamp, value and checksum of the slot at `offset`, ``None`` if copied torn."""
+        data = buffer[offset + SEQ.size:offset + SLOT_HEADER_SIZE]
+        header = SLOT_HEADER.unpack(data)
+        # a slot never written is all zeros, without checksum
+        if header[0] and zlib.crc32(data[:LATEST.size]) != header[3]:
+            return None
+        return header
+
+    @staticmethod
+    def _entries(data: bytes) -> Optional[List[Tuple[int, float]]]:
+        """The history entries in `data`, ``None`` if one of them was copied torn."""
+        values = []
+        for i in range(0, len(data), ENTRY_SIZE):
+            entry = data[i:i + ENTRY.size]
+            if zlib.crc32(entry) != CHECK.unpack_from(data, i + ENTRY.size)[0]:
+                return None
+            values.append(ENTRY.unpack(entry))
+        return values
+
+    def history(self, hub: int, port: int, timeout: float = READ_TIMEOUT) -> List[Tuple[int, float]]:
+        """The kept values of `port` of `hub` as ``(timestamp, value)`` pairs, the oldest first.
+
+        Raises
+        ------
+        TimeoutError
+            If no consistent history could be read within `timeout` seconds.
+
+        """
+        buffer = self._map
+        offset = self._offset(hub, port)
+        start = offset + SLOT_HEADER_SIZE
+        deadline = None
+        while True:
+            seq = SEQ.unpack_from(buffer, offset)[0]
+            if not seq & 1:
+                header = self._header(buffer, offset)
+                if header is not None:
+                    count = header[0]
+                    values = self._entries(buffer[start:start + ENTRY_SIZE * min(count, self.depth)])
+                    if SEQ.unpack_from(buffer, offset)[0] == seq and values is not None:
+                        break
+            deadline = self._retry(hub, port, deadline, timeout)
+        head = count % self.depth if count > self.depth else 0
+        return values[head:] + values[:head]
+
+    def wait(self, hub: int, port: int, count: int = 0, timeout: float = None,
+             interval: float = .0005) -> Optional[Sample]:
+        """Waits until more than `count` values have been published to `port` of `hub`.
+
+        Parameters
+        ----------
+        hub : int
+            The index of the Hub.
+        port : int
+            The port byte.
+        count : int, default 0
+            The :attr:`Sample.count` seen last.
+        timeout : float, optional
+            Seconds to wait at most, no limit if ``None``.
+        interval : float, default .0005
+            Seconds between two polls.
+
+        Returns
+        -------
+        Optional[Sample]
+            The latest value, ``None`` if there was no new one in time.
+
+        Raises
+        ------
+        TimeoutError
+            Without `timeout`, if no consistent value could be read within :data:`READ_TIMEOUT` seconds.
+
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                sample = self.latest(hub, port)
+            else:
+                try:
+                    sample = self.latest(hub, port, max(deadline - time.monotonic(), 0.0))
+                except TimeoutError:
+                    return None
+            if sample is not None and sample.count > count:
+                return sample
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+
+    def close(self) -> None:
+        self._map.close()
+        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prints the values a server publishes for one port.')
+    parser.add_argument('name', help='name of the telemetry, see the --telemetry option of the server')
+    parser.add_argument('--hub', type=int, default=0, help='index of the Hub, default 0')
+    parser.add_argument('--port', type=int, default=0, help='port, default 0')
+    parser.add_argument('--history', action='store_true', help='print the kept values first')
+    args = parser.parse_args()
+
+    reader = TelemetryReader(args.name)
+    count = 0
+    try:
+        if args.history:
+            for timestamp, value in reader.history(args.hub, args.port):
+                print(f"{timestamp / 1e9:>16.6f}  {value:g}")
+        while True:
+            sample = reader.wait(args.hub, args.port, count)
+            if sample.count > count + 1 and count:
+                print(f"... {sample.count - count - 1} VALUES SKIPPED ...")
+            count = sample.count
+            print(f"{sample.timestamp / 1e9:>16.6f}  {sample.value:g}")
+    except TimeoutError as te:
+        print(te.args[0])
+    except KeyboardInterrupt:
+        pass
+    reader.close()
+    return
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+# coding=utf-8
+"""
+    legoBTLE.networking.transport
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    The transports between the devices and the server, chosen by the host part of the server address.
+
+    ``'127.0.0.1'``, any host name or IP address
+        TCP, as before.
+    ``'unix:/path/to/socket'``
+        A Unix domain socket, the port is ignored. Saves the TCP/IP stack when the devices and the server run on
+        the same machine.
+    ``'loop:name'``
+        An in-process loopback, the port is part of the name. The bytes a device writes are handed straight to the
+        protocol of the server running in the same event loop, and vice versa, without any socket or system call.
+
+    Both sides use the same wire format with every transport.
+
+    Example::
+
+        from legoBTLE.networking import server
+        from legoBTLE.device.SingleMotor import SingleMotor
+
+        await server.start_server('loop:', 8888)
+        motor = SingleMotor(server=('loop:', 8888), port=0x00)
+        await motor.EXT_SRV_CONNECT_REQ()
+
+    :copyright: Copyright 2020-2021 by Dietrich Christopeit, see AUTHORS.
+    :license: MIT, see LICENSE for details
+"""
+
+import asyncio
+import itertools
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+UNIX: str = 'unix:'
+LOOPBACK: str = 'loop:'
+
+# the data queued for a paused reader above which the writer is paused as well
+LOOPBACK_HIGH_WATER: int = 1 << 16
+
+_loopback_servers: Dict[Tuple[str, int], 'LoopbackServer'] = {}
+_loopback_peers = itertools.count(1)
+
+
+def kind(host: str) -> str:
+    """The transport selected by `host`: ``'tcp'``, ``'unix'`` or ``'loop'``."""
+    if host.startswith(UNIX):
+        return 'unix'
+    if host.startswith(LOOPBACK):
+        return 'loop'
+    return 'tcp'
+
+
+async def open_connection(host: str, port: int) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Opens a connection to the server at `host`:`port` with the transport `host` selects.
+
+    Returns
+    -------
+    Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+        The streams of the connection, as :func:`asyncio.open_connection` returns them.
+
+    Raises
+    ------
+    ConnectionError
+        If no server is listening at the address.
+
+    """
+    if host.startswith(UNIX):
+        return await asyncio.open_unix_connection(path=host[len(UNIX):])
+    if host.startswith(LOOPBACK):
+        loop = asyncio.get_event_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+        transport = _connect_loopback(host, port, protocol)
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+    return await asyncio.open_connection(host=host, port=port)
+
+
+async def create_server(protocol_factory: Callable[[], asyncio.BaseProtocol], host: str, port: int):
+    """Starts accepting connections at `host`:`port` with the transport `host` selects.
+
+    Parameters
+    ----------
+    protocol_factory : Callable[[], asyncio.BaseProtocol]
+        Creates the protocol of each connection.
+    host : str
+        The host part of the address, see the module description.
+    port : int
+        The port, ``0`` for any free port with TCP.
+
+    Returns
+    -------
+    Union[asyncio.AbstractServer, LoopbackServer]
+        The listening server.
+
+    """
+    loop = asyncio.get_event_loop()
+    if host.startswith(UNIX):
+        return await loop.create_unix_server(protocol_factory, path=host[len(UNIX):])
+    if host.startswith(LOOPBACK):
+        return LoopbackServer(protocol_factory, host, port)
+    return await loop.create_server(protocol_factory, host, port)
+
+
+class LoopbackServer:
+    """Accepts the in-process connections to its address until closed.
+
+    Only the parts of :class:`asyncio.AbstractServer` the project uses are provided.
+    """
+
+    def __init__(self, protocol_factory: Callable[[], asyncio.BaseProtocol], host: str, port: int):
+        if (host, port) in _loopback_servers:
+            raise OSError(f"[LoopbackServer]-[ERR]: ADDRESS [{host}:{port}] ALREADY IN USE...")
+        self.protocol_factory: Callable[[], asyncio.BaseProtocol] = protocol_factory
+        self.address: Tuple[str, int] = (host, port)
+        self.sockets: tuple = ()
+        _loopback_servers[self.address] = self
+        return
+
+    def is_serving(self) -> bool:
+        return _loopback_servers.get(self.address) is self
+
+    def close(self) -> None:
+        if self.is_serving():
+            del _loopback_servers[self.address]
+        return
+
+    async def wait_closed(self) -> None:
+        return
+
+
+def _connect_loopback(host: str, port: int, protocol: asyncio.BaseProtocol) -> 'LoopbackTransport':
+    server = _loopback_servers.get((host, port))
+    if server is None:
+        raise ConnectionRefusedError(f"[LoopbackServer]-[ERR]: NO SERVER AT [{host}:{port}]...")
+    loop = asyncio.get_event_loop()
+    peer = next(_loopback_peers)
+    client = LoopbackTransport(loop, protocol, {'peername': (host, port), 'sockname': ('loop', peer)})
+    accepted = LoopbackTransport(loop, server.protocol_factory(), {'peername': ('loop', peer), 'sockname': (host, port)})
+    client._peer, accepted._peer = accepted, client
+    accepted._protocol.connection_made(accepted)
+    protocol.connection_made(client)
+    return client
+
+
+class LoopbackTransport(asyncio.Transport):
+    """One end of an in-process connection.
+
+    What is written to one end is handed to the protocol of the other end within the call, i.e., before
+    :meth:`write` returns. While the receiving end is paused, the data is queued there and the writing end's
+    protocol is paused above :data:`LOOPBACK_HIGH_WATER` bytes.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, protocol: asyncio.BaseProtocol, extra: dict):
+        super().__init__(extra)
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._protocol: asyncio.BaseProtocol = protocol
+        self._buffered: bool = isinstance(protocol, asyncio.BufferedProtocol)
+        self._peer: Optional['LoopbackTransport'] = None
+        self._paused: bool = False
+        self._pending: bytearray = bytearray()
+        self._peer_paused: bool = False
+        self._closing: bool = False
+        return
+
+    # writing
+
+    def write(self, data: bytes) -> None:
+        if self._closing:
+            return
+        self._peer._receive(data)
+        return
+
+    def writelines(self, list_of_data) -> None:
+        self.write(b''.join(list_of_data))
+        return
+
+    def can_write_eof(self) -> bool:
+        return False
+
+    def get_write_buffer_size(self) -> int:
+        return len(self._peer._pending) if self._peer is not None else 0
+
+    def set_write_buffer_limits(self, high: int = None, low: int = None) -> None:
+        return
+
+    # reading
+
+    def is_reading(self) -> bool:
+        return not self._paused and not self._closing
+
+    def pause_reading(self) -> None:
+        self._paused = True
+        return
+
+    def resume_reading(self) -> None:
+        if self._paused and not self._closing:
+            self._paused = False
+            pending, self._pending = self._pending, bytearray()
+            if pending:
+                self._receive(pending)
+            if not self._paused and self._peer_paused:
+                self._peer_paused = False
+                self._peer._protocol.resume_writing()
+        return
+
+    def _receive(self, data: bytes) -> None:
+        if self._closing:
+            return
+        if self._paused:
+            self._pending += data
+            if len(self._pending) > LOOPBACK_HIGH_WATER and not self._peer_paused:
+                self._peer_paused = True
+                self._peer._protocol.pause_writing()
+            return
+        if not self._buffered:
+            self._protocol.data_received(bytes(data))
+            return
+        with memoryview(data) as view:
+            offset, end = 0, len(view)
+            while offset < end:
+                if self._paused:
+                    self._pending += view[offset:]
+                    return
+                buffer = self._protocol.get_buffer(end - offset)
+                n = min(len(buffer), end - offset)
+                buffer[:n] = view[offset:offset + n]
+                offset += n
+                self._protocol.buffer_updated(n)
+        return
+
+    # closing
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if not self._closing:
+            self._closing = True
+            self._loop.call_soon(self._protocol.connection_lost, None)
+            if self._peer is not None:
+                self._peer.close()
+        return
+
+    def abort(self) -> None:
+        self.close()
+        return